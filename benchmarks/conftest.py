@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from tests.synthetic import write_lirical_results, write_phenopackets, write_vcf_stubs
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Skip the comparison against a saved baseline, rather than fail the run, when there is none."""
+    compare = config.getoption("benchmark_compare", None)
+    storage = config.getoption("benchmark_storage", "")
+    if not compare or not storage.startswith("file://"):
+        return
+    storage_dir = Path(storage[len("file://") :])
+    if storage_dir.is_dir() and any(storage_dir.rglob("*.json")):
+        return
+    config.issue_config_time_warning(
+        pytest.PytestWarning(
+            f"no saved benchmark baseline in {storage_dir}, run `tox -e benchmark-baseline` "
+            "first; skipping the comparison"
+        ),
+        stacklevel=2,
+    )
+    config.option.benchmark_compare = []
+    config.option.benchmark_compare_fail = None
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--synthetic-cases",
+        type=int,
+        default=200,
+        help="Number of synthetic phenopackets/results to generate for benchmarks.",
+    )
+    parser.addoption(
+        "--synthetic-rows",
+        type=int,
+        default=1000,
+        help="Number of ranked diseases per synthetic LIRICAL result.",
+    )
+    parser.addoption(
+        "--synthetic-variants",
+        type=int,
+        default=5,
+        help="Number of variants listed per synthetic LIRICAL result row.",
+    )
+
+
+@pytest.fixture(scope="session")
+def synthetic_cases(request) -> int:
+    return request.config.getoption("--synthetic-cases")
+
+
+@pytest.fixture(scope="session")
+def synthetic_rows(request) -> int:
+    return request.config.getoption("--synthetic-rows")
+
+
+@pytest.fixture(scope="session")
+def synthetic_variants(request) -> int:
+    return request.config.getoption("--synthetic-variants")
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(tmp_path_factory, synthetic_cases, synthetic_rows, synthetic_variants) -> Path:
+    """A synthetic testdata directory with phenopackets, VCF stubs and raw LIRICAL results."""
+    corpus = tmp_path_factory.mktemp("corpus")
+    phenopacket_paths = write_phenopackets(corpus.joinpath("phenopackets"), synthetic_cases)
+    write_vcf_stubs(corpus.joinpath("vcf"), phenopacket_paths)
+    write_lirical_results(
+        corpus.joinpath("raw_results"), phenopacket_paths, synthetic_rows, synthetic_variants
+    )
+    return corpus
+
+
+@pytest.fixture(scope="session")
+def lirical_result_path(corpus_dir) -> Path:
+    return sorted(corpus_dir.joinpath("raw_results").iterdir())[0]
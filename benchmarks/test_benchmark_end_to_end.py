@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from pheval.post_processing import post_processing
+
+from pheval_lirical.post_process.post_process import post_process_results_format
+from pheval_lirical.run.run import prepare_lirical_commands, run_lirical_local
+from pheval_lirical.tool_specific_configuration_parser import (
+    ExomiserDB,
+    LIRICALToolSpecificConfigurations,
+    PostProcessing,
+)
+from tests.fixtures.fake_lirical import install_fake_java
+
+pytestmark = pytest.mark.skipif(
+    sys.platform.startswith("win"), reason="the fake LIRICAL is launched through /bin/sh"
+)
+
+
+@pytest.fixture
+def fake_lirical(tmp_path, monkeypatch, synthetic_rows, synthetic_variants):
+    """Put the fake LIRICAL `java` on the PATH with a profile taken from the benchmark options."""
+    install_fake_java(tmp_path.joinpath("bin"))
+    monkeypatch.setenv("PATH", f"{tmp_path.joinpath('bin')}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv(
+        "FAKE_LIRICAL_PROFILE",
+        json.dumps({"rows": synthetic_rows, "variants_per_row": synthetic_variants}),
+    )
+
+
+def test_end_to_end(benchmark, fake_lirical, corpus_dir, tmp_path):
+    input_dir = tmp_path.joinpath("input_dir")
+    input_dir.joinpath("data").mkdir(parents=True)
+    output_dir = tmp_path.joinpath("output")
+    config = LIRICALToolSpecificConfigurations(
+        mode="phenopacket",
+        lirical_jar_executable=Path("lirical.jar"),
+        exomiser_db_configurations=ExomiserDB(exomiser_hg19_database=Path("hg19.mv.db")),
+        post_process=PostProcessing(sort_order="descending"),
+    )
+
+    def setup():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        for directory in ["tool_input_commands", "raw_results", "pheval_gene_results"]:
+            output_dir.joinpath(directory).mkdir(parents=True)
+        post_processing.executed_results.clear()
+
+    def pipeline():
+        prepare_lirical_commands(
+            input_dir=input_dir,
+            tool_input_commands_dir=output_dir.joinpath("tool_input_commands"),
+            raw_results_dir=output_dir.joinpath("raw_results"),
+            testdata_dir=corpus_dir,
+            lirical_version="2.0.0",
+            tool_specific_configurations=config,
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+        run_lirical_local(
+            tool_input_commands_dir=output_dir.joinpath("tool_input_commands"),
+            testdata_dir=corpus_dir,
+        )
+        post_process_results_format(
+            raw_results_dir=output_dir.joinpath("raw_results"),
+            output_dir=output_dir,
+            phenopacket_dir=corpus_dir.joinpath("phenopackets"),
+            config=config,
+            disease_analysis=False,
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+
+    benchmark.pedantic(pipeline, setup=setup, rounds=1)
+    assert len(list(output_dir.joinpath("pheval_gene_results").iterdir())) == len(
+        list(corpus_dir.joinpath("phenopackets").iterdir())
+    )
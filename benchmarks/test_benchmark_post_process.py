@@ -0,0 +1,181 @@
+import multiprocessing
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import polars as pl
+import pytest
+from pheval.post_processing import post_processing
+from pheval.post_processing.post_processing import ResultType, SortOrder
+from pheval.utils.phenopacket_utils import GeneIdentifierUpdater, create_gene_identifier_map
+
+from pheval_lirical.post_process import post_process_results_format
+from pheval_lirical.post_process.handoff import handoff_directory, read_frames
+from pheval_lirical.post_process.post_process_results_format import (
+    _extract_to_handoff,
+    _init_extraction_worker,
+    create_standardised_results,
+    extract_disease_results,
+    extract_gene_results,
+    extract_standardised_results,
+    extract_variant_results,
+    filter_top_ranked,
+    raw_result_files,
+    read_lirical_result,
+    scan_lirical_result,
+    to_pheval_variant_schema,
+)
+
+
+@pytest.fixture(scope="module")
+def lirical_result(lirical_result_path):
+    return read_lirical_result(lirical_result_path)
+
+
+@pytest.fixture(scope="module")
+def gene_identifier_updater():
+    return GeneIdentifierUpdater(
+        gene_identifier="ensembl_id", identifier_map=create_gene_identifier_map()
+    )
+
+
+def test_read_lirical_result(benchmark, lirical_result_path, synthetic_rows):
+    result = benchmark(read_lirical_result, lirical_result_path)
+    assert result.height == synthetic_rows
+
+
+def test_extract_disease_results(benchmark, lirical_result):
+    result = benchmark(extract_disease_results, lirical_result)
+    assert result.height == lirical_result.height
+
+
+def test_extract_gene_results(benchmark, lirical_result, gene_identifier_updater):
+    result = benchmark(extract_gene_results, lirical_result, gene_identifier_updater)
+    assert result.height == lirical_result.height
+
+
+def test_extract_variant_results(benchmark, lirical_result, synthetic_variants):
+    result = benchmark(extract_variant_results, lirical_result)
+    assert result.height == lirical_result.height * synthetic_variants
+
+
+@pytest.mark.parametrize("variant_reducer", ["best_score", "best_rank"])
+def test_extract_aggregated_variant_results(benchmark, lirical_result, variant_reducer):
+    result = benchmark(extract_variant_results, lirical_result, variant_reducer)
+    assert result.height <= extract_variant_results(lirical_result).height
+
+
+def test_compact_variant_results_memory(benchmark, lirical_result):
+    variant_results = benchmark(extract_variant_results, lirical_result)
+    # polars' estimated_size leaves out string views, so compare the Arrow buffers instead
+    compact_bytes = variant_results.to_arrow().nbytes
+    string_bytes = (
+        to_pheval_variant_schema(variant_results)
+        .with_columns(pl.col("end").cast(pl.String))
+        .to_arrow()
+        .nbytes
+    )
+    benchmark.extra_info["compact_bytes"] = compact_bytes
+    benchmark.extra_info["string_bytes"] = string_bytes
+    benchmark.extra_info["memory_reduction"] = round(1 - compact_bytes / string_bytes, 3)
+    assert compact_bytes < string_bytes
+
+
+@pytest.mark.parametrize("max_rank", [None, 100])
+def test_extract_top_ranked_variant_results(benchmark, lirical_result_path, max_rank):
+    def extract():
+        lirical_result = filter_top_ranked(scan_lirical_result(lirical_result_path), max_rank)
+        return extract_variant_results(lirical_result.collect())
+
+    result = benchmark(extract)
+    assert result.height > 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_create_standardised_results(benchmark, corpus_dir, tmp_path, workers):
+    output_dir = tmp_path.joinpath("output")
+
+    def setup():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        for result_type in ["gene", "variant", "disease"]:
+            output_dir.joinpath(f"pheval_{result_type}_results").mkdir(parents=True)
+        post_processing.executed_results.clear()
+
+    benchmark.pedantic(
+        create_standardised_results,
+        kwargs=dict(
+            raw_results_dir=corpus_dir.joinpath("raw_results"),
+            output_dir=output_dir,
+            phenopacket_dir=corpus_dir.joinpath("phenopackets"),
+            sort_order="descending",
+            disease_analysis=True,
+            gene_analysis=True,
+            variant_analysis=True,
+            workers=workers,
+        ),
+        setup=setup,
+        rounds=3,
+    )
+    assert len(list(output_dir.joinpath("pheval_variant_results").iterdir())) == len(
+        list(corpus_dir.joinpath("raw_results").iterdir())
+    )
+
+
+RESULT_TYPES = [ResultType.GENE, ResultType.VARIANT, ResultType.DISEASE]
+
+
+def extract_pickled(raw_result, sort_order, result_types):
+    """Extract results in a worker, returning the DataFrames to be pickled back."""
+    return extract_standardised_results(
+        raw_result,
+        sort_order,
+        post_process_results_format._worker_gene_identifier_updater,
+        result_types,
+    )[0]
+
+
+@pytest.fixture(scope="module")
+def extraction_pool():
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_extraction_worker,
+        initargs=(True,),
+    ) as executor:
+        # start the workers before timing
+        list(executor.map(abs, range(2)))
+        yield executor
+
+
+@pytest.mark.parametrize("handoff", ["pickle", "arrow_ipc"])
+def test_worker_result_handoff(benchmark, extraction_pool, corpus_dir, handoff):
+    """Time receiving the extracted results of the corpus from two worker processes."""
+    raw_results = raw_result_files(corpus_dir.joinpath("raw_results"))
+
+    def receive() -> int:
+        if handoff == "pickle":
+            futures = [
+                extraction_pool.submit(
+                    extract_pickled, raw_result, SortOrder.DESCENDING, RESULT_TYPES
+                )
+                for raw_result in raw_results
+            ]
+            results = [future.result() for future in futures]
+            return sum(frame.height for result in results for frame in result.values())
+        with handoff_directory() as handoff_dir:
+            futures = [
+                extraction_pool.submit(
+                    _extract_to_handoff,
+                    raw_result,
+                    handoff_dir,
+                    SortOrder.DESCENDING,
+                    RESULT_TYPES,
+                )
+                for raw_result in raw_results
+            ]
+            results = [read_frames(future.result()[0]) for future in futures]
+            return sum(frame.height for result in results for frame in result.values())
+
+    rows = benchmark.pedantic(receive, rounds=3)
+    benchmark.extra_info["handoff"] = handoff
+    benchmark.extra_info["result_rows"] = rows
+    assert rows > 0
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from pheval_lirical.prepare.prepare_commands import create_command_arguments, write_all_commands
+
+
+def _command_arguments(corpus_dir: Path, mode: str):
+    return create_command_arguments(
+        phenopacket_dir=corpus_dir.joinpath("phenopackets"),
+        lirical_jar=Path("/path/to/lirical.jar"),
+        input_dir=Path("/path/to/lirical/data"),
+        exomiser_data_dir=None,
+        vcf_dir=corpus_dir.joinpath("vcf"),
+        output_dir=corpus_dir.joinpath("raw_results"),
+        mode=mode,
+        exomiser_hg19_data=Path("/path/to/hg19.mv.db"),
+        exomiser_hg38_data=None,
+        gene_analysis=True,
+        variant_analysis=True,
+    )
+
+
+@pytest.mark.parametrize("mode", ["phenopacket", "manual"])
+def test_create_command_arguments(benchmark, corpus_dir, mode):
+    command_arguments = benchmark(_command_arguments, corpus_dir, mode)
+    assert len(command_arguments) == len(list(corpus_dir.joinpath("phenopackets").iterdir()))
+
+
+@pytest.mark.parametrize("mode", ["phenopacket", "manual"])
+def test_write_all_commands(benchmark, corpus_dir, tmp_path, mode):
+    command_arguments = _command_arguments(corpus_dir, mode)
+    benchmark(
+        write_all_commands,
+        command_arguments=command_arguments,
+        tool_input_commands_dir=tmp_path,
+        file_prefix="benchmark",
+        mode=mode,
+        lirical_version="2.0.0-RC2",
+    )
+    with open(tmp_path.joinpath("benchmark-lirical-commands.txt")) as commands:
+        assert len(commands.readlines()) == len(command_arguments)
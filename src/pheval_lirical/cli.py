@@ -1,21 +1,72 @@
+import importlib
+
 import click
 
-from pheval_lirical.post_process.post_process_results_format import post_process
-from pheval_lirical.prepare.prepare_commands import prepare_commands_command
+
+class LazyGroup(click.Group):
+    """Click group that only imports a subcommand's module when that subcommand is used."""
+
+    def __init__(self, *args, lazy_subcommands: dict = None, **kwargs):
+        """
+        Args:
+            lazy_subcommands (dict): Maps command names to (import path, short help) pairs, where
+                the import path has the form "package.module:command".
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(super().list_commands(ctx) + list(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command or None:
+        if cmd_name in self.lazy_subcommands:
+            import_path, _ = self.lazy_subcommands[cmd_name]
+            module_name, command_name = import_path.split(":")
+            return getattr(importlib.import_module(module_name), command_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        """List subcommands in the help page without importing them."""
+        rows = [(name, short_help) for name, (_, short_help) in self.lazy_subcommands.items()]
+        rows += [
+            (name, command.get_short_help_str())
+            for name, command in self.commands.items()
+            if not command.hidden
+        ]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(sorted(rows))
 
 
 def main_():
     pass
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "prepare-commands": (
+            "pheval_lirical.prepare.prepare_commands:prepare_commands_command",
+            "Prepare command batch files to run LIRICAL.",
+        ),
+        "post-process": (
+            "pheval_lirical.post_process.post_process:post_process_command",
+            "Create PhEval results from LIRICAL tsv output.",
+        ),
+        "run": (
+            "pheval_lirical.run.run:run_command",
+            "Run prepared LIRICAL commands.",
+        ),
+        "sweep": (
+            "pheval_lirical.run.sweep:sweep_command",
+            "Run LIRICAL over a corpus with several configurations.",
+        ),
+    },
+)
 def main():
     """Lirical runner."""
     pass
 
 
-main.add_command(prepare_commands_command)
-main.add_command(post_process)
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,229 @@
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+RUNTIME_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+MEMORY_BUCKETS = tuple(2**exponent for exponent in range(28, 37))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """A metric of a registry, exposed in the Prometheus text format."""
+
+    metric_type = None
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.lock = registry.lock
+        registry.register(self)
+
+    def samples(self) -> list[tuple[str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(f"{name} {_format_value(value)}" for name, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A count that only goes up."""
+
+    metric_type = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str):
+        super().__init__(registry, name, documentation)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+    def samples(self) -> list[tuple[str, float]]:
+        return [(self.name, self.value)]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    metric_type = "gauge"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str):
+        super().__init__(registry, name, documentation)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self.lock:
+            self.value = value
+
+    def samples(self) -> list[tuple[str, float]]:
+        return [(self.name, self.value)]
+
+
+class Histogram(_Metric):
+    """Counts of observations in cumulative buckets, with their sum and count."""
+
+    metric_type = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, buckets: tuple):
+        super().__init__(registry, name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    def samples(self) -> list[tuple[str, float]]:
+        samples, cumulative = [], 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{_format_value(bucket)}"}}', cumulative))
+        samples.append((f"{self.name}_sum", self.sum))
+        samples.append((f"{self.name}_count", cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """A set of metrics, rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self.lock:
+            return "".join(metric.render() + "\n" for metric in self.metrics.values())
+
+    def write_textfile(self, textfile: Path) -> None:
+        """Atomically write the metrics to a file, for the node exporter textfile collector."""
+        temporary_path = textfile.with_name(f".{textfile.name}.tmp")
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(temporary_path, textfile)
+
+
+REGISTRY = MetricsRegistry()
+JOBS_STARTED = Counter(REGISTRY, "lirical_jobs_started_total", "LIRICAL jobs started.")
+JOBS_COMPLETED = Counter(
+    REGISTRY, "lirical_jobs_completed_total", "LIRICAL jobs that exited successfully."
+)
+JOBS_FAILED = Counter(
+    REGISTRY, "lirical_jobs_failed_total", "LIRICAL jobs that exited with an error."
+)
+QUEUE_DEPTH = Gauge(REGISTRY, "lirical_queue_depth", "LIRICAL jobs waiting to start.")
+CASE_RUNTIME = Histogram(
+    REGISTRY, "lirical_case_runtime_seconds", "Runtime of LIRICAL per case.", RUNTIME_BUCKETS
+)
+JOB_MAX_RSS = Histogram(
+    REGISTRY,
+    "lirical_job_max_rss_bytes",
+    "Peak resident memory of the LIRICAL JVM of each job.",
+    MEMORY_BUCKETS,
+)
+POST_PROCESS_ROWS = Counter(
+    REGISTRY, "lirical_post_process_rows_total", "Raw LIRICAL result rows post-processed."
+)
+POST_PROCESS_ROWS_PER_SECOND = Gauge(
+    REGISTRY,
+    "lirical_post_process_rows_per_second",
+    "Rows per second post-processed from the last raw LIRICAL result.",
+)
+
+
+class MetricsExporter:
+    """
+    Expose a metrics registry over HTTP at /metrics, and/or periodically write it to a textfile.
+
+    Port 0 serves on a free port, available as the port attribute once started.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        port: Optional[int] = None,
+        host: str = "127.0.0.1",
+        textfile: Optional[Path] = None,
+        interval: float = 15.0,
+    ):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.textfile = textfile
+        self.interval = interval
+        self.server = None
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def __enter__(self) -> "MetricsExporter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Start serving and writing the metrics."""
+        if self.port is not None:
+            registry = self.registry
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:  # noqa: N802
+                    if self.path.split("?")[0] not in ["/", "/metrics"]:
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args) -> None:
+                    pass
+
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+            self.port = self.server.server_address[1]
+            self.threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+            print(f"serving LIRICAL metrics on http://{self.host}:{self.port}/metrics")
+        if self.textfile is not None:
+            self.threads.append(threading.Thread(target=self._write_textfile, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def _write_textfile(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.registry.write_textfile(self.textfile)
+
+    def close(self) -> None:
+        """Stop serving the metrics, writing the textfile a final time."""
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.textfile is not None:
+            self.registry.write_textfile(self.textfile)
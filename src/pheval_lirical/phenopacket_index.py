@@ -0,0 +1,253 @@
+import os
+import sys
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+from phenopackets import Family, Phenopacket
+from pheval.prepare.custom_exceptions import IncorrectFileFormatError
+from pheval.utils.phenopacket_utils import (
+    GenomicVariant,
+    IncompatibleGenomeAssemblyError,
+    PhenopacketUtil,
+    ProbandCausativeGene,
+    ProbandDisease,
+    phenopacket_reader,
+)
+
+from pheval_lirical.progress import ProgressReporter
+
+PHENOPACKET_INDEX_FILE_NAME = "pheval_lirical_phenopacket_index.parquet"
+COMPATIBLE_GENOME_ASSEMBLIES = ["GRCh37", "hg19", "GRCh38", "hg38"]
+
+
+@lru_cache(maxsize=16384)
+def _shared_hpo_terms(terms: tuple[str, ...]) -> tuple[str, ...]:
+    return terms
+
+
+def canonical_hpo_terms(hpo_ids) -> tuple[str, ...]:
+    """
+    Return a set of HPO ids as a sorted, deduplicated tuple of interned strings.
+
+    Equal sets of HPO ids share a single tuple, so that cases with the same phenotype profile
+    hold one copy of it, and the tuple can be used as a cache key. The shared tuples are held in
+    a bounded cache, so that a long-lived process does not keep every profile it has seen.
+    """
+    return _shared_hpo_terms(tuple(sorted({sys.intern(hpo_id) for hpo_id in hpo_ids})))
+
+
+@dataclass
+class PhenopacketRecord:
+    """The contents of a phenopacket needed to run LIRICAL on it and classify its results."""
+
+    case_id: str
+    phenopacket_path: Path
+    sample_id: str
+    observed_phenotypes: tuple[str, ...] = ()
+    negated_phenotypes: tuple[str, ...] = ()
+    vcf_file_name: Optional[str] = None
+    vcf_assembly: Optional[str] = None
+    causative_genes: list[ProbandCausativeGene] = field(default_factory=list)
+    causative_variants: list[GenomicVariant] = field(default_factory=list)
+    diseases: list[ProbandDisease] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.observed_phenotypes = canonical_hpo_terms(self.observed_phenotypes)
+        self.negated_phenotypes = canonical_hpo_terms(self.negated_phenotypes)
+
+    @classmethod
+    def from_phenopacket(
+        cls, phenopacket_path: Path, phenopacket: Phenopacket or Family
+    ) -> "PhenopacketRecord":
+        """Extract a record from a parsed phenopacket."""
+        phenopacket_util = PhenopacketUtil(phenopacket)
+        vcf_files = [
+            file for file in phenopacket_util.files() if file.file_attributes["fileFormat"] == "vcf"
+        ]
+        return cls(
+            case_id=phenopacket_path.stem,
+            phenopacket_path=phenopacket_path,
+            sample_id=phenopacket_util.sample_id(),
+            observed_phenotypes=[
+                hpo.type.id for hpo in phenopacket_util.observed_phenotypic_features()
+            ],
+            negated_phenotypes=[
+                hpo.type.id for hpo in phenopacket_util.negated_phenotypic_features()
+            ],
+            vcf_file_name=Path(vcf_files[0].uri).name if vcf_files else None,
+            vcf_assembly=vcf_files[0].file_attributes["genomeAssembly"] if vcf_files else None,
+            causative_genes=phenopacket_util.diagnosed_genes(),
+            causative_variants=phenopacket_util.diagnosed_variants(),
+            diseases=phenopacket_util.diagnoses(),
+        )
+
+    @classmethod
+    def read(cls, phenopacket_path: Path) -> "PhenopacketRecord":
+        """Parse a phenopacket and extract its record."""
+        return cls.from_phenopacket(phenopacket_path, phenopacket_reader(phenopacket_path))
+
+    def vcf_path(self, vcf_dir: Path) -> Path:
+        """
+        Return the path of the case VCF in vcf_dir, checking its format and genome assembly.
+        Args:
+            vcf_dir (Path): The directory holding the VCF files.
+        Returns:
+            Path: Path to the VCF file.
+        """
+        if self.vcf_file_name is None:
+            raise IncorrectFileFormatError(self.phenopacket_path, "phenopacket with a vcf file")
+        if not self.vcf_file_name.endswith(".vcf") and not self.vcf_file_name.endswith(".vcf.gz"):
+            raise IncorrectFileFormatError(Path(self.vcf_file_name), ".vcf or .vcf.gz file")
+        if self.vcf_assembly not in COMPATIBLE_GENOME_ASSEMBLIES:
+            raise IncompatibleGenomeAssemblyError(self.vcf_assembly, self.phenopacket_path)
+        return vcf_dir.joinpath(self.vcf_file_name)
+
+    def to_row(self) -> dict:
+        """Return the record as a row of the index table."""
+        stat = self.phenopacket_path.stat()
+        return {
+            "case_id": self.case_id,
+            "phenopacket_path": str(self.phenopacket_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sample_id": self.sample_id,
+            "observed_phenotypes": list(self.observed_phenotypes),
+            "negated_phenotypes": list(self.negated_phenotypes),
+            "vcf_file_name": self.vcf_file_name,
+            "vcf_assembly": self.vcf_assembly,
+            "causative_genes": [gene.__dict__ for gene in self.causative_genes],
+            "causative_variants": [variant.__dict__ for variant in self.causative_variants],
+            "diseases": [disease.__dict__ for disease in self.diseases],
+        }
+
+    @classmethod
+    def from_row(cls, row: dict) -> "PhenopacketRecord":
+        """Return the record stored in a row of the index table."""
+        return cls(
+            case_id=row["case_id"],
+            phenopacket_path=Path(row["phenopacket_path"]),
+            sample_id=row["sample_id"],
+            observed_phenotypes=row["observed_phenotypes"],
+            negated_phenotypes=row["negated_phenotypes"],
+            vcf_file_name=row["vcf_file_name"],
+            vcf_assembly=row["vcf_assembly"],
+            causative_genes=[ProbandCausativeGene(**gene) for gene in row["causative_genes"]],
+            causative_variants=[GenomicVariant(**variant) for variant in row["causative_variants"]],
+            diseases=[ProbandDisease(**disease) for disease in row["diseases"]],
+        )
+
+
+INDEX_SCHEMA = pl.Schema(
+    {
+        "case_id": pl.String,
+        "phenopacket_path": pl.String,
+        "size": pl.Int64,
+        "mtime_ns": pl.Int64,
+        "sample_id": pl.String,
+        "observed_phenotypes": pl.List(pl.String),
+        "negated_phenotypes": pl.List(pl.String),
+        "vcf_file_name": pl.String,
+        "vcf_assembly": pl.String,
+        "causative_genes": pl.List(
+            pl.Struct({"gene_symbol": pl.String, "gene_identifier": pl.String})
+        ),
+        "causative_variants": pl.List(
+            pl.Struct({"chrom": pl.String, "pos": pl.Int64, "ref": pl.String, "alt": pl.String})
+        ),
+        "diseases": pl.List(
+            pl.Struct({"disease_name": pl.String, "disease_identifier": pl.String})
+        ),
+    }
+)
+
+
+class PhenopacketIndex:
+    """
+    The records of a directory of phenopackets, so that each phenopacket is parsed only once.
+
+    The index can be stored as a Parquet sidecar, shared by the prepare and post-processing
+    stages; phenopackets added or modified since the sidecar was written are parsed again.
+    """
+
+    def __init__(self, records: dict[str, PhenopacketRecord]):
+        self.records = records
+
+    def __getitem__(self, case_id: str) -> PhenopacketRecord:
+        if case_id not in self.records:
+            raise FileNotFoundError(case_id + " not found in corpus!")
+        return self.records[case_id]
+
+    def __contains__(self, case_id: str) -> bool:
+        return case_id in self.records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records[case_id] for case_id in sorted(self.records))
+
+    def write(self, index_path: Path) -> None:
+        """Atomically write the index to a Parquet file."""
+        temporary_path = index_path.with_suffix(".tmp")
+        pl.DataFrame([record.to_row() for record in self], schema=INDEX_SCHEMA).write_parquet(
+            temporary_path
+        )
+        os.replace(temporary_path, index_path)
+
+    @classmethod
+    def read(cls, index_path: Path) -> "PhenopacketIndex":
+        """Read an index written with write, without checking it against the phenopackets."""
+        return cls(
+            {
+                row["case_id"]: PhenopacketRecord.from_row(row)
+                for row in pl.read_parquet(index_path).iter_rows(named=True)
+            }
+        )
+
+
+def _phenopacket_paths(phenopacket_dir: Path) -> list[Path]:
+    return sorted(path for path in phenopacket_dir.iterdir() if path.suffix == ".json")
+
+
+def load_phenopacket_index(
+    phenopacket_dir: Path, index_path: Path = None, status_path: Path = None
+) -> PhenopacketIndex:
+    """
+    Return the index of a phenopacket directory, reusing the sidecar at index_path where current.
+
+    Only phenopackets missing from the sidecar, or whose size or modification time changed since
+    it was written, are parsed; the sidecar is then rewritten.
+    Args:
+        phenopacket_dir (Path): The phenopacket directory.
+        index_path (Path): Path to the Parquet sidecar, or None to build the index in memory.
+        status_path (Path): Path to write the indexing progress to, if any.
+    Returns:
+        PhenopacketIndex: The records of every phenopacket in phenopacket_dir.
+    """
+    current = {}
+    if index_path is not None and index_path.exists():
+        current = {row["case_id"]: row for row in pl.read_parquet(index_path).iter_rows(named=True)}
+    records, parsed = {}, 0
+    phenopacket_paths = _phenopacket_paths(phenopacket_dir)
+    with ProgressReporter("prepare", len(phenopacket_paths), status_path) as progress:
+        for phenopacket_path in phenopacket_paths:
+            row = current.get(phenopacket_path.stem)
+            stat = phenopacket_path.stat()
+            if (
+                row is not None
+                and row["phenopacket_path"] == str(phenopacket_path)
+                and [row["size"], row["mtime_ns"]] == [stat.st_size, stat.st_mtime_ns]
+            ):
+                records[phenopacket_path.stem] = PhenopacketRecord.from_row(row)
+            else:
+                records[phenopacket_path.stem] = PhenopacketRecord.read(phenopacket_path)
+                parsed += 1
+            progress.update()
+    phenopacket_index = PhenopacketIndex(records)
+    if index_path is not None and (parsed or len(current) != len(records)):
+        print(f"indexed {parsed} phenopackets to {index_path}")
+        phenopacket_index.write(index_path)
+    return phenopacket_index
@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import polars as pl
+
+# tmpfs, where available, so that hand-off files live in shared memory rather than on disk
+SHARED_MEMORY_DIR = Path("/dev/shm")
+
+
+@contextmanager
+def handoff_directory() -> Iterator[Path]:
+    """Create a temporary directory for hand-off files, in shared memory where available."""
+    parent = SHARED_MEMORY_DIR if SHARED_MEMORY_DIR.is_dir() else None
+    handoff_dir = Path(tempfile.mkdtemp(prefix="pheval-lirical-", dir=parent))
+    try:
+        yield handoff_dir
+    finally:
+        shutil.rmtree(handoff_dir, ignore_errors=True)
+
+
+def write_frames(frames: dict[str, pl.DataFrame], handoff_dir: Path) -> dict[str, Path]:
+    """
+    Write DataFrames to uncompressed Arrow IPC files for another process to map.
+    Args:
+        frames (dict[str, pl.DataFrame]): The DataFrames to hand off, by name.
+        handoff_dir (Path): The directory shared with the receiving process.
+    Returns:
+        dict[str, Path]: The Arrow IPC file of each DataFrame, by name.
+    """
+    paths = {}
+    for name, frame in frames.items():
+        paths[name] = handoff_dir.joinpath(f"{uuid.uuid4().hex}-{name}.arrow")
+        frame.write_ipc(paths[name], compression="uncompressed")
+    return paths
+
+
+def read_frames(paths: dict[str, Path]) -> dict[str, pl.DataFrame]:
+    """
+    Memory-map DataFrames handed off with write_frames, then remove their files.
+
+    The columns are read in place from the mapped files rather than copied or deserialised. The
+    mappings outlive the removal of the files on POSIX systems; elsewhere the files are left for
+    handoff_directory to remove.
+    """
+    frames = {name: pl.read_ipc(path, memory_map=True) for name, path in paths.items()}
+    for path in paths.values():
+        try:
+            path.unlink()
+        except PermissionError:  # Windows, while mapped
+            pass
+    return frames
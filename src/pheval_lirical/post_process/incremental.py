@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from pheval.post_processing import post_processing
+from pheval.post_processing.phenopacket_truth_set import PhenopacketTruthSet
+from pheval.post_processing.post_processing import ResultType
+from pheval.utils.phenopacket_utils import GenomicVariant, ProbandCausativeGene, ProbandDisease
+
+from pheval_lirical.phenopacket_index import PhenopacketIndex
+
+MANIFEST_FILE_NAME = "pheval_lirical_post_process_manifest.json"
+
+
+def output_file(output_dir: Path, result_type: ResultType, result_name: str) -> Path:
+    """Return the PhEval result file written for a raw result and result type."""
+    return output_dir.joinpath(
+        f"pheval_{result_type.value}_results", f"{result_name}-{result_type.value}_result.parquet"
+    )
+
+
+def file_sha256(path: Path) -> str:
+    """Return the sha256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PostProcessManifest:
+    """
+    Record of the raw results already standardised, so that unchanged results can be skipped.
+
+    Each raw result is stored by result name with its modification time, size and sha256
+    checksum, along with the post-processing configuration it was standardised with. A Parquet
+    conversion of a recorded raw result is current for as long as the recorded raw result is.
+    """
+
+    def __init__(self, manifest_path: Path, config: dict):
+        self.manifest_path = manifest_path
+        self.config = config
+        self.entries = {}
+        if manifest_path.exists():
+            with open(manifest_path) as manifest_file:
+                self.entries = json.load(manifest_file)["results"]
+
+    def is_current(self, raw_result: Path, result_name: str, outputs: list[Path]) -> bool:
+        """
+        Return whether a raw result was already standardised, unchanged, with this configuration.
+        Args:
+            raw_result (Path): Path to the raw result.
+            result_name (str): Name of the raw result.
+            outputs (list[Path]): The PhEval result files expected for the raw result.
+        Returns:
+            bool: True if the raw result can be skipped.
+        """
+        entry = self.entries.get(result_name)
+        if entry is None or entry["config"] != self.config:
+            return False
+        if not all(output.exists() for output in outputs):
+            return False
+        if entry["path"] != raw_result.name:
+            if not raw_result.name.endswith(".parquet"):
+                return False
+            # the Parquet conversion of the recorded raw result, current while that is unchanged
+            raw_result = raw_result.with_name(entry["path"])
+            if not raw_result.exists():
+                return False
+        stat = raw_result.stat()
+        if [entry["size"], entry["mtime_ns"]] == [stat.st_size, stat.st_mtime_ns]:
+            return True
+        if entry["size"] == stat.st_size:
+            # touched but possibly unchanged, so fall back to the checksum
+            if entry["sha256"] == file_sha256(raw_result):
+                entry["mtime_ns"] = stat.st_mtime_ns
+                return True
+        return False
+
+    def record(self, raw_result: Path, result_name: str, summary: dict = None) -> None:
+        """
+        Record a raw result as standardised with the current configuration.
+        Args:
+            raw_result (Path): Path to the raw result.
+            result_name (str): Name of the raw result.
+            summary (dict): The state of the post-processing summary of the raw result, if any.
+        """
+        stat = raw_result.stat()
+        self.entries[result_name] = {
+            "path": raw_result.name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(raw_result),
+            "config": self.config,
+        }
+        if summary is not None:
+            self.entries[result_name]["summary"] = summary
+
+    def save(self) -> None:
+        """Atomically write the manifest."""
+        temporary_path = self.manifest_path.with_suffix(".tmp")
+        with open(temporary_path, "w") as manifest_file:
+            json.dump({"results": self.entries}, manifest_file, indent=2)
+        os.replace(temporary_path, self.manifest_path)
+
+
+class IndexedPhenopacketTruthSet(PhenopacketTruthSet):
+    """
+    pheval's phenopacket truth set, reading causative entities from a phenopacket index.
+
+    This overrides private pheval methods, which is why pheval is pinned to an exact version.
+    """
+
+    def __init__(self, phenopacket_index: PhenopacketIndex):
+        super().__init__(phenopacket_dir=None)
+        self.phenopacket_index = phenopacket_index
+
+    def _get_causative_genes(self, phenopacket_name: str) -> list[ProbandCausativeGene]:
+        return self.phenopacket_index[phenopacket_name].causative_genes
+
+    def _get_causative_variants(self, phenopacket_name: str) -> list[GenomicVariant]:
+        return self.phenopacket_index[phenopacket_name].causative_variants
+
+    def _get_causative_diseases(self, phenopacket_name: str) -> list[ProbandDisease]:
+        return self.phenopacket_index[phenopacket_name].diseases
+
+
+def write_classified_result(
+    phenopacket_index: PhenopacketIndex,
+    output_dir: Path,
+    result_type: ResultType,
+    result_name: str,
+) -> None:
+    """
+    Write the classified (known causative) entities of a case as its placeholder PhEval result.
+
+    pheval merges ranked results into this placeholder, so it has to be in place, and not hold a
+    previous ranking, before a raw result is standardised.
+    """
+    truth_set = IndexedPhenopacketTruthSet(phenopacket_index)
+    classify_method, write_method = post_processing._get_result_type(result_type, truth_set)
+    write_method(classify_method(result_name), output_file(output_dir, result_type, result_name))
+
+
+def write_classified_outputs(
+    phenopacket_index: PhenopacketIndex,
+    output_dir: Path,
+    result_types: list[ResultType],
+    missing_only: bool = False,
+) -> None:
+    """
+    Replace pheval's one-off writing of placeholder results for the whole corpus.
+
+    pheval writes a placeholder result for every phenopacket the first time a result type is
+    generated in a process, parsing every phenopacket again. Instead, placeholders are written
+    from the phenopacket index; with missing_only, only for phenopackets that have no output yet,
+    so that the outputs of raw results skipped by incremental post-processing are kept.
+    """
+    for result_type in result_types:
+        post_processing.executed_results.add(result_type)
+        output_dir.joinpath(f"pheval_{result_type.value}_results").mkdir(
+            parents=True, exist_ok=True
+        )
+        for phenopacket_record in phenopacket_index:
+            if (
+                missing_only
+                and output_file(output_dir, result_type, phenopacket_record.case_id).exists()
+            ):
+                continue
+            write_classified_result(
+                phenopacket_index, output_dir, result_type, phenopacket_record.case_id
+            )
@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import click
+
 from pheval_lirical.post_process.post_process_results_format import create_standardised_results
 from pheval_lirical.tool_specific_configuration_parser import LIRICALToolSpecificConfigurations
 
@@ -12,6 +14,8 @@ def post_process_results_format(
     disease_analysis: bool,
     gene_analysis: bool,
     variant_analysis: bool,
+    phenopacket_index_path: Path = None,
+    status_path: Path = None,
 ):
     """Create pheval gene and variant result from LIRICAL tsv output."""
     print("...creating pheval results format...")
@@ -23,5 +27,150 @@ def post_process_results_format(
         disease_analysis=disease_analysis,
         gene_analysis=gene_analysis,
         variant_analysis=variant_analysis,
+        convert_to_parquet=config.post_process.convert_raw_results_to_parquet,
+        incremental=(config.post_process.incremental or config.execution.stream_post_processing),
+        max_rank=config.post_process.max_rank,
+        variant_reducer=config.post_process.variant_reducer,
+        phenopacket_index_path=phenopacket_index_path,
+        status_path=status_path,
+        workers=config.post_process.workers,
     )
     print("done")
+
+
+@click.command("post-process")
+@click.option(
+    "--raw-results-dir",
+    "-r",
+    required=True,
+    help="Path to LIRICAL tsv results.",
+    type=Path,
+)
+@click.option("--output-dir", "-o", required=True, help="Path to output directory.", type=Path)
+@click.option("--phenopacket-dir", "-p", required=True, help="Path to phenopackets.", type=Path)
+@click.option(
+    "--sort-order",
+    "-s",
+    required=False,
+    default="descending",
+    show_default=True,
+    help="Ordering of results for ranking.",
+    type=click.Choice(["ascending", "descending"]),
+)
+@click.option(
+    "--disease-analysis/--no-disease-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for disease prioritisation",
+)
+@click.option(
+    "--gene-analysis/--no-gene-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for gene prioritisation",
+)
+@click.option(
+    "--variant-analysis/--no-variant-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for variant prioritisation",
+)
+@click.option(
+    "--convert-to-parquet/--no-convert-to-parquet",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Convert raw LIRICAL tsv results to Parquet for faster later passes.",
+)
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Only post-process raw results that are new or changed since the last pass.",
+)
+@click.option(
+    "--max-rank",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+    help="Only standardise LIRICAL results ranked within this rank.",
+)
+@click.option(
+    "--variant-reducer",
+    required=False,
+    default="none",
+    show_default=True,
+    type=click.Choice(["best_score", "best_rank", "none"]),
+    help="How to collapse a variant listed under several LIRICAL diagnoses.",
+)
+@click.option(
+    "--phenopacket-index",
+    required=False,
+    default=None,
+    help="Parquet sidecar to read the phenopackets from, and index them to.",
+    type=Path,
+)
+@click.option(
+    "--status-file",
+    required=False,
+    default=None,
+    help="JSON file to periodically write post-processing progress to.",
+    type=Path,
+)
+@click.option(
+    "--workers",
+    required=False,
+    default=1,
+    show_default=True,
+    help="Number of processes to extract results with.",
+    type=click.IntRange(min=1),
+)
+def post_process_command(
+    raw_results_dir: Path,
+    output_dir: Path,
+    phenopacket_dir: Path,
+    sort_order: str,
+    disease_analysis: bool,
+    gene_analysis: bool,
+    variant_analysis: bool,
+    convert_to_parquet: bool,
+    incremental: bool,
+    max_rank: int,
+    variant_reducer: str,
+    phenopacket_index: Path,
+    status_file: Path,
+    workers: int,
+):
+    """Create PhEval results from LIRICAL tsv output."""
+    for analysis, result_type in [
+        (disease_analysis, "disease"),
+        (gene_analysis, "gene"),
+        (variant_analysis, "variant"),
+    ]:
+        if analysis:
+            output_dir.joinpath(f"pheval_{result_type}_results").mkdir(parents=True, exist_ok=True)
+    create_standardised_results(
+        raw_results_dir=raw_results_dir,
+        output_dir=output_dir,
+        phenopacket_dir=phenopacket_dir,
+        sort_order=sort_order,
+        disease_analysis=disease_analysis,
+        gene_analysis=gene_analysis,
+        variant_analysis=variant_analysis,
+        convert_to_parquet=convert_to_parquet,
+        incremental=incremental,
+        max_rank=max_rank,
+        variant_reducer=None if variant_reducer == "none" else variant_reducer,
+        phenopacket_index_path=phenopacket_index,
+        status_path=status_file,
+        workers=workers,
+    )
@@ -1,28 +1,165 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
 import polars as pl
-from pheval.post_processing.phenopacket_truth_set import calculate_end_pos
 from pheval.post_processing.post_processing import (
+    ResultType,
     SortOrder,
     generate_disease_result,
     generate_gene_result,
     generate_variant_result,
 )
-from pheval.utils.file_utils import files_with_suffix
 from pheval.utils.phenopacket_utils import (
     GeneIdentifierUpdater,
     create_gene_identifier_map,
 )
 
+from pheval_lirical import metrics
+from pheval_lirical.phenopacket_index import load_phenopacket_index
+from pheval_lirical.post_process.handoff import handoff_directory, read_frames, write_frames
+from pheval_lirical.post_process.incremental import (
+    MANIFEST_FILE_NAME,
+    PostProcessManifest,
+    output_file,
+    write_classified_outputs,
+    write_classified_result,
+)
+from pheval_lirical.post_process.summary import SUMMARY_FILE_NAME, PostProcessSummary
+from pheval_lirical.progress import ProgressReporter
 
-def read_lirical_result(lirical_result_path: Path) -> pl.DataFrame:
-    """Read LIRICAL tsv output and return a dataframe."""
+RAW_RESULT_SUFFIXES = [".parquet", ".tsv", ".tsv.gz", ".tsv.zst"]
+LIRICAL_RESULT_SCHEMA_OVERRIDES = {"rank": pl.Utf8, "compositeLR": pl.Utf8}
+COMPACT_VARIANT_SCHEMA = pl.Schema(
+    {
+        "chrom": pl.Categorical(),
+        "start": pl.Int32,
+        "end": pl.Int32,
+        "ref": pl.Categorical(),
+        "alt": pl.Categorical(),
+        "score": pl.Float64,
+    }
+)
+VARIANT_KEY = ["chrom", "start", "ref", "alt"]
+VARIANT_REDUCERS = ["best_score", "best_rank"]
+
+
+def raw_result_name(lirical_result_path: Path) -> str:
+    """
+    Return the name of a raw LIRICAL result without its format suffixes.
+    Args:
+        lirical_result_path (Path): Path to a LIRICAL result in any supported format.
+    Returns:
+        str: The result name, matching the phenopacket file stem.
+    """
+    for suffix in RAW_RESULT_SUFFIXES:
+        if lirical_result_path.name.endswith(suffix):
+            return lirical_result_path.name[: -len(suffix)]
+    return lirical_result_path.stem
+
+
+def raw_result_files(raw_results_dir: Path) -> list[Path]:
+    """
+    Return a single raw LIRICAL result per case from a directory.
+
+    A case may have its tsv output alongside a compressed copy or a Parquet conversion; the
+    Parquet conversion is preferred unless the tsv was written after it, then the tsv, then
+    compressed tsv.
+    Args:
+        raw_results_dir (Path): Directory of raw LIRICAL results.
+    Returns:
+        list[Path]: The raw result to read for each case, sorted by result name.
+    """
+    results = {}
+    for path in sorted(raw_results_dir.iterdir()):
+        if not any(path.name.endswith(suffix) for suffix in RAW_RESULT_SUFFIXES):
+            continue
+        results.setdefault(raw_result_name(path), []).append(path)
+    preferred_results = []
+    for name, paths in sorted(results.items()):
+        paths.sort(
+            key=lambda path: next(
+                i for i, suffix in enumerate(RAW_RESULT_SUFFIXES) if path.name.endswith(suffix)
+            )
+        )
+        preferred, *others = paths
+        if preferred.name.endswith(".parquet") and any(
+            other.stat().st_mtime > preferred.stat().st_mtime for other in others
+        ):
+            preferred = others[0]
+        preferred_results.append(preferred)
+    return preferred_results
+
+
+def scan_lirical_result(lirical_result_path: Path) -> pl.LazyFrame:
+    """
+    Lazily read LIRICAL output, either as tsv, gzip/zstd compressed tsv or its Parquet conversion.
+
+    Uncompressed tsv and Parquet files are scanned directly from the memory-mapped file; compressed
+    tsv files are decompressed in memory.
+    Args:
+        lirical_result_path (Path): Path to the LIRICAL result.
+    Returns:
+        pl.LazyFrame: The LIRICAL result.
+    """
+    if lirical_result_path.name.endswith(".parquet"):
+        return pl.scan_parquet(lirical_result_path)
+    if lirical_result_path.name.endswith(".tsv"):
+        return pl.scan_csv(
+            lirical_result_path,
+            separator="\t",
+            comment_prefix="!",
+            schema_overrides=LIRICAL_RESULT_SCHEMA_OVERRIDES,
+        )
     return pl.read_csv(
         lirical_result_path,
         separator="\t",
         comment_prefix="!",
-        schema_overrides={"rank": pl.Utf8, "compositeLR": pl.Utf8},
-    )
+        schema_overrides=LIRICAL_RESULT_SCHEMA_OVERRIDES,
+    ).lazy()
+
+
+def read_lirical_result(lirical_result_path: Path) -> pl.DataFrame:
+    """Read LIRICAL tsv output and return a dataframe."""
+    return scan_lirical_result(lirical_result_path).collect()
+
+
+def raw_result_parquet_path(lirical_result_path: Path) -> Path:
+    """Return the path of the Parquet conversion of a raw LIRICAL result."""
+    return lirical_result_path.parent.joinpath(f"{raw_result_name(lirical_result_path)}.parquet")
+
+
+def convert_raw_result_to_parquet(lirical_result_path: Path) -> Path:
+    """
+    Convert a raw LIRICAL result to a Parquet file alongside it, for faster later reads.
+    Args:
+        lirical_result_path (Path): Path to the LIRICAL tsv result.
+    Returns:
+        Path: Path to the Parquet conversion.
+    """
+    parquet_path = raw_result_parquet_path(lirical_result_path)
+    scan_lirical_result(lirical_result_path).sink_parquet(parquet_path, compression="zstd")
+    return parquet_path
+
+
+def filter_top_ranked(lirical_result: pl.LazyFrame, max_rank: int = None) -> pl.LazyFrame:
+    """
+    Keep only the LIRICAL differential diagnoses ranked within max_rank.
+
+    Filtering the lazy plan lets the predicate be pushed into the scan, so lower ranked rows are
+    never materialised, exploded into variants or mapped to gene identifiers.
+    Args:
+        lirical_result (pl.LazyFrame): LIRICAL results.
+        max_rank (int): The lowest LIRICAL rank to keep, or None to keep every row.
+    Returns:
+        pl.LazyFrame: The top ranked LIRICAL results.
+    """
+    if max_rank is None:
+        return lirical_result
+    return lirical_result.filter(pl.col("rank").cast(pl.Int64, strict=False) <= max_rank)
 
 
 def extract_disease_results(raw_result: pl.DataFrame) -> pl.DataFrame:
@@ -80,46 +217,369 @@ def extract_gene_results(
     )
 
 
-def extract_variant_results(raw_result: pl.DataFrame) -> pl.DataFrame:
+def aggregate_variant_results(
+    variant_results: pl.LazyFrame, variant_reducer: str, sort_order: SortOrder
+) -> pl.LazyFrame:
+    """
+    Collapse variants listed under several LIRICAL differential diagnoses into a single result.
+    Args:
+        variant_results (pl.LazyFrame): Exploded variant results, with the LIRICAL rank of each row.
+        variant_reducer (str): Keep the best score of a variant ("best_score"), or the score of its
+            best ranked LIRICAL diagnosis ("best_rank").
+        sort_order (SortOrder): The sort order scores are ranked with.
+    Returns:
+        pl.LazyFrame: A single result per (chrom, start, ref, alt).
+    """
+    if variant_reducer == "best_score":
+        score = (
+            pl.col("score").max() if sort_order == SortOrder.DESCENDING else pl.col("score").min()
+        )
+    elif variant_reducer == "best_rank":
+        score = pl.col("score").sort_by("rank").first()
+    else:
+        raise ValueError(
+            f"Unknown variant reducer {variant_reducer}, expected one of {VARIANT_REDUCERS}."
+        )
+    return variant_results.group_by(VARIANT_KEY, maintain_order=True).agg(
+        [pl.col("end").first(), score.alias("score"), pl.col("rank").min()]
+    )
+
+
+def extract_variant_results(
+    raw_result: pl.DataFrame,
+    variant_reducer: str = None,
+    sort_order: SortOrder = SortOrder.DESCENDING,
+) -> pl.DataFrame:
     """
     Extract variant results from LIRICAL results.
+
+    Variants are held in a compact schema, with categorical chromosome and alleles and 32-bit
+    coordinates; convert them with to_pheval_variant_schema before handing them to pheval.
     Args:
         raw_result (pl.DataFrame): LIRICAL results dataframe.
+        variant_reducer (str): How to collapse a variant listed under several diagnoses, see
+            aggregate_variant_results. Duplicates are kept if None.
+        sort_order (SortOrder): The sort order scores are ranked with.
     Returns:
-        pl.DataFrame: The extracted results.
+        pl.DataFrame: The extracted results, following COMPACT_VARIANT_SCHEMA.
     """
-    return (
-        raw_result.with_columns([pl.col("variants").str.split("; ").alias("variant_list")])
-        .explode("variant_list")
-        .rename({"variant_list": "variant"})
-        .drop("variants")
-        .with_columns(
+    variant_results = (
+        raw_result.lazy()
+        .select(
             [
-                pl.col("variant").str.extract(r"^(\d+):", 1).alias("chrom"),
-                pl.col("variant").str.extract(r":(\d+)", 1).cast(pl.Int64).alias("pos"),
-                pl.col("variant").str.extract(r"([ACGT]+)>([ACGT]+)", 1).alias("ref"),
-                pl.col("variant").str.extract(r"([ACGT]+)>([ACGT]+)", 2).alias("alt"),
+                pl.col("variants").str.split("; ").alias("variant"),
+                pl.col("rank").cast(pl.Int64, strict=False),
                 pl.when(pl.col("compositeLR") == "-∞")
                 .then(float("-inf"))
                 .otherwise(pl.col("compositeLR"))
-                .alias("score")
-                .cast(pl.Float64),
+                .cast(pl.Float64)
+                .alias("score"),
+            ]
+        )
+        .explode("variant")
+        .select(
+            [
+                pl.col("variant").str.extract(r"^(\d+):", 1).cast(pl.Categorical).alias("chrom"),
+                pl.col("variant").str.extract(r":(\d+)", 1).cast(pl.Int32).alias("start"),
+                pl.col("variant").str.extract(r"([ACGT]+)>([ACGT]+)", 1).alias("ref"),
+                pl.col("variant").str.extract(r"([ACGT]+)>([ACGT]+)", 2).alias("alt"),
+                pl.col("score"),
+                pl.col("rank"),
             ]
         )
         .select(
             [
-                pl.col("chrom").cast(pl.String),
-                pl.col("pos").alias("start").cast(pl.Int64),
-                pl.struct("pos", "ref")
-                .map_elements(lambda x: calculate_end_pos(x["pos"], x["ref"]))
-                .alias("end")
-                .cast(pl.String),
-                pl.col("ref").cast(pl.String),
-                pl.col("alt").cast(pl.String),
-                pl.col("score").cast(pl.Float64),
+                pl.col("chrom"),
+                pl.col("start"),
+                (pl.col("start") + pl.col("ref").str.len_bytes().cast(pl.Int32) - 1).alias("end"),
+                pl.col("ref").cast(pl.Categorical),
+                pl.col("alt").cast(pl.Categorical),
+                pl.col("score"),
+                pl.col("rank"),
             ]
         )
     )
+    if variant_reducer is not None:
+        variant_results = aggregate_variant_results(variant_results, variant_reducer, sort_order)
+    return variant_results.select(COMPACT_VARIANT_SCHEMA.names()).collect()
+
+
+def to_pheval_variant_schema(variant_results: pl.DataFrame) -> pl.DataFrame:
+    """
+    Convert compact variant results to the column types pheval expects.
+    Args:
+        variant_results (pl.DataFrame): Variant results following COMPACT_VARIANT_SCHEMA.
+    Returns:
+        pl.DataFrame: The variant results, with string chromosome and alleles and 64-bit coordinates.
+    """
+    return variant_results.with_columns(
+        [
+            pl.col("chrom", "ref", "alt").cast(pl.String),
+            pl.col("start", "end").cast(pl.Int64),
+        ]
+    )
+
+
+RESULT_GENERATORS = {
+    ResultType.GENE: generate_gene_result,
+    ResultType.VARIANT: generate_variant_result,
+    ResultType.DISEASE: generate_disease_result,
+}
+
+
+def extract_standardised_results(
+    raw_result: Path,
+    sort_order: SortOrder,
+    gene_identifier_updater: GeneIdentifierUpdater,
+    result_types: list[ResultType],
+    convert_to_parquet: bool = False,
+    max_rank: int = None,
+    variant_reducer: str = None,
+) -> tuple[dict[ResultType, pl.DataFrame], int]:
+    """
+    Extract the PhEval results of each result type from a single raw LIRICAL result.
+    Args:
+        raw_result (Path): Path to the raw LIRICAL result.
+        sort_order (SortOrder): The sort order to rank results with.
+        gene_identifier_updater (GeneIdentifierUpdater): GeneIdentifierUpdater object.
+        result_types (list[ResultType]): The result types to extract.
+        convert_to_parquet (bool): Whether to convert a tsv raw result to Parquet.
+        max_rank (int): Only standardise LIRICAL results ranked within max_rank.
+        variant_reducer (str): How to collapse a variant listed under several diagnoses.
+    Returns:
+        tuple[dict[ResultType, pl.DataFrame], int]: The results by type, and the raw rows read.
+    """
+    scan_path = raw_result
+    if convert_to_parquet and not raw_result.name.endswith(".parquet"):
+        scan_path = convert_raw_result_to_parquet(raw_result)
+    lirical_result = filter_top_ranked(scan_lirical_result(scan_path), max_rank).collect()
+    results = {}
+    if ResultType.GENE in result_types:
+        results[ResultType.GENE] = extract_gene_results(lirical_result, gene_identifier_updater)
+    if ResultType.VARIANT in result_types:
+        results[ResultType.VARIANT] = to_pheval_variant_schema(
+            extract_variant_results(lirical_result, variant_reducer, sort_order)
+        )
+    if ResultType.DISEASE in result_types:
+        results[ResultType.DISEASE] = extract_disease_results(lirical_result)
+    return results, lirical_result.height
+
+
+def write_standardised_results(
+    results: dict[ResultType, pl.DataFrame],
+    raw_result: Path,
+    output_dir: Path,
+    phenopacket_dir: Path,
+    sort_order: SortOrder,
+) -> None:
+    """Rank, classify and write the PhEval results extracted from a raw LIRICAL result."""
+    result = raw_result.parent.joinpath(f"{raw_result_name(raw_result)}.tsv")
+    for result_type, pheval_result in results.items():
+        RESULT_GENERATORS[result_type](
+            results=pheval_result,
+            output_dir=output_dir,
+            sort_order=sort_order,
+            result_path=result,
+            phenopacket_dir=phenopacket_dir,
+        )
+
+
+def record_rows(rows: int, seconds: float) -> None:
+    """Record the raw result rows post-processed, and how fast, in the metrics."""
+    metrics.POST_PROCESS_ROWS.inc(rows)
+    metrics.POST_PROCESS_ROWS_PER_SECOND.set(rows / max(seconds, 1e-9))
+
+
+def standardise_result(
+    raw_result: Path,
+    output_dir: Path,
+    phenopacket_dir: Path,
+    sort_order: SortOrder,
+    gene_identifier_updater: GeneIdentifierUpdater,
+    disease_analysis: bool,
+    gene_analysis: bool,
+    variant_analysis: bool,
+    convert_to_parquet: bool = False,
+    max_rank: int = None,
+    variant_reducer: str = None,
+) -> PostProcessSummary:
+    """
+    Write standardised results for a single raw LIRICAL result.
+    Args:
+        raw_result (Path): Path to the raw LIRICAL result.
+        output_dir (Path): Path to the output directory.
+        phenopacket_dir (Path): Path to the phenopacket directory.
+        sort_order (SortOrder): The sort order to rank results with.
+        gene_identifier_updater (GeneIdentifierUpdater): GeneIdentifierUpdater object.
+        disease_analysis (bool): Whether to write disease results.
+        gene_analysis (bool): Whether to write gene results.
+        variant_analysis (bool): Whether to write variant results.
+        convert_to_parquet (bool): Whether to convert a tsv raw result to Parquet.
+        max_rank (int): Only standardise LIRICAL results ranked within max_rank.
+        variant_reducer (str): How to collapse a variant listed under several diagnoses.
+    Returns:
+        PostProcessSummary: The post-processing summary of the raw result.
+    """
+    start = time.perf_counter()
+    results, rows = extract_standardised_results(
+        raw_result,
+        sort_order,
+        gene_identifier_updater,
+        analysis_result_types(disease_analysis, gene_analysis, variant_analysis),
+        convert_to_parquet,
+        max_rank,
+        variant_reducer,
+    )
+    write_standardised_results(results, raw_result, output_dir, phenopacket_dir, sort_order)
+    record_rows(rows, time.perf_counter() - start)
+    summary = PostProcessSummary()
+    summary.update(raw_result_name(raw_result), results, rows, sort_order)
+    return summary
+
+
+_worker_gene_identifier_updater = None
+
+
+def _init_extraction_worker(gene_analysis: bool) -> None:
+    global _worker_gene_identifier_updater
+    if gene_analysis:
+        _worker_gene_identifier_updater = GeneIdentifierUpdater(
+            gene_identifier="ensembl_id", identifier_map=create_gene_identifier_map()
+        )
+
+
+def _extract_to_handoff(
+    raw_result: Path,
+    handoff_dir: Path,
+    sort_order: SortOrder,
+    result_types: list[ResultType],
+    *args,
+) -> tuple[dict[str, Path], int, float]:
+    """Extract the PhEval results of a raw result in a worker, handing them off as Arrow IPC."""
+    start = time.perf_counter()
+    results, rows = extract_standardised_results(
+        raw_result, sort_order, _worker_gene_identifier_updater, result_types, *args
+    )
+    paths = write_frames(
+        {result_type.value: pheval_result for result_type, pheval_result in results.items()},
+        handoff_dir,
+    )
+    return paths, rows, time.perf_counter() - start
+
+
+def extracted_results(
+    raw_results: list[Path],
+    workers: int,
+    sort_order: SortOrder,
+    result_types: list[ResultType],
+    convert_to_parquet: bool = False,
+    max_rank: int = None,
+    variant_reducer: str = None,
+) -> Iterator[tuple[Path, dict[ResultType, pl.DataFrame], int, float]]:
+    """
+    Extract the PhEval results of raw LIRICAL results, in order, with workers processes.
+
+    Worker processes hand their results back as uncompressed Arrow IPC files in shared memory,
+    which are memory-mapped rather than unpickled, so that no copy of a result is made on the
+    way back. At most two results per worker are extracted ahead of the caller.
+    Args:
+        raw_results (list[Path]): Paths to the raw LIRICAL results.
+        workers (int): The number of processes to extract results with; 1 extracts in-process.
+        sort_order (SortOrder): The sort order to rank results with.
+        result_types (list[ResultType]): The result types to extract.
+        convert_to_parquet (bool): Whether to convert tsv raw results to Parquet.
+        max_rank (int): Only standardise LIRICAL results ranked within max_rank.
+        variant_reducer (str): How to collapse a variant listed under several diagnoses.
+    Yields:
+        tuple[Path, dict[ResultType, pl.DataFrame], int, float]: Each raw result, its PhEval
+        results by type, the raw rows read and the seconds spent extracting them.
+    """
+    options = (convert_to_parquet, max_rank, variant_reducer)
+    if workers <= 1:
+        gene_identifier_updater = (
+            GeneIdentifierUpdater(
+                gene_identifier="ensembl_id", identifier_map=create_gene_identifier_map()
+            )
+            if ResultType.GENE in result_types
+            else None
+        )
+        for raw_result in raw_results:
+            start = time.perf_counter()
+            results, rows = extract_standardised_results(
+                raw_result, sort_order, gene_identifier_updater, result_types, *options
+            )
+            yield raw_result, results, rows, time.perf_counter() - start
+        return
+    with (
+        handoff_directory() as handoff_dir,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            # forking a process running polars' thread pool can deadlock the child
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_extraction_worker,
+            initargs=(ResultType.GENE in result_types,),
+        ) as executor,
+    ):
+        pending = deque()
+
+        def receive() -> tuple[Path, dict[ResultType, pl.DataFrame], int, float]:
+            raw_result, future = pending.popleft()
+            paths, rows, seconds = future.result()
+            results = {ResultType(name): frame for name, frame in read_frames(paths).items()}
+            return raw_result, results, rows, seconds
+
+        for raw_result in raw_results:
+            pending.append(
+                (
+                    raw_result,
+                    executor.submit(
+                        _extract_to_handoff,
+                        raw_result,
+                        handoff_dir,
+                        sort_order,
+                        result_types,
+                        *options,
+                    ),
+                )
+            )
+            if len(pending) >= 2 * workers:
+                yield receive()
+        while pending:
+            yield receive()
+
+
+def analysis_result_types(
+    disease_analysis: bool, gene_analysis: bool, variant_analysis: bool
+) -> list[ResultType]:
+    """Return the PhEval result types of the enabled analyses."""
+    return [
+        result_type
+        for analysis, result_type in [
+            (gene_analysis, ResultType.GENE),
+            (variant_analysis, ResultType.VARIANT),
+            (disease_analysis, ResultType.DISEASE),
+        ]
+        if analysis
+    ]
+
+
+def post_process_manifest(
+    output_dir: Path,
+    sort_order: str,
+    result_types: list[ResultType],
+    max_rank: int = None,
+    variant_reducer: str = None,
+) -> PostProcessManifest:
+    """Return the post-processing manifest of an output directory for a configuration."""
+    return PostProcessManifest(
+        output_dir.joinpath(MANIFEST_FILE_NAME),
+        config={
+            "sort_order": sort_order.lower(),
+            "result_types": [result_type.value for result_type in result_types],
+            "max_rank": max_rank,
+            "variant_reducer": variant_reducer,
+        },
+    )
 
 
 def create_standardised_results(
@@ -130,39 +590,99 @@ def create_standardised_results(
     disease_analysis: bool,
     gene_analysis: bool,
     variant_analysis: bool,
+    convert_to_parquet: bool = False,
+    incremental: bool = False,
+    max_rank: int = None,
+    variant_reducer: str = None,
+    phenopacket_index_path: Path = None,
+    status_path: Path = None,
+    workers: int = 1,
 ) -> None:
-    """Write standardised gene and variant results from LIRICAL tsv output."""
-    gene_identifier_updater = GeneIdentifierUpdater(
-        gene_identifier="ensembl_id",
-        identifier_map=create_gene_identifier_map(),
+    """
+    Write standardised gene and variant results from LIRICAL tsv output.
+
+    Raw results may be gzip/zstd compressed. With convert_to_parquet, each tsv result read is
+    also converted to Parquet, which later post-processing passes read instead. With incremental,
+    raw results already standardised with the same configuration and unchanged since, according
+    to the post-processing manifest in output_dir, are skipped. With max_rank, only LIRICAL
+    results ranked within max_rank are standardised. With variant_reducer, a variant listed under
+    several LIRICAL diagnoses is collapsed into a single variant result. The known causative
+    entities of each case are read from the phenopacket index sidecar at phenopacket_index_path,
+    when given, rather than parsed again from the phenopackets. With status_path, progress is
+    periodically written to that status file. With workers greater than one, results are
+    extracted by that many processes and handed back through shared memory, and written here.
+
+    Corpus statistics (cases of the phenopacket index without a raw result, cases with and without
+    results, result counts and score distributions) are accumulated as each raw result is standardised and written to a summary file in
+    output_dir. Raw results skipped by incremental post-processing contribute the statistics
+    recorded for them in the manifest.
+    """
+    result_types = analysis_result_types(disease_analysis, gene_analysis, variant_analysis)
+    raw_results = raw_result_files(raw_results_dir)
+    phenopacket_index = load_phenopacket_index(phenopacket_dir, phenopacket_index_path)
+    summary = PostProcessSummary()
+    summary.add_corpus(
+        [phenopacket_record.case_id for phenopacket_record in phenopacket_index],
+        [raw_result_name(raw_result) for raw_result in raw_results],
+    )
+    manifest = None
+    if incremental:
+        manifest = post_process_manifest(
+            output_dir, sort_order, result_types, max_rank, variant_reducer
+        )
+        changed_results, unsummarised = [], 0
+        for raw_result in raw_results:
+            result_name = raw_result_name(raw_result)
+            outputs = [
+                output_file(output_dir, result_type, result_name) for result_type in result_types
+            ]
+            if not manifest.is_current(raw_result, result_name, outputs):
+                changed_results.append(raw_result)
+            elif "summary" in manifest.entries[result_name]:
+                summary.merge(
+                    PostProcessSummary.from_state(manifest.entries[result_name]["summary"])
+                )
+            else:
+                unsummarised += 1
+        raw_results = changed_results
+        print(f"{len(raw_results)} new or changed raw results to post-process")
+        if unsummarised:
+            print(f"{unsummarised} unchanged raw results have no statistics for the summary")
+        if not raw_results:
+            manifest.save()
+            summary.write(output_dir.joinpath(SUMMARY_FILE_NAME))
+            return
+    write_classified_outputs(
+        phenopacket_index, output_dir, result_types, missing_only=manifest is not None
     )
     sort_order = SortOrder.ASCENDING if sort_order.lower() == "ascending" else SortOrder.DESCENDING
-    for result in files_with_suffix(raw_results_dir, ".tsv"):
-        lirical_result = read_lirical_result(result)
-        if gene_analysis:
-            pheval_gene_result = extract_gene_results(lirical_result, gene_identifier_updater)
-            generate_gene_result(
-                results=pheval_gene_result,
-                output_dir=output_dir,
-                sort_order=sort_order,
-                result_path=result,
-                phenopacket_dir=phenopacket_dir,
-            )
-        if variant_analysis:
-            pheval_variant_result = extract_variant_results(lirical_result)
-            generate_variant_result(
-                results=pheval_variant_result,
-                output_dir=output_dir,
-                sort_order=sort_order,
-                result_path=result,
-                phenopacket_dir=phenopacket_dir,
-            )
-        if disease_analysis:
-            pheval_disease_result = extract_disease_results(lirical_result)
-            generate_disease_result(
-                results=pheval_disease_result,
-                output_dir=output_dir,
-                sort_order=sort_order,
-                result_path=result,
-                phenopacket_dir=phenopacket_dir,
-            )
+    progress = ProgressReporter("post-process", len(raw_results), status_path)
+    try:
+        for raw_result, results, rows, seconds in extracted_results(
+            raw_results,
+            workers,
+            sort_order,
+            result_types,
+            convert_to_parquet,
+            max_rank,
+            variant_reducer,
+        ):
+            start = time.perf_counter()
+            if manifest is not None:
+                for result_type in result_types:
+                    write_classified_result(
+                        phenopacket_index, output_dir, result_type, raw_result_name(raw_result)
+                    )
+            write_standardised_results(results, raw_result, output_dir, phenopacket_dir, sort_order)
+            record_rows(rows, seconds + time.perf_counter() - start)
+            case_summary = PostProcessSummary()
+            case_summary.update(raw_result_name(raw_result), results, rows, sort_order)
+            summary.merge(case_summary)
+            if manifest is not None:
+                manifest.record(raw_result, raw_result_name(raw_result), case_summary.state())
+            progress.update()
+    finally:
+        progress.close()
+        if manifest is not None:
+            manifest.save()
+    summary.write(output_dir.joinpath(SUMMARY_FILE_NAME))
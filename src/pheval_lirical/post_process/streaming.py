@@ -0,0 +1,146 @@
+import queue
+import threading
+import traceback
+from pathlib import Path
+
+from pheval.post_processing.post_processing import ResultType, SortOrder
+from pheval.utils.phenopacket_utils import GeneIdentifierUpdater, create_gene_identifier_map
+
+from pheval_lirical.phenopacket_index import load_phenopacket_index
+from pheval_lirical.post_process.incremental import (
+    output_file,
+    write_classified_outputs,
+    write_classified_result,
+)
+from pheval_lirical.post_process.post_process_results_format import (
+    analysis_result_types,
+    post_process_manifest,
+    standardise_result,
+)
+from pheval_lirical.run.executor import JobResult
+
+
+class StreamingPostProcessor:
+    """
+    Standardise raw LIRICAL results in a background thread as soon as their job finishes.
+
+    Standardised results are recorded in the post-processing manifest, so a later incremental
+    post-processing pass only picks up what streaming did not get to. An error that stops the
+    thread is raised again from the next submit or from close.
+    """
+
+    def __init__(
+        self,
+        raw_results_dir: Path,
+        output_dir: Path,
+        phenopacket_dir: Path,
+        sort_order: str,
+        disease_analysis: bool,
+        gene_analysis: bool,
+        variant_analysis: bool,
+        convert_to_parquet: bool = False,
+        max_rank: int = None,
+        variant_reducer: str = None,
+        phenopacket_index_path: Path = None,
+    ):
+        self.raw_results_dir = raw_results_dir
+        self.output_dir = output_dir
+        self.phenopacket_dir = phenopacket_dir
+        self.sort_order = (
+            SortOrder.ASCENDING if sort_order.lower() == "ascending" else SortOrder.DESCENDING
+        )
+        self.disease_analysis = disease_analysis
+        self.gene_analysis = gene_analysis
+        self.variant_analysis = variant_analysis
+        self.convert_to_parquet = convert_to_parquet
+        self.max_rank = max_rank
+        self.variant_reducer = variant_reducer
+        self.phenopacket_index_path = phenopacket_index_path
+        self.result_types = analysis_result_types(disease_analysis, gene_analysis, variant_analysis)
+        self.manifest = post_process_manifest(
+            output_dir, sort_order, self.result_types, max_rank, variant_reducer
+        )
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._work, name="streaming-post-process")
+        self.processed = 0
+        self.failed = 0
+        self.error = None
+
+    def start(self) -> None:
+        """Start the background post-processing thread."""
+        self.thread.start()
+
+    def submit(self, job_result: JobResult) -> None:
+        """Queue the raw results of a finished LIRICAL job for post-processing."""
+        if self.error is not None:
+            raise self.error
+        if job_result.returncode != 0 and len(job_result.job.result_names) == 1:
+            return
+        for result_name in job_result.job.result_names:
+            self.queue.put(result_name)
+
+    def close(self) -> None:
+        """Wait for all queued raw results to be post-processed and save the manifest."""
+        self.queue.put(None)
+        self.thread.join()
+        self.manifest.save()
+        print(f"streamed post-processing of {self.processed} results ({self.failed} failed)")
+        if self.error is not None:
+            raise self.error
+
+    def _work(self) -> None:
+        try:
+            self._process_queue()
+        except Exception as error:  # noqa: B902 raised again in the submitting thread
+            self.error = error
+
+    def _process_queue(self) -> None:
+        phenopacket_index = load_phenopacket_index(
+            self.phenopacket_dir, self.phenopacket_index_path
+        )
+        write_classified_outputs(
+            phenopacket_index, self.output_dir, self.result_types, missing_only=True
+        )
+        gene_identifier_updater = (
+            GeneIdentifierUpdater(
+                gene_identifier="ensembl_id", identifier_map=create_gene_identifier_map()
+            )
+            if ResultType.GENE in self.result_types
+            else None
+        )
+        while True:
+            result_name = self.queue.get()
+            if result_name is None:
+                return
+            raw_result = self.raw_results_dir.joinpath(f"{result_name}.tsv")
+            if not raw_result.exists():
+                continue
+            outputs = [
+                output_file(self.output_dir, result_type, result_name)
+                for result_type in self.result_types
+            ]
+            if self.manifest.is_current(raw_result, result_name, outputs):
+                continue
+            try:
+                for result_type in self.result_types:
+                    write_classified_result(
+                        phenopacket_index, self.output_dir, result_type, result_name
+                    )
+                summary = standardise_result(
+                    raw_result=raw_result,
+                    output_dir=self.output_dir,
+                    phenopacket_dir=self.phenopacket_dir,
+                    sort_order=self.sort_order,
+                    gene_identifier_updater=gene_identifier_updater,
+                    disease_analysis=self.disease_analysis,
+                    gene_analysis=self.gene_analysis,
+                    variant_analysis=self.variant_analysis,
+                    convert_to_parquet=self.convert_to_parquet,
+                    max_rank=self.max_rank,
+                    variant_reducer=self.variant_reducer,
+                )
+                self.manifest.record(raw_result, result_name, summary.state())
+                self.processed += 1
+            except Exception:  # noqa: B902 the final post-processing pass retries it
+                traceback.print_exc()
+                self.failed += 1
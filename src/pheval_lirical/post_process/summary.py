@@ -0,0 +1,240 @@
+import json
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+from pheval.post_processing.post_processing import ResultType, SortOrder
+
+SUMMARY_FILE_NAME = "pheval_lirical_post_process_summary.json"
+
+
+@dataclass
+class RunningStatistics:
+    """
+    Count, mean, variance and range of a stream of values, updated a batch at a time.
+
+    Batches are merged with the parallel form of Welford's algorithm, so the statistics of the
+    whole stream are exact without holding on to the values.
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+    def merge(self, other: "RunningStatistics") -> None:
+        """Merge the statistics of another stream into these."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def add(self, value: float) -> None:
+        """Add a single value."""
+        self.merge(RunningStatistics(count=1, mean=value, minimum=value, maximum=value))
+
+    def update(self, values: pl.Series) -> None:
+        """Add a batch of values."""
+        if values.len() == 0:
+            return
+        mean = values.mean()
+        self.merge(
+            RunningStatistics(
+                count=values.len(),
+                mean=mean,
+                m2=float(((values - mean) ** 2).sum()),
+                minimum=values.min(),
+                maximum=values.max(),
+            )
+        )
+
+    def report(self) -> dict:
+        """Return the count, mean, sample standard deviation and range."""
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "std": math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+
+@dataclass
+class ResultTypeSummary:
+    """Statistics of the standardised results of one result type."""
+
+    cases: int = 0
+    empty_cases: list[str] = field(default_factory=list)
+    results: int = 0
+    results_per_case: RunningStatistics = field(default_factory=RunningStatistics)
+    scores: RunningStatistics = field(default_factory=RunningStatistics)
+    top_scores: RunningStatistics = field(default_factory=RunningStatistics)
+    # counts of finite scores by the integer below them, LIRICAL scores being log10 LRs
+    score_histogram: dict[str, int] = field(default_factory=dict)
+    infinite_scores: int = 0
+
+    def update(self, result_name: str, results: pl.DataFrame, sort_order: SortOrder) -> None:
+        """Add the standardised results of a case."""
+        scores = results["score"]
+        finite = scores.filter(scores.is_finite())
+        self.cases += 1
+        self.results += results.height
+        self.results_per_case.add(results.height)
+        self.infinite_scores += scores.len() - finite.len()
+        if results.height == 0:
+            self.empty_cases.append(result_name)
+        if finite.len() == 0:
+            return
+        self.scores.update(finite)
+        self.top_scores.add(finite.min() if sort_order == SortOrder.ASCENDING else finite.max())
+        for score_bin, count in finite.floor().cast(pl.Int64).value_counts().iter_rows():
+            self.score_histogram[str(score_bin)] = (
+                self.score_histogram.get(str(score_bin), 0) + count
+            )
+
+    def merge(self, other: "ResultTypeSummary") -> None:
+        """Merge the statistics of other cases into these."""
+        self.cases += other.cases
+        self.empty_cases.extend(other.empty_cases)
+        self.results += other.results
+        self.results_per_case.merge(other.results_per_case)
+        self.scores.merge(other.scores)
+        self.top_scores.merge(other.top_scores)
+        for score_bin, count in other.score_histogram.items():
+            self.score_histogram[score_bin] = self.score_histogram.get(score_bin, 0) + count
+        self.infinite_scores += other.infinite_scores
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ResultTypeSummary":
+        return cls(
+            **{
+                **state,
+                "empty_cases": list(state["empty_cases"]),
+                "score_histogram": dict(state["score_histogram"]),
+                "results_per_case": RunningStatistics(**state["results_per_case"]),
+                "scores": RunningStatistics(**state["scores"]),
+                "top_scores": RunningStatistics(**state["top_scores"]),
+            }
+        )
+
+    def report(self) -> dict:
+        return {
+            "cases": self.cases,
+            "cases_with_results": self.cases - len(self.empty_cases),
+            "empty_cases": len(self.empty_cases),
+            "empty_case_names": sorted(self.empty_cases),
+            "results": self.results,
+            "results_per_case": self.results_per_case.report(),
+            "scores": self.scores.report(),
+            "top_scores": self.top_scores.report(),
+            "score_histogram": dict(
+                sorted(self.score_histogram.items(), key=lambda item: int(item[0]))
+            ),
+            "infinite_scores": self.infinite_scores,
+        }
+
+
+@dataclass
+class PostProcessSummary:
+    """
+    Corpus statistics of post-processing, accumulated as each raw result is standardised.
+
+    The statistics of a single case can be kept, with state, and merged into a corpus summary
+    later, which is how incremental post-processing accounts for the raw results it skips.
+    """
+
+    raw_results: int = 0
+    raw_rows: int = 0
+    result_types: dict[str, ResultTypeSummary] = field(default_factory=dict)
+    corpus_cases: int = 0
+    missing_cases: list[str] = field(default_factory=list)
+
+    def add_corpus(self, case_ids: list[str], result_names: list[str]) -> None:
+        """
+        Record the cases of the corpus, and which of them have no raw result.
+        Args:
+            case_ids (list[str]): Case ids of the phenopacket index.
+            result_names (list[str]): Names of the raw results found.
+        """
+        result_names = set(result_names)
+        self.corpus_cases = len(case_ids)
+        self.missing_cases = sorted(case_id for case_id in case_ids if case_id not in result_names)
+
+    def update(
+        self,
+        result_name: str,
+        results: dict[ResultType, pl.DataFrame],
+        raw_rows: int,
+        sort_order: SortOrder,
+    ) -> None:
+        """
+        Add the standardised results of a case.
+        Args:
+            result_name (str): Name of the raw result.
+            results (dict[ResultType, pl.DataFrame]): The standardised results, by type.
+            raw_rows (int): The raw result rows read.
+            sort_order (SortOrder): The sort order scores are ranked with.
+        """
+        self.raw_results += 1
+        self.raw_rows += raw_rows
+        for result_type, pheval_result in results.items():
+            self.result_types.setdefault(result_type.value, ResultTypeSummary()).update(
+                result_name, pheval_result, sort_order
+            )
+
+    def merge(self, other: "PostProcessSummary") -> None:
+        """Merge the statistics of other cases into these."""
+        self.raw_results += other.raw_results
+        self.raw_rows += other.raw_rows
+        for result_type, result_type_summary in other.result_types.items():
+            self.result_types.setdefault(result_type, ResultTypeSummary()).merge(
+                result_type_summary
+            )
+
+    def state(self) -> dict:
+        """Return the accumulator state, for from_state to restore."""
+        return asdict(self)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "PostProcessSummary":
+        return cls(
+            raw_results=state["raw_results"],
+            raw_rows=state["raw_rows"],
+            result_types={
+                result_type: ResultTypeSummary.from_state(result_type_state)
+                for result_type, result_type_state in state["result_types"].items()
+            },
+        )
+
+    def report(self) -> dict:
+        return {
+            "corpus_cases": self.corpus_cases,
+            "cases_without_raw_results": len(self.missing_cases),
+            "missing_case_names": self.missing_cases,
+            "raw_results": self.raw_results,
+            "raw_rows": self.raw_rows,
+            "result_types": {
+                result_type: result_type_summary.report()
+                for result_type, result_type_summary in sorted(self.result_types.items())
+            },
+        }
+
+    def write(self, summary_path: Path) -> None:
+        """Atomically write the summary report."""
+        temporary_path = summary_path.with_suffix(".tmp")
+        with open(temporary_path, "w") as summary_file:
+            json.dump(self.report(), summary_file, indent=2)
+        os.replace(temporary_path, summary_path)
@@ -0,0 +1,163 @@
+import gzip
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from packaging import version
+from pheval.prepare.custom_exceptions import IncorrectFileFormatError
+from pheval.utils.phenopacket_utils import IncompatibleGenomeAssemblyError
+
+from pheval_lirical.phenopacket_index import PhenopacketIndex, PhenopacketRecord
+from pheval_lirical.prepare.prepare_commands import database_assembly
+
+HPO_ID = re.compile(r"^HP:\d{7}$")
+CHR1_CONTIGS = {"1", "chr1"}
+CHR1_LENGTHS = {"hg19": 249250621, "hg38": 248956422}
+
+
+class PreflightCheckError(Exception):
+    """Problems with the inputs of a LIRICAL run, found before running it."""
+
+    def __init__(self, problems: list[str]):
+        self.problems = problems
+        super().__init__(
+            f"{len(problems)} problems found before running LIRICAL:\n" + "\n".join(problems)
+        )
+
+
+def vcf_chr1_length(vcf_path: Path) -> Optional[int]:
+    """Return the length of chromosome 1 declared in the contig headers of a VCF, if any."""
+    opener = gzip.open if vcf_path.name.endswith(".gz") else open
+    with opener(vcf_path, "rt") as vcf:
+        for line in vcf:
+            if not line.startswith("##"):
+                return None
+            if line.startswith("##contig=<"):
+                fields = dict(
+                    field.split("=", 1)
+                    for field in line.strip()[len("##contig=<") : -1].split(",")
+                    if "=" in field
+                )
+                if fields.get("ID") in CHR1_CONTIGS and "length" in fields:
+                    return int(fields["length"])
+    return None
+
+
+class PreflightCheck:
+    """
+    Check the inputs of a LIRICAL run before any JVM is started.
+
+    The checks are made on the phenopacket records the command arguments are created from, so
+    that every problem, including those that would stop the arguments being created, is
+    reported at once.
+    """
+
+    def __init__(
+        self,
+        lirical_jar: Path,
+        input_dir: Path,
+        exomiser_data_dir: Path,
+        vcf_dir: Path,
+        mode: str,
+        lirical_version: str,
+        exomiser_hg19_data: Path,
+        exomiser_hg38_data: Path,
+        gene_analysis: bool,
+        variant_analysis: bool,
+    ):
+        self.lirical_jar = lirical_jar
+        self.input_dir = input_dir
+        self.exomiser_data_dir = exomiser_data_dir
+        self.vcf_dir = vcf_dir
+        self.mode = mode
+        self.lirical_version = lirical_version
+        self.exomiser_data = {"hg19": exomiser_hg19_data, "hg38": exomiser_hg38_data}
+        self.vcf_analysis = gene_analysis or variant_analysis
+
+    def check_setup(self, assemblies: set[str]) -> list[str]:
+        """Return the problems with the LIRICAL installation and the Exomiser databases needed."""
+        problems = []
+        if self.mode.lower() not in ["phenopacket", "manual"]:
+            problems.append(f"unknown LIRICAL mode {self.mode}")
+        if not Path(self.lirical_jar).is_file():
+            problems.append(f"LIRICAL jar not found: {self.lirical_jar}")
+        if not Path(self.input_dir).is_dir():
+            problems.append(f"LIRICAL data directory not found: {self.input_dir}")
+        if not self.vcf_analysis:
+            return problems
+        if version.parse(self.lirical_version) > version.parse("2.0.0-RC1"):
+            for assembly in sorted(assemblies):
+                flag = "-e19" if assembly == "hg19" else "-e38"
+                database = self.exomiser_data.get(assembly)
+                if database is None:
+                    problems.append(f"no {flag} Exomiser database configured for {assembly} VCFs")
+                elif not Path(database).exists():
+                    problems.append(f"{flag} Exomiser database not found: {database}")
+        if version.parse(self.lirical_version) < version.parse("2.0.0-RC2") and (
+            self.exomiser_data_dir is None or not Path(self.exomiser_data_dir).exists()
+        ):
+            problems.append(f"Exomiser data directory not found: {self.exomiser_data_dir}")
+        return problems
+
+    def check_case(self, phenopacket_record: PhenopacketRecord) -> list[str]:
+        """Return the problems with the inputs of a single case."""
+        case_id, problems = phenopacket_record.case_id, []
+        if not phenopacket_record.phenopacket_path.is_file():
+            problems.append(
+                f"{case_id}: phenopacket not found: {phenopacket_record.phenopacket_path}"
+            )
+        if not phenopacket_record.observed_phenotypes:
+            problems.append(f"{case_id}: no observed phenotypes")
+        for hpo_id in (
+            phenopacket_record.observed_phenotypes + phenopacket_record.negated_phenotypes
+        ):
+            if not HPO_ID.match(hpo_id):
+                problems.append(f"{case_id}: invalid HPO id {hpo_id!r}")
+        if not self.vcf_analysis:
+            return problems
+        try:
+            vcf_path = phenopacket_record.vcf_path(self.vcf_dir)
+        except (IncorrectFileFormatError, IncompatibleGenomeAssemblyError) as err:
+            return problems + [f"{case_id}: {err}"]
+        if not vcf_path.is_file():
+            return problems + [f"{case_id}: VCF not found: {vcf_path}"]
+        try:
+            chr1_length = vcf_chr1_length(vcf_path)
+        except (OSError, EOFError, UnicodeDecodeError, ValueError) as err:
+            return problems + [f"{case_id}: unreadable VCF header in {vcf_path}: {err}"]
+        assembly = database_assembly(phenopacket_record.vcf_assembly)
+        if chr1_length is not None and chr1_length != CHR1_LENGTHS[assembly]:
+            contig_assembly = next(
+                (other for other, length in CHR1_LENGTHS.items() if length == chr1_length),
+                "an unknown assembly",
+            )
+            problems.append(
+                f"{case_id}: VCF contigs of {vcf_path} are {contig_assembly}, "
+                f"but the phenopacket gives {phenopacket_record.vcf_assembly}"
+            )
+        return problems
+
+    def run(self, phenopacket_index: PhenopacketIndex, max_workers: int = 8) -> None:
+        """
+        Check every case of a phenopacket index in parallel.
+        Args:
+            phenopacket_index (PhenopacketIndex): The phenopacket records to check.
+            max_workers (int): The number of cases to check concurrently.
+        Raises:
+            PreflightCheckError: Listing every problem found.
+        """
+        records = list(phenopacket_index)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            case_problems = list(executor.map(self.check_case, records))
+        assemblies = {
+            database_assembly(record.vcf_assembly)
+            for record in records
+            if database_assembly(record.vcf_assembly) in CHR1_LENGTHS
+        }
+        problems = self.check_setup(assemblies) + [
+            problem for problems in case_problems for problem in problems
+        ]
+        if problems:
+            raise PreflightCheckError(problems)
+        print(f"preflight check passed for {len(records)} cases")
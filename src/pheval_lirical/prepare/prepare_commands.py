@@ -1,22 +1,43 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
 from packaging import version
-from phenopackets import Phenopacket, PhenotypicFeature
-from pheval.utils.file_utils import files_with_suffix
-from pheval.utils.phenopacket_utils import PhenopacketUtil, phenopacket_reader
 
 from pheval_lirical.prepare.prepare_manual_commands import LiricalManualCommandLineArguments
 from pheval_lirical.prepare.prepare_phenopacket_commands import (
     LiricalPhenopacketCommandLineArguments,
 )
 
+BATCH_LAUNCHER = Path(__file__).parent.joinpath("resources", "LiricalBatchLauncher.java")
+ARGUMENT_FILES_DIR_NAME = "lirical_argument_files"
+DATABASE_ASSEMBLIES = {"GRCh37": "hg19", "hg19": "hg19", "GRCh38": "hg38", "hg38": "hg38"}
+
+# the phenopacket index needs polars and phenopackets, which are only imported once commands are
+# prepared, so that the CLI starts quickly
+if TYPE_CHECKING:
+    from phenopackets import Phenopacket
+
+    from pheval_lirical.phenopacket_index import PhenopacketIndex, PhenopacketRecord
+
+
+def database_assembly(assembly: str or None) -> str or None:
+    """Return the Exomiser database assembly (hg19 or hg38) used for a genome assembly."""
+    return DATABASE_ASSEMBLIES.get(assembly, assembly)
+
+
+@lru_cache(maxsize=4096)
+def hpo_term_argument(hpo_terms: tuple[str, ...]) -> str:
+    """Return the comma-separated HPO ids of a phenotype profile, joined once per profile."""
+    return ",".join(hpo_terms)
+
 
 class CommandCreator:
     def __init__(
         self,
         phenopacket_path: Path,
-        phenopacket: Phenopacket,
+        phenopacket: "Phenopacket",
         lirical_jar: Path,
         input_dir: Path,
         exomiser_data_dir: Path,
@@ -25,6 +46,7 @@ class CommandCreator:
         mode: str,
         exomiser_hg19_data_path: Path,
         exomiser_hg38_data_path: Path,
+        phenopacket_record: "PhenopacketRecord" = None,
     ):
         self.phenopacket_path = phenopacket_path
         self.lirical_jar = lirical_jar
@@ -35,31 +57,28 @@ class CommandCreator:
         self.mode = mode
         self.exomiser_hg19_data_path = exomiser_hg19_data_path
         self.exomiser_hg38_data_path = exomiser_hg38_data_path
-        self.phenopacket_util = PhenopacketUtil(phenopacket)
-
-    def get_list_negated_phenotypic_features(self):
-        """Return list of negated HPO ids if there are any present, otherwise return None."""
-        return (
-            None
-            if self.phenopacket_util.negated_phenotypic_features() == []
-            else [hpo.type.id for hpo in self.phenopacket_util.negated_phenotypic_features()]
-        )
+        if phenopacket_record is None:
+            from pheval_lirical.phenopacket_index import PhenopacketRecord
 
-    def get_list_observed_phenotypic_features(self) -> [PhenotypicFeature]:
-        """Return list of observed HPO ids."""
-        return [hpo.type.id for hpo in self.phenopacket_util.observed_phenotypic_features()]
+            phenopacket_record = PhenopacketRecord.from_phenopacket(phenopacket_path, phenopacket)
+        self.phenopacket_record = phenopacket_record
+
+    def get_list_negated_phenotypic_features(self) -> tuple[str, ...] or None:
+        """Return the sorted negated HPO ids if there are any present, otherwise return None."""
+        return self.phenopacket_record.negated_phenotypes or None
+
+    def get_list_observed_phenotypic_features(self) -> tuple[str, ...]:
+        """Return the sorted observed HPO ids."""
+        return self.phenopacket_record.observed_phenotypes
 
     def get_vcf_path(self) -> Path:
         """Return the vcf file path."""
-        return self.phenopacket_util.vcf_file_data(
-            phenopacket_path=self.phenopacket_path, vcf_dir=self.vcf_dir
-        ).uri
+        return str(self.phenopacket_record.vcf_path(self.vcf_dir))
 
     def get_vcf_assembly(self) -> str:
         """Return the vcf assembly."""
-        return self.phenopacket_util.vcf_file_data(
-            phenopacket_path=self.phenopacket_path, vcf_dir=self.vcf_dir
-        ).file_attributes["genomeAssembly"]
+        self.phenopacket_record.vcf_path(self.vcf_dir)
+        return self.phenopacket_record.vcf_assembly
 
     def add_manual_cli_arguments(
         self, gene_analysis: bool, variant_analysis: bool
@@ -73,7 +92,7 @@ class CommandCreator:
             vcf_file_path=self.get_vcf_path() if gene_analysis or variant_analysis else None,
             lirical_data=self.input_dir,
             exomiser_data=self.exomiser_data_dir,
-            sample_id=self.phenopacket_util.sample_id(),
+            sample_id=self.phenopacket_record.sample_id,
             output_dir=self.results_dir,
             output_prefix=self.phenopacket_path.stem,
             exomiser_hg19_data_path=(
@@ -127,16 +146,19 @@ def create_command_arguments(
     exomiser_hg38_data: Path,
     gene_analysis: bool,
     variant_analysis: bool,
+    phenopacket_index: "PhenopacketIndex" = None,
 ) -> list[LiricalManualCommandLineArguments] or list[LiricalPhenopacketCommandLineArguments]:
     """Return a list of LIRICAL command line arguments for a directory of phenopackets."""
-    phenopacket_paths = files_with_suffix(phenopacket_dir, ".json")
+    from pheval_lirical.phenopacket_index import load_phenopacket_index
+
+    if phenopacket_index is None:
+        phenopacket_index = load_phenopacket_index(phenopacket_dir)
     commands = []
-    for phenopacket_path in phenopacket_paths:
-        phenopacket = phenopacket_reader(phenopacket_path)
+    for phenopacket_record in phenopacket_index:
         commands.append(
             CommandCreator(
-                phenopacket_path=phenopacket_path,
-                phenopacket=phenopacket,
+                phenopacket_path=phenopacket_record.phenopacket_path,
+                phenopacket=None,
                 lirical_jar=lirical_jar,
                 input_dir=input_dir,
                 exomiser_data_dir=exomiser_data_dir,
@@ -145,16 +167,24 @@ def create_command_arguments(
                 mode=mode,
                 exomiser_hg19_data_path=exomiser_hg19_data,
                 exomiser_hg38_data_path=exomiser_hg38_data,
+                phenopacket_record=phenopacket_record,
             ).add_cli_arguments(gene_analysis, variant_analysis)
         )
     return commands
 
 
 class CommandWriter:
-    def __init__(self, mode: str, lirical_version: str, output_file: Path):
+    def __init__(
+        self,
+        mode: str,
+        lirical_version: str,
+        output_file: Path,
+        argument_files_dir: Path = None,
+    ):
         self.mode = mode
         self.version = lirical_version
         self.file = open(output_file, "w")
+        self.argument_files_dir = argument_files_dir
 
     def write_java_command(
         self,
@@ -181,7 +211,10 @@ class CommandWriter:
         self, command_arguments: LiricalManualCommandLineArguments
     ) -> None:
         """Write observed HPO ids to command."""
-        self.file.write(" --observed-phenotypes " + ",".join(command_arguments.observed_phenotypes))
+        self.file.write(
+            " --observed-phenotypes "
+            + hpo_term_argument(tuple(command_arguments.observed_phenotypes))
+        )
 
     def write_negated_phenotypic_features(
         self, command_arguments: LiricalManualCommandLineArguments
@@ -189,7 +222,8 @@ class CommandWriter:
         """Write negated HPO ids to command."""
         if command_arguments.negated_phenotypes is not None:
             self.file.write(
-                " --negated-phenotypes " + ",".join(command_arguments.negated_phenotypes)
+                " --negated-phenotypes "
+                + hpo_term_argument(tuple(command_arguments.negated_phenotypes))
             )
 
     def write_vcf_file_properties(
@@ -210,6 +244,26 @@ class CommandWriter:
         """Write the sample id."""
         self.file.write(" --sample-id " + '"' + command_arguments.sample_id + '"')
 
+    def write_argument_file(self, command_arguments: LiricalManualCommandLineArguments) -> None:
+        """Write the phenotypes and sample id of a case to its picocli argument file."""
+        argument_file = self.argument_files_dir.joinpath(f"{command_arguments.output_prefix}.args")
+        case_writer = CommandWriter(self.mode, self.version, argument_file)
+        case_writer.write_observed_phenotypic_features(command_arguments)
+        case_writer.write_negated_phenotypic_features(command_arguments)
+        case_writer.write_sample_id(command_arguments)
+        case_writer.file.write("\n")
+        case_writer.close()
+        self.file.write(" @" + str(argument_file))
+
+    def write_case_phenotypes(self, command_arguments: LiricalManualCommandLineArguments) -> None:
+        """Write the phenotypes and sample id of a case, inline or through its argument file."""
+        if self.argument_files_dir is not None:
+            self.write_argument_file(command_arguments)
+        else:
+            self.write_observed_phenotypic_features(command_arguments)
+            self.write_negated_phenotypic_features(command_arguments)
+            self.write_sample_id(command_arguments)
+
     def write_lirical_data_dir(
         self,
         command_arguments: LiricalManualCommandLineArguments
@@ -250,6 +304,14 @@ class CommandWriter:
     ) -> None:
         """Write common CLI parameters."""
         self.write_java_command(command_arguments)
+        self.write_lirical_arguments(command_arguments)
+
+    def write_lirical_arguments(
+        self,
+        command_arguments: LiricalManualCommandLineArguments
+        or LiricalPhenopacketCommandLineArguments,
+    ) -> None:
+        """Write the LIRICAL CLI parameters common to both modes, without the java command."""
         self.write_mode()
         self.write_vcf_file_properties(command_arguments)
         self.write_lirical_data_dir(command_arguments)
@@ -259,9 +321,7 @@ class CommandWriter:
     def write_manual_command(self, command_arguments: LiricalManualCommandLineArguments) -> None:
         """Write LIRICAL command to file to run in manual mode."""
         self.write_common_arguments(command_arguments)
-        self.write_observed_phenotypic_features(command_arguments)
-        self.write_negated_phenotypic_features(command_arguments)
-        self.write_sample_id(command_arguments)
+        self.write_case_phenotypes(command_arguments)
         self.file.write("\n")
 
     def write_phenopacket_command(
@@ -272,6 +332,45 @@ class CommandWriter:
         self.write_phenopacket_path(command_arguments)
         self.file.write("\n")
 
+    def write_case_arguments(
+        self,
+        command_arguments: LiricalManualCommandLineArguments
+        or LiricalPhenopacketCommandLineArguments,
+    ) -> None:
+        """Write all LIRICAL CLI parameters of a single case on one line, without the java command."""
+        self.write_lirical_arguments(command_arguments)
+        if self.mode.lower() == "phenopacket":
+            self.write_phenopacket_path(command_arguments)
+        else:
+            self.write_case_phenotypes(command_arguments)
+        self.file.write("\n")
+
+    def write_batch_command(
+        self,
+        command_arguments: [LiricalManualCommandLineArguments]
+        or [LiricalPhenopacketCommandLineArguments],
+        arguments_file: Path,
+    ) -> None:
+        """Write a single command running a chunk of LIRICAL cases in one JVM."""
+        arguments_writer = CommandWriter(
+            mode=self.mode,
+            lirical_version=self.version,
+            output_file=arguments_file,
+            argument_files_dir=self.argument_files_dir,
+        )
+        for command_argument in command_arguments:
+            arguments_writer.write_case_arguments(command_argument)
+        arguments_writer.close()
+        self.file.write(
+            "java -cp "
+            + str(command_arguments[0].lirical_jar_file)
+            + " "
+            + str(BATCH_LAUNCHER)
+            + " "
+            + str(arguments_file)
+            + "\n"
+        )
+
     def write_command(
         self,
         command_arguments: LiricalManualCommandLineArguments
@@ -302,15 +401,46 @@ def write_all_commands(
     file_prefix: Path,
     mode: str,
     lirical_version: str,
+    cases_per_jvm: int = 1,
+    argument_files: bool = False,
 ) -> None:
-    """Write all commands to file for running LIRICAL."""
+    """
+    Write all commands to file for running LIRICAL.
+
+    With cases_per_jvm greater than one, each line of the batch file runs a chunk of cases in a
+    single JVM through the bundled batch launcher; the arguments of each chunk are written to
+    `lirical_batch_arguments` in the tool input commands directory. Cases are grouped by assembly
+    before chunking, so that no chunk mixes Exomiser databases.
+
+    With argument_files, in manual mode, the phenotypes and sample id of each case are written to
+    a picocli `@` argument file in `lirical_argument_files`, keeping the command lines short
+    however many phenotypes a case has.
+    """
+    argument_files_dir = None
+    if argument_files and mode.lower() == "manual":
+        argument_files_dir = tool_input_commands_dir.joinpath(ARGUMENT_FILES_DIR_NAME)
+        argument_files_dir.mkdir(exist_ok=True)
     command_writer = CommandWriter(
         mode=mode,
         lirical_version=lirical_version,
         output_file=tool_input_commands_dir.joinpath(f"{file_prefix}-lirical-commands.txt"),
+        argument_files_dir=argument_files_dir,
     )
-    for command_argument in command_arguments:
-        command_writer.write_command(command_argument)
+    if cases_per_jvm > 1:
+        arguments_dir = tool_input_commands_dir.joinpath("lirical_batch_arguments")
+        arguments_dir.mkdir(exist_ok=True)
+        # keep each chunk, and so each JVM, on a single Exomiser database
+        command_arguments = sorted(
+            command_arguments, key=lambda arguments: str(database_assembly(arguments.assembly))
+        )
+        for i in range(0, len(command_arguments), cases_per_jvm):
+            command_writer.write_batch_command(
+                command_arguments[i : i + cases_per_jvm],
+                arguments_dir.joinpath(f"{file_prefix}-batch-{i // cases_per_jvm:05d}.txt"),
+            )
+    else:
+        for command_argument in command_arguments:
+            command_writer.write_command(command_argument)
     command_writer.close()
 
 
@@ -329,8 +459,43 @@ def prepare_commands(
     exomiser_hg38_data: Path,
     gene_analysis: bool,
     variant_analysis: bool,
+    cases_per_jvm: int = 1,
+    phenopacket_index_path: Path = None,
+    status_path: Path = None,
+    phenopacket_index: "PhenopacketIndex" = None,
+    preflight_check: bool = False,
+    argument_files: bool = False,
 ) -> None:
-    """Prepare command batch files to run LIRICAL."""
+    """
+    Prepare command batch files to run LIRICAL.
+
+    With phenopacket_index_path, the phenopackets are read from (and indexed to) that sidecar,
+    which the post-processing stage reuses. With status_path, the progress of indexing the
+    phenopackets is written to that status file. An already loaded phenopacket_index is used
+    as is. With preflight_check, the inputs of every case are checked first, raising a
+    PreflightCheckError listing every problem found. With argument_files, manual mode cases
+    read their phenotypes from per-case argument files.
+    """
+    from pheval_lirical.phenopacket_index import load_phenopacket_index
+    from pheval_lirical.prepare.preflight import PreflightCheck
+
+    if phenopacket_index is None:
+        phenopacket_index = load_phenopacket_index(
+            phenopacket_dir, phenopacket_index_path, status_path
+        )
+    if preflight_check:
+        PreflightCheck(
+            lirical_jar=lirical_jar,
+            input_dir=input_dir,
+            exomiser_data_dir=exomiser_data_dir,
+            vcf_dir=vcf_dir,
+            mode=mode,
+            lirical_version=lirical_version,
+            exomiser_hg19_data=exomiser_hg19_data,
+            exomiser_hg38_data=exomiser_hg38_data,
+            gene_analysis=gene_analysis,
+            variant_analysis=variant_analysis,
+        ).run(phenopacket_index)
     command_arguments = create_command_arguments(
         phenopacket_dir,
         lirical_jar,
@@ -343,9 +508,16 @@ def prepare_commands(
         exomiser_hg38_data,
         gene_analysis,
         variant_analysis,
+        phenopacket_index,
     )
     write_all_commands(
-        command_arguments, tool_input_commands_dir, file_prefix, mode, lirical_version
+        command_arguments,
+        tool_input_commands_dir,
+        file_prefix,
+        mode,
+        lirical_version,
+        cases_per_jvm,
+        argument_files,
     )
 
 
@@ -397,6 +569,37 @@ def prepare_commands(
     show_default=True,
     help="Specify analysis for variant prioritisation",
 )
+@click.option(
+    "--cases-per-jvm",
+    required=False,
+    default=1,
+    show_default=True,
+    help="Number of cases to run in a single JVM.",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--phenopacket-index",
+    required=False,
+    default=None,
+    help="Parquet sidecar to read the phenopackets from, and index them to.",
+    type=Path,
+)
+@click.option(
+    "--preflight-check/--no-preflight-check",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Check the inputs of every case before writing the commands.",
+)
+@click.option(
+    "--argument-files/--no-argument-files",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Write the phenotypes of each case to an argument file (manual mode).",
+)
 def prepare_commands_command(
     lirical_jar: Path,
     input_dir: Path,
@@ -412,6 +615,10 @@ def prepare_commands_command(
     exomiser_hg38: Path,
     gene_analysis: bool,
     variant_analysis: bool,
+    cases_per_jvm: int,
+    phenopacket_index: Path,
+    preflight_check: bool,
+    argument_files: bool,
 ):
     """Prepare command batch files to run LIRICAL."""
     output_dir.joinpath("tool_input_commands").mkdir(parents=True, exist_ok=True)
@@ -430,4 +637,8 @@ def prepare_commands_command(
         exomiser_hg38,
         gene_analysis,
         variant_analysis,
+        cases_per_jvm,
+        phenopacket_index,
+        preflight_check=preflight_check,
+        argument_files=argument_files,
     )
@@ -1,16 +1,14 @@
 from dataclasses import dataclass
 from pathlib import Path
 
-from phenopackets import PhenotypicFeature
-
 
 @dataclass
 class LiricalManualCommandLineArguments:
     """Minimal arguments required to run LIRICAL manually on the command line."""
 
     lirical_jar_file: Path
-    observed_phenotypes: [PhenotypicFeature]
-    negated_phenotypes: [PhenotypicFeature] or None
+    observed_phenotypes: tuple[str, ...]
+    negated_phenotypes: tuple[str, ...] or None
     assembly: str
     vcf_file_path: Path
     sample_id: str
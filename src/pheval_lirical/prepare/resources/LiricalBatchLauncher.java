@@ -0,0 +1,121 @@
+import java.io.IOException;
+import java.lang.reflect.Constructor;
+import java.lang.reflect.Method;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.jar.JarFile;
+import java.util.jar.Manifest;
+
+/**
+ * Run several LIRICAL cases in a single JVM.
+ *
+ * <p>Launched in source-file mode with the LIRICAL jar on the class path:
+ *
+ * <pre>java -cp lirical-cli.jar LiricalBatchLauncher.java arguments.txt</pre>
+ *
+ * <p>Each non-blank line of the arguments file holds the command line arguments of one case
+ * (everything that would follow {@code java -jar lirical-cli.jar}). Arguments are separated by
+ * whitespace and may be enclosed in double quotes. Every case is executed through a fresh picocli
+ * {@code CommandLine} wrapping the LIRICAL main command, so JVM start-up, class loading and JIT
+ * warm-up are paid once per batch rather than once per case. The exit code is the number of failed
+ * cases, capped at 255.
+ *
+ * <p>LIRICAL resources are not shared between cases: each command loads the HPO ontology, the
+ * phenotype annotations and the Exomiser database itself, as it would in its own JVM. The launcher
+ * relies on LIRICAL's picocli entry point only, and has not been run against a real LIRICAL jar.
+ */
+public class LiricalBatchLauncher {
+
+    private static final String DEFAULT_MAIN_CLASS = "org.monarchinitiative.lirical.cli.Main";
+
+    public static void main(String[] args) throws Exception {
+        if (args.length != 1) {
+            System.err.println("Usage: java -cp <lirical.jar> LiricalBatchLauncher.java <arguments file>");
+            System.exit(2);
+        }
+        List<List<String>> cases = readCases(Path.of(args[0]));
+        ClassLoader classLoader = Thread.currentThread().getContextClassLoader();
+        Class<?> mainClass = Class.forName(mainClassName(), true, classLoader);
+        Class<?> commandLineClass = Class.forName("picocli.CommandLine", true, classLoader);
+        Constructor<?> commandLineConstructor = commandLineClass.getConstructor(Object.class);
+        Method execute = commandLineClass.getMethod("execute", String[].class);
+
+        int failed = 0;
+        for (int i = 0; i < cases.size(); i++) {
+            String[] caseArguments = cases.get(i).toArray(new String[0]);
+            long start = System.nanoTime();
+            int exitCode;
+            try {
+                Object command = mainClass.getDeclaredConstructor().newInstance();
+                Object commandLine = commandLineConstructor.newInstance(command);
+                exitCode = (Integer) execute.invoke(commandLine, (Object) caseArguments);
+            } catch (Exception e) {
+                e.printStackTrace();
+                exitCode = 1;
+            }
+            if (exitCode != 0) {
+                failed++;
+            }
+            System.err.printf(
+                    "[LiricalBatchLauncher] case %d/%d exit code %d in %.1f s%n",
+                    i + 1, cases.size(), exitCode, (System.nanoTime() - start) / 1e9);
+        }
+        System.exit(Math.min(failed, 255));
+    }
+
+    private static String mainClassName() throws IOException {
+        String mainClass = System.getProperty("lirical.main.class");
+        if (mainClass != null) {
+            return mainClass;
+        }
+        String classPath = System.getProperty("java.class.path").split(java.io.File.pathSeparator)[0];
+        if (classPath.endsWith(".jar")) {
+            try (JarFile jar = new JarFile(classPath)) {
+                Manifest manifest = jar.getManifest();
+                if (manifest != null && manifest.getMainAttributes().getValue("Main-Class") != null) {
+                    return manifest.getMainAttributes().getValue("Main-Class");
+                }
+            }
+        }
+        return DEFAULT_MAIN_CLASS;
+    }
+
+    private static List<List<String>> readCases(Path argumentsFile) throws IOException {
+        List<List<String>> cases = new ArrayList<>();
+        for (String line : Files.readAllLines(argumentsFile)) {
+            List<String> arguments = tokenise(line);
+            if (!arguments.isEmpty()) {
+                cases.add(arguments);
+            }
+        }
+        return cases;
+    }
+
+    private static List<String> tokenise(String line) {
+        List<String> arguments = new ArrayList<>();
+        StringBuilder current = new StringBuilder();
+        boolean quoted = false;
+        boolean inArgument = false;
+        for (char c : line.toCharArray()) {
+            if (c == '"') {
+                quoted = !quoted;
+                inArgument = true;
+            } else if (Character.isWhitespace(c) && !quoted) {
+                if (inArgument) {
+                    arguments.add(current.toString());
+                    current.setLength(0);
+                    inArgument = false;
+                }
+            } else {
+                current.append(c);
+                inArgument = true;
+            }
+        }
+        if (inArgument) {
+            arguments.add(current.toString());
+        }
+        return arguments;
+    }
+}
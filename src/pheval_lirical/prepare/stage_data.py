@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+STAGING_MANIFEST = "staging_manifest.json"
+
+
+def _source_files(source: Path) -> list[Path]:
+    """Return the files making up a data source, which is either a single file or a directory."""
+    if source.is_dir():
+        return sorted(path for path in source.rglob("*") if path.is_file())
+    return [source]
+
+
+def fingerprint_sources(sources: dict[str, Path]) -> dict:
+    """
+    Return a cheap fingerprint of the data sources, from file paths, sizes and modification times.
+    Args:
+        sources (dict[str, Path]): Data sources keyed by name.
+    Returns:
+        dict: The fingerprint of every file of every source.
+    """
+    fingerprint = {}
+    for name, source in sorted(sources.items()):
+        source = Path(source).resolve()
+        files = {}
+        for path in _source_files(source):
+            stat = path.stat()
+            files[str(path.relative_to(source.parent))] = [stat.st_size, stat.st_mtime_ns]
+        fingerprint[name] = {"source": str(source), "files": files}
+    return fingerprint
+
+
+def checksum(path: Path) -> str:
+    """Return the sha256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _node_lock(lock_path: Path, blocking: bool = True):
+    """
+    Hold an exclusive lock on lock_path, so one process per node stages the data.
+
+    Without blocking, yields whether the lock was taken rather than waiting for it.
+    """
+    with open(lock_path, "w") as lock_file:
+        locked = True
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked = False
+        try:
+            yield locked
+        finally:
+            if fcntl is not None and locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _staged_path(staging_dir: Path, name: str, source: Path) -> Path:
+    return staging_dir.joinpath(name, source.name)
+
+
+def _read_manifest(staging_dir: Path) -> dict or None:
+    manifest_path = staging_dir.joinpath(STAGING_MANIFEST)
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def _copy_file(source: Path, destination: Path, hard_link: bool) -> bool:
+    """Copy or hard-link a file, returning True if the file was hard-linked."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if hard_link:
+        try:
+            os.link(source, destination)
+            return True
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+    return False
+
+
+def _stage_source(source: Path, destination: Path, hard_link: bool) -> dict[str, str]:
+    """Stage a single data source and return the verified checksums of its copied files."""
+    checksums = {}
+    for path in _source_files(source):
+        staged_file = (
+            destination.joinpath(path.relative_to(source)) if source.is_dir() else destination
+        )
+        if _copy_file(path, staged_file, hard_link):
+            continue
+        source_checksum, staged_checksum = checksum(path), checksum(staged_file)
+        if source_checksum != staged_checksum:
+            raise IOError(f"Checksum mismatch staging {path} to {staged_file}.")
+        checksums[str(path)] = source_checksum
+    return checksums
+
+
+def _is_stale(staging_dir: Path) -> bool:
+    """Return whether a staging no longer matches its sources, or was never completed."""
+    manifest = _read_manifest(staging_dir)
+    if manifest is None:
+        return True
+    sources = {name: Path(source["source"]) for name, source in manifest["fingerprint"].items()}
+    try:
+        return fingerprint_sources(sources) != manifest["fingerprint"]
+    except OSError:  # a source was removed
+        return True
+
+
+def _last_used(staging_dir: Path) -> float:
+    """Return when a staging was last staged or reused, from the modification time of its manifest."""
+    manifest_path = staging_dir.joinpath(STAGING_MANIFEST)
+    return manifest_path.stat().st_mtime if manifest_path.exists() else staging_dir.stat().st_mtime
+
+
+def remove_stale_stagings(scratch_dir: Path, keep: Path, max_age: float) -> None:
+    """
+    Remove the stagings in scratch_dir, other than keep, that are stale and unused for max_age.
+
+    A staging is stale once its sources have changed, and is only removed if it has not been
+    staged or reused for max_age seconds either, which should be well above the longest run, as
+    a run reads its staging for as long as it lasts. Stagings of sources that are still current,
+    such as those of other LIRICAL versions in a sweep, are kept, as are stagings another process
+    holds the lock of. Lock files are left in place, so that every process locks the same file.
+    """
+    for staging_dir in sorted(scratch_dir.glob("pheval_lirical_staging_*")):
+        if not staging_dir.is_dir() or staging_dir == keep:
+            continue
+        lock_path = staging_dir.with_name(f"{staging_dir.name}.lock")
+        with _node_lock(lock_path, blocking=False) as locked:
+            if not locked or time.time() - _last_used(staging_dir) < max_age:
+                continue
+            if not _is_stale(staging_dir):
+                continue
+            print(f"removing stale LIRICAL data staging {staging_dir}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def stage_data(
+    sources: dict[str, Path],
+    scratch_dir: Path,
+    hard_link: bool = False,
+    remove_stale_after: float = None,
+) -> dict:
+    """
+    Stage data sources to node-local scratch once, reusing an earlier staging if still current.
+
+    The staged copies live in a directory of scratch_dir named after the fingerprint of the
+    sources, so concurrent processes on one node agree on the location and a changed source
+    triggers a fresh staging. Copied files are verified against the checksum of their source.
+    With remove_stale_after, stagings of sources that have changed since and that have not been
+    used for that many seconds are removed, see remove_stale_stagings.
+
+    Args:
+        sources (dict[str, Path]): Data sources (files or directories) keyed by name.
+        scratch_dir (Path): Node-local scratch directory.
+        hard_link (bool): Hard-link files instead of copying them where the filesystem allows.
+        remove_stale_after (float): Age in seconds after which stale stagings are removed.
+    Returns:
+        dict[str, Path]: The staged location of each data source, keyed by name.
+    """
+    scratch_dir = Path(scratch_dir)
+    sources = {name: Path(source).resolve() for name, source in sources.items()}
+    fingerprint = fingerprint_sources(sources)
+    key = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+    staging_dir = scratch_dir.joinpath(f"pheval_lirical_staging_{key}")
+    staged_paths = {
+        name: _staged_path(staging_dir, name, source) for name, source in sources.items()
+    }
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    with _node_lock(scratch_dir.joinpath(f"pheval_lirical_staging_{key}.lock")):
+        manifest = _read_manifest(staging_dir)
+        if (
+            manifest is not None
+            and manifest["fingerprint"] == fingerprint
+            and all(staged_path.exists() for staged_path in staged_paths.values())
+        ):
+            print(f"reusing LIRICAL data staged in {staging_dir}")
+            # record the use, so that the staging is not taken for an unused one
+            os.utime(staging_dir.joinpath(STAGING_MANIFEST))
+        else:
+            print(f"staging LIRICAL data to {staging_dir}")
+            start = time.perf_counter()
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            staging_dir.mkdir(parents=True)
+            checksums = {}
+            for name, source in sources.items():
+                checksums.update(_stage_source(source, staged_paths[name], hard_link))
+            manifest_path = staging_dir.joinpath(STAGING_MANIFEST)
+            with open(manifest_path.with_suffix(".tmp"), "w") as manifest_file:
+                json.dump(
+                    {"fingerprint": fingerprint, "checksums": checksums}, manifest_file, indent=2
+                )
+            os.replace(manifest_path.with_suffix(".tmp"), manifest_path)
+            print(f"staged LIRICAL data in {time.perf_counter() - start:.1f}s")
+        if remove_stale_after is not None:
+            remove_stale_stagings(scratch_dir, keep=staging_dir, max_age=remove_stale_after)
+    return staged_paths
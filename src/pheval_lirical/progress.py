@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from tqdm import tqdm
+
+STATUS_FILE_NAME = "pheval_lirical_status.json"
+
+
+class ProgressReporter:
+    """
+    Progress of a stage over a number of cases, shown as a terminal progress bar and written to a
+    machine-readable status JSON file.
+
+    The ETA is the remaining cases times an exponential moving average of the case latency,
+    divided by the number of cases processed concurrently. The status file is rewritten every
+    interval seconds from a background thread, so that it stays fresh while cases run, and when the
+    stage ends.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        total: int,
+        status_path: Path = None,
+        workers: int = 1,
+        interval: float = 10.0,
+        smoothing: float = 0.1,
+    ):
+        self.stage = stage
+        self.total = total
+        self.status_path = status_path
+        self.workers = workers
+        self.interval = interval
+        self.smoothing = smoothing
+        self.completed = 0
+        self.failed = 0
+        self.latency = None
+        self.start = time.monotonic()
+        self.last_update = self.start
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.bar = tqdm(total=total, desc=stage, unit="case", disable=None)
+        self.write_status()
+        self.thread = None
+        if status_path is not None:
+            self.thread = threading.Thread(
+                target=self._write_periodically, name=f"{stage}-status", daemon=True
+            )
+            self.thread.start()
+
+    def __enter__(self) -> "ProgressReporter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def update(self, cases: int = 1, failed: bool = False, latency: float = None) -> None:
+        """
+        Record finished cases.
+        Args:
+            cases (int): The number of cases finished.
+            failed (bool): Whether the cases failed.
+            latency (float): Seconds taken per case, or None to use the time since the last update.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if latency is None:
+                latency = (now - self.last_update) / max(cases, 1)
+            self.last_update = now
+            for _ in range(cases):
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else self.smoothing * latency + (1 - self.smoothing) * self.latency
+                )
+            self.completed += cases
+            if failed:
+                self.failed += cases
+        self.bar.update(cases)
+        self.bar.set_postfix(failed=self.failed, refresh=False)
+
+    def status(self) -> dict:
+        """Return the current progress."""
+        with self.lock:
+            return self._status()
+
+    def _status(self) -> dict:
+        elapsed = time.monotonic() - self.start
+        remaining = max(self.total - self.completed, 0)
+        return {
+            "stage": self.stage,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "remaining": remaining,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(self.completed / elapsed, 6) if elapsed > 0 else None,
+            "case_latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "eta_seconds": (
+                round(self.latency * remaining / self.workers, 3)
+                if self.latency is not None
+                else None
+            ),
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def write_status(self) -> None:
+        """Atomically rewrite the status file, if there is one."""
+        if self.status_path is None:
+            return
+        with self.lock:
+            temporary_path = self.status_path.with_suffix(".tmp")
+            with open(temporary_path, "w") as status_file:
+                json.dump(self._status(), status_file, indent=2)
+            os.replace(temporary_path, self.status_path)
+
+    def _write_periodically(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.write_status()
+
+    def close(self) -> None:
+        """Stop the periodic writes, write the final status and close the progress bar."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.write_status()
+        self.bar.close()
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+from typing import Optional
+
+NUMA_NODE_DIR = Path("/sys/devices/system/node")
+
+
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    """Parse a kernel CPU list, such as 0-3,8-11, into CPU numbers."""
+    cpus = []
+    for cpu_range in cpu_list.strip().split(","):
+        if not cpu_range:
+            continue
+        first, _, last = cpu_range.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def available_cpus() -> set[int]:
+    """Return the CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return os.sched_getaffinity(0)
+    return set(range(os.cpu_count() or 1))
+
+
+def numa_node_cpus(node_dir: Path = NUMA_NODE_DIR) -> list[list[int]]:
+    """Return the CPUs of each NUMA node, or a single node of every CPU if none are listed."""
+    nodes = [
+        parse_cpu_list(node.joinpath("cpulist").read_text())
+        for node in sorted(node_dir.glob("node[0-9]*"), key=lambda node: int(node.name[4:]))
+        if node.joinpath("cpulist").exists()
+    ]
+    return [cpus for cpus in nodes if cpus] or [sorted(available_cpus())]
+
+
+def worker_cpu_sets(
+    max_workers: int,
+    numa_aware: bool = True,
+    node_dir: Path = NUMA_NODE_DIR,
+    available: set[int] = None,
+) -> Optional[list[set[int]]]:
+    """
+    Return the CPU set each worker is pinned to.
+
+    With numa_aware, workers are dealt to the NUMA nodes in turn, and each node's CPUs are split
+    evenly between its workers, so that no worker's JVMs span two sockets. Otherwise the
+    available CPUs are split evenly between all workers. Workers share CPUs only when there are
+    more workers than CPUs.
+    Args:
+        max_workers (int): The number of workers.
+        numa_aware (bool): Whether to keep each worker on a single NUMA node.
+        node_dir (Path): The sysfs directory listing the NUMA nodes.
+        available (set[int]): The CPUs to use, by default those this process may run on.
+    Returns:
+        Optional[list[set[int]]]: The CPUs of each worker, or None where pinning is unsupported.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        print("pinning LIRICAL workers to CPUs is not supported on this platform")
+        return None
+    available = available_cpus() if available is None else available
+    nodes = numa_node_cpus(node_dir) if numa_aware else [sorted(available)]
+    nodes = [[cpu for cpu in cpus if cpu in available] for cpus in nodes]
+    nodes = [cpus for cpus in nodes if cpus] or [sorted(available)]
+    node_workers = [list(range(node, max_workers, len(nodes))) for node in range(len(nodes))]
+    cpu_sets = [set() for _ in range(max_workers)]
+    for cpus, workers in zip(nodes, node_workers):
+        for i, worker in enumerate(workers):
+            if len(workers) <= len(cpus):
+                share = len(cpus) / len(workers)
+                cpu_sets[worker] = set(cpus[round(i * share) : round((i + 1) * share)])
+            else:
+                cpu_sets[worker] = {cpus[i % len(cpus)]}
+    return cpu_sets
+
+
+def pin_current_thread(cpus: set[int]) -> None:
+    """Pin the calling thread, and so the processes it starts from now on, to a CPU set."""
+    os.sched_setaffinity(0, cpus)
+
+
+def gc_thread_options(cpu_count: int) -> list[str]:
+    """Return the JVM options sizing the garbage collector threads to a number of CPUs."""
+    return [
+        f"-XX:ParallelGCThreads={cpu_count}",
+        f"-XX:ConcGCThreads={max((cpu_count + 2) // 4, 1)}",
+    ]
+
+
+def pin_worker(cpu_sets: Optional[list[set[int]]], worker: int) -> Optional[list[str]]:
+    """Pin the calling worker thread to its CPU set, if any, returning the JVM options to match."""
+    if cpu_sets is None:
+        return None
+    pin_current_thread(cpu_sets[worker])
+    return gc_thread_options(len(cpu_sets[worker]))
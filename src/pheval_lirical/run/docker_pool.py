@@ -0,0 +1,162 @@
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import docker
+from docker.errors import NotFound
+
+from pheval_lirical.run.executor import (
+    JobResult,
+    LiricalJob,
+    classify_failure,
+    job_arguments,
+    with_java_options,
+)
+
+POOL_LABEL = "pheval.lirical.pool"
+# exit code of coreutils timeout when the command ran for too long
+TIMEOUT_EXIT_CODE = 124
+
+
+def container_mounts(read_only: list[Path], read_write: list[Path]) -> dict[str, dict]:
+    """
+    Return docker volumes binding each host path at the same path in the container.
+
+    Binding paths in place leaves the prepared commands valid inside the container. Read-only
+    paths within another bound path are left out, and read-write binds take precedence.
+    """
+    read_write = {Path(path).resolve() for path in read_write}
+    read_only = {Path(path).resolve() for path in read_only} - read_write
+    mounts = {
+        str(path): {"bind": str(path), "mode": "ro"}
+        for path in read_only
+        if not any(parent in read_only for parent in path.parents)
+    }
+    mounts.update({str(path): {"bind": str(path), "mode": "rw"} for path in read_write})
+    return mounts
+
+
+class ContainerPool:
+    """
+    A pool of long-lived LIRICAL containers that jobs are run in with docker exec.
+
+    The containers are started once, with the LIRICAL data, the Exomiser databases and the
+    corpus mounted read-only and the results directory read-write, and then idle until a job is
+    executed in one of them; a job waits for a free container. Each exec runs a single job, so
+    jobs share the container's page cache of the mounted databases but not a JVM. Jobs run in
+    the container do not inherit the CPU affinity of the worker running them; with pin_cpus,
+    each job is run with taskset on the CPUs its worker is pinned to.
+    """
+
+    def __init__(
+        self,
+        image: str,
+        size: int,
+        mounts: dict[str, dict],
+        client: docker.DockerClient = None,
+        user: Optional[str] = None,
+        pin_cpus: bool = False,
+    ):
+        self.image = image
+        self.size = size
+        self.mounts = mounts
+        self.client = client
+        self.user = user if user is not None else self.host_user()
+        self.pin_cpus = pin_cpus and hasattr(os, "sched_getaffinity")
+        self.containers = []
+        self.idle = queue.Queue()
+
+    @staticmethod
+    def host_user() -> str:
+        """Return the uid:gid of this process, so that results are owned by the host user."""
+        return f"{os.getuid()}:{os.getgid()}" if hasattr(os, "getuid") else ""
+
+    def __enter__(self) -> "ContainerPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Start the containers of the pool."""
+        if self.client is None:
+            self.client = docker.from_env()
+        try:
+            for _ in range(self.size):
+                container = self.client.containers.run(
+                    self.image,
+                    entrypoint=["sleep", "infinity"],
+                    detach=True,
+                    volumes=self.mounts,
+                    user=self.user or None,
+                    labels={POOL_LABEL: str(os.getpid())},
+                )
+                self.containers.append(container)
+                self.idle.put(container)
+        except Exception:
+            self.close()
+            raise
+        print(f"started {self.size} LIRICAL containers from {self.image}")
+
+    def close(self) -> None:
+        """Remove the containers of the pool."""
+        for container in self.containers:
+            try:
+                container.remove(force=True)
+            except NotFound:
+                pass
+        self.containers = []
+        self.idle = queue.Queue()
+
+    def run_job(
+        self,
+        job: LiricalJob,
+        worker: int = None,
+        log_dir: Path = None,
+        timeout: float = None,
+        java_options: list[str] = None,
+    ) -> JobResult:
+        """Run a single LIRICAL job in the next idle container, as executor.run_job does locally."""
+        arguments = job_arguments(with_java_options(job.command, java_options))
+        if timeout:
+            arguments = ["timeout", str(timeout)] + arguments
+        if self.pin_cpus:
+            # the CPUs of the calling worker thread, as pinned by affinity.pin_worker
+            cpus = ",".join(str(cpu) for cpu in sorted(os.sched_getaffinity(0)))
+            arguments = ["taskset", "-c", cpus] + arguments
+        container = self.idle.get()
+        start = time.perf_counter()
+        try:
+            returncode, output = container.exec_run(arguments, user=self.user)
+        finally:
+            self.idle.put(container)
+        runtime = time.perf_counter() - start
+        log_path = log_dir.joinpath(f"{job.job_id.replace('/', '_')}.log") if log_dir else None
+        log_offset = 0
+        if log_path is not None:
+            with open(log_path, "ab") as log:
+                log_offset = log.tell()
+                log.write(output or b"")
+        elif output:
+            sys.stdout.write(output.decode(errors="replace"))
+        return JobResult(
+            job=job,
+            returncode=returncode,
+            runtime=runtime,
+            worker=worker,
+            failure=(
+                classify_failure(
+                    returncode,
+                    log_path,
+                    timed_out=bool(timeout) and returncode == TIMEOUT_EXIT_CODE,
+                    log_offset=log_offset,
+                )
+                if returncode != 0
+                else None
+            ),
+            log_path=log_path,
+        )
@@ -0,0 +1,527 @@
+import json
+import os
+import queue
+import re
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from pheval_lirical.prepare.prepare_commands import BATCH_LAUNCHER, database_assembly
+from pheval_lirical.run.affinity import pin_worker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass
+class LiricalJob:
+    """A single LIRICAL invocation, read from a line of the batch file."""
+
+    job_id: str
+    command: str
+    result_names: list[str] = field(default_factory=list)
+    assembly: Optional[str] = None
+
+
+@dataclass
+class JobResult:
+    """The outcome of running a LIRICAL job."""
+
+    job: LiricalJob
+    returncode: int
+    runtime: float
+    worker: Optional[int] = None
+    max_rss: Optional[int] = None
+    failure: Optional[str] = None
+    attempts: int = 1
+    log_path: Optional[Path] = None
+
+
+FAILURE_PATTERNS = [
+    (
+        "out_of_memory",
+        re.compile(
+            r"java\.lang\.OutOfMemoryError|Cannot allocate memory|"
+            r"insufficient memory for the Java Runtime Environment"
+        ),
+    ),
+    (
+        "corrupt_vcf",
+        re.compile(
+            r"TribbleException|Not in GZIP format|ZipException|Unexpected end of ZLIB input|"
+            r"malformed header|Invalid VCF"
+        ),
+    ),
+    ("missing_file", re.compile(r"NoSuchFileException|FileNotFoundException|No such file")),
+]
+# failures worth running again; missing files and corrupt VCFs fail the same way every time
+TRANSIENT_FAILURES = {"out_of_memory", "timeout", "unknown"}
+# SIGKILL, as sent by the kernel OOM killer, seen directly or through a shell
+OOM_KILLED_RETURNCODES = {-9, 137}
+LOG_TAIL_BYTES = 65536
+
+
+@dataclass
+class RetryPolicy:
+    """How failed LIRICAL jobs are run again."""
+
+    max_retries: int = 0
+    backoff: float = 30.0
+    timeout: Optional[float] = None
+    java_max_heap_mb: Optional[int] = None
+    default_java_max_heap_mb: int = 4096
+
+
+def _argument_value(arguments: list[str], flag: str) -> Optional[str]:
+    """Return the value following a flag in a list of command line arguments."""
+    return arguments[arguments.index(flag) + 1] if flag in arguments else None
+
+
+def parse_job(job_id: str, command: str) -> LiricalJob:
+    """
+    Parse a LIRICAL command line into a job.
+
+    Batch commands running several cases through the bundled launcher are read from their
+    arguments file, so that the job knows every result it writes.
+    Args:
+        job_id (str): Identifier of the job.
+        command (str): The command line, as written to the batch file.
+    Returns:
+        LiricalJob: The parsed job.
+    """
+    arguments = shlex.split(command)
+    if str(BATCH_LAUNCHER) in arguments:
+        with open(arguments[arguments.index(str(BATCH_LAUNCHER)) + 1]) as arguments_file:
+            cases = [shlex.split(line) for line in arguments_file if line.strip()]
+    else:
+        cases = [arguments]
+    return LiricalJob(
+        job_id=job_id,
+        command=command,
+        result_names=[_argument_value(case, "--prefix") for case in cases],
+        assembly=_argument_value(cases[0], "--assembly") if cases else None,
+    )
+
+
+def read_jobs(batch_file: Path) -> list[LiricalJob]:
+    """Read the jobs from a LIRICAL batch file, one job per command line."""
+    with open(batch_file) as commands:
+        lines = [line.strip() for line in commands if line.strip()]
+    return [parse_job(f"{batch_file.stem}-{i:06d}", line) for i, line in enumerate(lines)]
+
+
+def wait_process(process: subprocess.Popen) -> tuple[int, Optional[int]]:
+    """
+    Wait for a process to exit, returning its return code and, where available, the peak resident
+    memory in bytes of it and its descendants.
+    """
+    if not hasattr(os, "wait4"):  # Windows
+        return process.wait(), None
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return process.returncode, rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def kill_process(process: subprocess.Popen) -> None:
+    """Kill a process started in its own session, together with the JVMs it started."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:  # Windows
+        process.kill()
+
+
+def with_java_options(command: str, java_options: list[str]) -> str:
+    """Return a java command line with the given JVM options, replacing any maximum heap size."""
+    if not java_options or not command.startswith("java "):
+        return command
+    if any(option.startswith("-Xmx") for option in java_options):
+        command = re.sub(r" -Xmx\S+", "", command)
+    return " ".join(["java"] + java_options) + command[len("java") :]
+
+
+def job_arguments(command: str) -> list[str]:
+    """
+    Return the arguments to start a job's process with.
+
+    The java commands written by the prepare stage are run directly, without the start-up and
+    quoting of a shell; any other command line is run through bash.
+    """
+    if command.startswith("java "):
+        return shlex.split(command)
+    return ["bash", "-c", command]
+
+
+def classify_failure(
+    returncode: int, log_path: Optional[Path], timed_out: bool = False, log_offset: int = 0
+) -> str:
+    """
+    Classify why a LIRICAL job failed, from its exit code and the end of its log.
+    Args:
+        returncode (int): The exit code of the job.
+        log_path (Optional[Path]): The log of the job's output, if it was captured.
+        timed_out (bool): Whether the job was killed for running too long.
+        log_offset (int): Where the output of this attempt starts in the log.
+    Returns:
+        str: One of out_of_memory, corrupt_vcf, missing_file, timeout or unknown. Jobs that could
+        not be started at all are recorded as missing_file, and jobs whose runner raised as
+        runner_error.
+    """
+    if timed_out:
+        return "timeout"
+    if log_path is not None and log_path.exists():
+        with open(log_path, "rb") as log:
+            log.seek(max(log_path.stat().st_size - LOG_TAIL_BYTES, log_offset))
+            log_tail = log.read().decode(errors="replace")
+        for failure, pattern in FAILURE_PATTERNS:
+            if pattern.search(log_tail):
+                return failure
+    if returncode in OOM_KILLED_RETURNCODES:
+        return "out_of_memory"
+    return "unknown"
+
+
+def run_job(
+    job: LiricalJob,
+    worker: int = None,
+    log_dir: Path = None,
+    timeout: float = None,
+    java_options: list[str] = None,
+) -> JobResult:
+    """
+    Run a single LIRICAL job, appending its output to a log in log_dir if given.
+
+    A job whose executable cannot be started fails with return code 127, as it would in a shell.
+    """
+    log_path = log_dir.joinpath(f"{job.job_id.replace('/', '_')}.log") if log_dir else None
+    log = open(log_path, "ab") if log_path else None
+    log_offset = log.tell() if log else 0
+    start = time.perf_counter()
+    try:
+        try:
+            process = subprocess.Popen(
+                job_arguments(with_java_options(job.command, java_options)),
+                shell=False,
+                stdout=log,
+                stderr=subprocess.STDOUT if log else None,
+                start_new_session=hasattr(os, "killpg"),
+            )
+        except OSError as error:
+            if log is not None:
+                log.write(f"{error}\n".encode())
+            else:
+                print(f"LIRICAL job {job.job_id} could not be started: {error}")
+            return JobResult(
+                job=job,
+                returncode=127,
+                runtime=time.perf_counter() - start,
+                worker=worker,
+                failure="missing_file",
+                log_path=log_path,
+            )
+        timed_out = threading.Event()
+
+        def kill_timed_out() -> None:
+            timed_out.set()
+            kill_process(process)
+
+        timer = threading.Timer(timeout, kill_timed_out) if timeout else None
+        if timer is not None:
+            timer.start()
+        returncode, max_rss = wait_process(process)
+        if timer is not None:
+            timer.cancel()
+    finally:
+        if log is not None:
+            log.close()
+    return JobResult(
+        job=job,
+        returncode=returncode,
+        runtime=time.perf_counter() - start,
+        worker=worker,
+        max_rss=max_rss,
+        failure=(
+            classify_failure(returncode, log_path, timed_out.is_set(), log_offset)
+            if returncode != 0
+            else None
+        ),
+        log_path=log_path,
+    )
+
+
+def run_job_with_retries(
+    job: LiricalJob,
+    worker: int = None,
+    log_dir: Path = None,
+    retry_policy: RetryPolicy = None,
+    job_runner: Callable[..., JobResult] = run_job,
+    java_options: list[str] = None,
+) -> JobResult:
+    """
+    Run a LIRICAL job, running it again after transient failures as the retry policy allows.
+
+    Retries wait with exponential backoff; a job that ran out of memory is given twice the
+    maximum heap, and a job that timed out twice the time. Each attempt is run with job_runner,
+    which takes the arguments of run_job, and with any further JVM options in java_options.
+    """
+    retry_policy = retry_policy or RetryPolicy()
+    heap_mb, timeout = retry_policy.java_max_heap_mb, retry_policy.timeout
+    for attempt in range(1, retry_policy.max_retries + 2):
+        job_result = job_runner(
+            job,
+            worker,
+            log_dir,
+            timeout,
+            java_options=(java_options or []) + ([f"-Xmx{heap_mb}m"] if heap_mb else []),
+        )
+        job_result.attempts = attempt
+        if job_result.returncode == 0 or job_result.failure not in TRANSIENT_FAILURES:
+            return job_result
+        if attempt > retry_policy.max_retries:
+            break
+        if job_result.failure == "out_of_memory":
+            heap_mb = 2 * (heap_mb or retry_policy.default_java_max_heap_mb)
+        elif job_result.failure == "timeout":
+            timeout *= 2
+        print(f"LIRICAL job {job.job_id} failed ({job_result.failure}), retry {attempt}")
+        time.sleep(retry_policy.backoff * 2 ** (attempt - 1))
+    return job_result
+
+
+def run_worker_job(
+    job: LiricalJob,
+    worker: int = None,
+    log_dir: Path = None,
+    retry_policy: RetryPolicy = None,
+    job_runner: Callable[..., JobResult] = run_job,
+    java_options: list[str] = None,
+) -> JobResult:
+    """
+    Run a job for a worker with run_job_with_retries, recording any exception the job runner
+    raises as a failure of the job, so that the worker goes on and the job is not lost.
+    """
+    try:
+        return run_job_with_retries(job, worker, log_dir, retry_policy, job_runner, java_options)
+    except Exception:  # noqa: B902 recorded in the failed jobs manifest instead
+        traceback.print_exc()
+        return JobResult(job=job, returncode=1, runtime=0.0, worker=worker, failure="runner_error")
+
+
+def assign_workers(jobs: list[LiricalJob], max_workers: int) -> list[Optional[str]]:
+    """
+    Assign each worker the database assembly it starts on, in proportion to the jobs per assembly.
+
+    Every assembly gets at least one worker while there are workers to spare.
+    Args:
+        jobs (list[LiricalJob]): The jobs to run.
+        max_workers (int): The number of workers.
+    Returns:
+        list[Optional[str]]: The database assembly of each worker.
+    """
+    counts = Counter(database_assembly(job.assembly) for job in jobs)
+    if not counts:
+        return []
+    assemblies = sorted(counts, key=lambda assembly: (-counts[assembly], str(assembly)))
+    workers = {assembly: 0 for assembly in assemblies}
+    for _ in range(max_workers):
+        # give the next worker to the assembly with the most jobs per worker so far
+        assembly = max(assemblies, key=lambda assembly: counts[assembly] / (workers[assembly] + 1))
+        workers[assembly] += 1
+    return [assembly for assembly in assemblies for _ in range(workers[assembly])]
+
+
+def run_jobs(
+    jobs: list[LiricalJob],
+    max_workers: int = 1,
+    on_complete: Callable[[JobResult], None] = None,
+    route_by_assembly: bool = False,
+    on_start: Callable[[LiricalJob], None] = None,
+    log_dir: Path = None,
+    retry_policy: RetryPolicy = None,
+    job_runner: Callable[..., JobResult] = run_job,
+    cpu_sets: list[set[int]] = None,
+) -> list[JobResult]:
+    """
+    Run LIRICAL jobs with a pool of workers.
+
+    With route_by_assembly, jobs are queued per Exomiser database assembly and each worker runs
+    the jobs of a single assembly, so that its JVMs page only one database into the cache. A
+    worker whose assembly has run out takes over the longest remaining queue. With cpu_sets,
+    each worker, and the JVMs it starts, is pinned to its CPU set, with as many garbage
+    collector threads as it has CPUs.
+    Args:
+        jobs (list[LiricalJob]): The jobs to run.
+        max_workers (int): The number of jobs to run concurrently.
+        on_complete (Callable[[JobResult], None]): Called, in the calling thread, as each job ends.
+        route_by_assembly (bool): Whether to route jobs to workers by database assembly.
+        on_start (Callable[[LiricalJob], None]): Called, in the worker thread, as each job starts.
+        log_dir (Path): Directory to write the output of each job to.
+        retry_policy (RetryPolicy): How to run failed jobs again.
+        job_runner (Callable[..., JobResult]): Runs a single job, as run_job does locally.
+        cpu_sets (list[set[int]]): The CPUs to pin each worker to.
+    Returns:
+        list[JobResult]: The result of every job, in order of completion.
+    """
+    if not jobs:
+        return []
+    if route_by_assembly:
+        worker_assemblies = assign_workers(jobs, max_workers)
+        # every assembly is queued, also those left without a worker of their own
+        job_queues = {}
+        for job in jobs:
+            job_queues.setdefault(database_assembly(job.assembly), deque()).append(job)
+    else:
+        worker_assemblies = [None] * max_workers
+        job_queues = {None: deque(jobs)}
+    lock = threading.Lock()
+    completed = queue.Queue()
+
+    def next_job(assembly: Optional[str]) -> Optional[LiricalJob]:
+        with lock:
+            if not job_queues.get(assembly):
+                assembly = max(job_queues, key=lambda queued: len(job_queues[queued]))
+            return job_queues[assembly].popleft() if job_queues[assembly] else None
+
+    def work(worker: int, assembly: Optional[str]) -> None:
+        try:
+            java_options = pin_worker(cpu_sets, worker)
+            while (job := next_job(assembly)) is not None:
+                if on_start is not None:
+                    on_start(job)
+                completed.put(
+                    run_worker_job(job, worker, log_dir, retry_policy, job_runner, java_options)
+                )
+                if route_by_assembly:
+                    assembly = database_assembly(job.assembly)
+        finally:
+            completed.put(None)
+
+    threads = [
+        threading.Thread(target=work, args=(worker, assembly), daemon=True)
+        for worker, assembly in enumerate(worker_assemblies[: max(len(jobs), 1)])
+    ]
+    for thread in threads:
+        thread.start()
+    job_results, running = [], len(threads)
+    while running:
+        job_result = completed.get()
+        if job_result is None:
+            running -= 1
+            continue
+        job_results.append(job_result)
+        if on_complete is not None:
+            on_complete(job_result)
+    return job_results
+
+
+@dataclass
+class RunMetrics:
+    """Metrics of a LIRICAL run."""
+
+    jobs: int
+    failed: int
+    runtime: float
+    route_by_assembly: bool
+    worker_assemblies: dict[int, list[Optional[str]]]
+    database_switches: int
+    child_major_page_faults: Optional[int] = None
+
+    def write(self, metrics_path: Path) -> None:
+        """Write the metrics as JSON."""
+        with open(metrics_path, "w") as metrics_file:
+            json.dump(asdict(self), metrics_file, indent=2)
+
+
+def database_switches(job_results: list[JobResult]) -> int:
+    """
+    Return the number of times a worker moved to a job using another Exomiser database.
+
+    Each switch means the worker's JVMs page a different database into the cache.
+    """
+    switches = 0
+    for worker_job_results in _worker_job_results(job_results).values():
+        assemblies = [database_assembly(result.job.assembly) for result in worker_job_results]
+        switches += sum(1 for a, b in zip(assemblies, assemblies[1:]) if a != b)
+    return switches
+
+
+def _worker_job_results(job_results: list[JobResult]) -> dict[int, list[JobResult]]:
+    worker_job_results = {}
+    for job_result in job_results:
+        worker_job_results.setdefault(job_result.worker, []).append(job_result)
+    return worker_job_results
+
+
+def child_major_page_faults() -> Optional[int]:
+    """Return the major page faults of all waited-for child processes, where available."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_majflt
+
+
+def run_metrics(
+    job_results: list[JobResult],
+    runtime: float,
+    route_by_assembly: bool,
+    major_page_faults: Optional[int] = None,
+) -> RunMetrics:
+    """Summarise the job results of a run."""
+    return RunMetrics(
+        jobs=len(job_results),
+        failed=sum(1 for job_result in job_results if job_result.returncode != 0),
+        runtime=runtime,
+        route_by_assembly=route_by_assembly,
+        worker_assemblies={
+            worker: sorted({database_assembly(result.job.assembly) for result in results}, key=str)
+            for worker, results in sorted(_worker_job_results(job_results).items())
+        },
+        database_switches=database_switches(job_results),
+        child_major_page_faults=major_page_faults,
+    )
+
+
+def write_failed_jobs(job_results: list[JobResult], failed_jobs_path: Path) -> None:
+    """Write the jobs that failed, and why, as a JSON manifest that can be run again."""
+    failed_jobs = [
+        {
+            **asdict(job_result.job),
+            "returncode": job_result.returncode,
+            "failure": job_result.failure,
+            "attempts": job_result.attempts,
+            "log_path": str(job_result.log_path) if job_result.log_path else None,
+        }
+        for job_result in job_results
+        if job_result.returncode != 0
+    ]
+    # written atomically, as the workers of a shared queue each write the manifest
+    temporary_path = failed_jobs_path.with_name(f".{failed_jobs_path.name}.{os.getpid()}.tmp")
+    with open(temporary_path, "w") as failed_jobs_file:
+        json.dump(failed_jobs, failed_jobs_file, indent=2)
+    os.replace(temporary_path, failed_jobs_path)
+
+
+def read_failed_jobs(failed_jobs_path: Path) -> list[LiricalJob]:
+    """Read the jobs of a failed jobs manifest written with write_failed_jobs."""
+    with open(failed_jobs_path) as failed_jobs_file:
+        return [
+            LiricalJob(
+                job_id=failed_job["job_id"],
+                command=failed_job["command"],
+                result_names=failed_job["result_names"],
+                assembly=failed_job["assembly"],
+            )
+            for failed_job in json.load(failed_jobs_file)
+        ]
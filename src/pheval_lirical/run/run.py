@@ -1,10 +1,65 @@
-import subprocess
+import time
+from collections import Counter
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 
-from pheval.utils.file_utils import all_files
+import click
 
-from pheval_lirical.prepare.prepare_commands import prepare_commands
-from pheval_lirical.tool_specific_configuration_parser import LIRICALToolSpecificConfigurations
+from pheval_lirical.metrics import (
+    CASE_RUNTIME,
+    JOB_MAX_RSS,
+    JOBS_COMPLETED,
+    JOBS_FAILED,
+    JOBS_STARTED,
+    QUEUE_DEPTH,
+    REGISTRY,
+)
+from pheval_lirical.prepare.prepare_commands import BATCH_LAUNCHER, prepare_commands
+from pheval_lirical.prepare.stage_data import stage_data
+from pheval_lirical.progress import ProgressReporter
+from pheval_lirical.run.affinity import worker_cpu_sets
+from pheval_lirical.run.docker_pool import ContainerPool, container_mounts
+from pheval_lirical.run.executor import (
+    JobResult,
+    LiricalJob,
+    RetryPolicy,
+    child_major_page_faults,
+    read_failed_jobs,
+    read_jobs,
+    run_job,
+    run_jobs,
+    run_metrics,
+    write_failed_jobs,
+)
+from pheval_lirical.run.shared_queue import SharedJobQueue
+from pheval_lirical.tool_specific_configuration_parser import (
+    Execution,
+    LIRICALToolSpecificConfigurations,
+)
+
+# the phenopacket index needs polars, which is only imported once commands are prepared
+if TYPE_CHECKING:
+    from pheval_lirical.phenopacket_index import PhenopacketIndex
+
+RUN_METRICS_FILE_NAME = "pheval_lirical_run_metrics.json"
+FAILED_JOBS_FILE_NAME = "pheval_lirical_failed_jobs.json"
+LOG_DIR_NAME = "lirical_logs"
+
+
+def lirical_data_sources(
+    input_dir: Path, tool_specific_configurations: LIRICALToolSpecificConfigurations
+) -> dict[str, Path]:
+    """Return the LIRICAL data directory and configured Exomiser databases, keyed by name."""
+    exomiser_db_configurations = tool_specific_configurations.exomiser_db_configurations
+    sources = {"lirical_data": input_dir.joinpath("data")}
+    for name, database in [
+        ("exomiser_data", exomiser_db_configurations.exomiser_database),
+        ("exomiser_hg19_data", exomiser_db_configurations.exomiser_hg19_database),
+        ("exomiser_hg38_data", exomiser_db_configurations.exomiser_hg38_database),
+    ]:
+        if database is not None:
+            sources[name] = input_dir.joinpath(database)
+    return sources
 
 
 def prepare_lirical_commands(
@@ -16,20 +71,29 @@ def prepare_lirical_commands(
     tool_specific_configurations: LIRICALToolSpecificConfigurations,
     gene_analysis: bool,
     variant_analysis: bool,
+    phenopacket_index_path: Path = None,
+    status_path: Path = None,
+    phenopacket_index: "PhenopacketIndex" = None,
 ):
     """Write commands to run LIRICAL."""
     phenopacket_dir = Path(testdata_dir).joinpath("phenopackets")
     vcf_dir = Path(testdata_dir).joinpath("vcf") if gene_analysis or variant_analysis else None
+    data_sources = lirical_data_sources(input_dir, tool_specific_configurations)
+    if tool_specific_configurations.data_staging is not None:
+        data_sources = stage_data(
+            sources=data_sources,
+            scratch_dir=tool_specific_configurations.data_staging.scratch_dir,
+            hard_link=tool_specific_configurations.data_staging.hard_link,
+            remove_stale_after=(
+                None
+                if tool_specific_configurations.data_staging.remove_stale_after_hours is None
+                else tool_specific_configurations.data_staging.remove_stale_after_hours * 3600
+            ),
+        )
     prepare_commands(
         lirical_jar=input_dir.joinpath(tool_specific_configurations.lirical_jar_executable),
-        input_dir=input_dir.joinpath("data"),
-        exomiser_data_dir=(
-            input_dir.joinpath(
-                tool_specific_configurations.exomiser_db_configurations.exomiser_database
-            )
-            if tool_specific_configurations.exomiser_db_configurations.exomiser_database is not None
-            else None
-        ),
+        input_dir=data_sources["lirical_data"],
+        exomiser_data_dir=data_sources.get("exomiser_data"),
         phenopacket_dir=phenopacket_dir,
         vcf_dir=vcf_dir,
         file_prefix=Path(testdata_dir).name,
@@ -37,35 +101,335 @@ def prepare_lirical_commands(
         raw_results_dir=raw_results_dir,
         mode=tool_specific_configurations.mode,
         lirical_version=lirical_version,
-        exomiser_hg19_data=(
-            input_dir.joinpath(
-                tool_specific_configurations.exomiser_db_configurations.exomiser_hg19_database
-            )
-            if tool_specific_configurations.exomiser_db_configurations.exomiser_hg19_database
-            else None
-        ),
-        exomiser_hg38_data=(
-            input_dir.joinpath(
-                tool_specific_configurations.exomiser_db_configurations.exomiser_hg38_database
-            )
-            if tool_specific_configurations.exomiser_db_configurations.exomiser_hg38_database
-            is not None
-            else None
-        ),
+        exomiser_hg19_data=data_sources.get("exomiser_hg19_data"),
+        exomiser_hg38_data=data_sources.get("exomiser_hg38_data"),
         gene_analysis=gene_analysis,
         variant_analysis=variant_analysis,
-    ),
+        cases_per_jvm=tool_specific_configurations.cases_per_jvm,
+        phenopacket_index_path=phenopacket_index_path,
+        status_path=status_path,
+        phenopacket_index=phenopacket_index,
+        preflight_check=tool_specific_configurations.preflight_check,
+        argument_files=tool_specific_configurations.argument_files,
+    )
+
 
+def run_lirical_local(
+    tool_input_commands_dir: Path,
+    testdata_dir: Path,
+    max_workers: int = 1,
+    on_complete: Callable[[JobResult], None] = None,
+    route_by_assembly: bool = False,
+    metrics_path: Path = None,
+    status_path: Path = None,
+    log_dir: Path = None,
+    retry_policy: RetryPolicy = None,
+    failed_jobs_path: Path = None,
+    retry_failed: bool = False,
+    queue_dir: Path = None,
+    job_runner: Callable[..., JobResult] = run_job,
+    pin_workers: bool = False,
+    numa_aware: bool = True,
+) -> list[JobResult]:
+    """
+    Run LIRICAL locally, with max_workers jobs at a time, optionally writing run metrics and
+    periodically writing progress to status_path.
+
+    The jobs that still fail after the retries of retry_policy are written to the manifest at
+    failed_jobs_path; with retry_failed, only the jobs of that manifest are run. With queue_dir,
+    the jobs are shared through that queue directory with every other worker using it. Each
+    job is run with job_runner, such as the run_job of a ContainerPool. With pin_workers, each
+    worker is pinned to its own CPU set, kept within a NUMA node with numa_aware.
+    """
+    jobs = (
+        read_failed_jobs(failed_jobs_path)
+        if retry_failed
+        else read_jobs(batch_file_path(tool_input_commands_dir, testdata_dir))
+    )
+    return run_lirical_jobs(
+        jobs,
+        max_workers=max_workers,
+        on_complete=on_complete,
+        route_by_assembly=route_by_assembly,
+        metrics_path=metrics_path,
+        status_path=status_path,
+        log_dir=log_dir,
+        retry_policy=retry_policy,
+        failed_jobs_path=failed_jobs_path,
+        job_queue=SharedJobQueue.join(queue_dir, jobs) if queue_dir is not None else None,
+        job_runner=job_runner,
+        pin_workers=pin_workers,
+        numa_aware=numa_aware,
+    )
+
+
+def execution_retry_policy(execution: Execution) -> RetryPolicy:
+    """Return the retry policy of the execution settings."""
+    return RetryPolicy(
+        max_retries=execution.max_retries,
+        backoff=execution.retry_backoff,
+        timeout=execution.job_timeout,
+        java_max_heap_mb=execution.java_max_heap_mb,
+    )
+
+
+def lirical_container_pool(
+    input_dir: Path,
+    testdata_dir: Path,
+    tool_specific_configurations: LIRICALToolSpecificConfigurations,
+    read_write: list[Path],
+    read_only: list[Path] = (),
+    client=None,
+    configurations: list[LIRICALToolSpecificConfigurations] = (),
+) -> Optional[ContainerPool]:
+    """
+    Return the pool of LIRICAL containers configured in the docker section, if there is one.
 
-def run_lirical_local(tool_input_commands_dir: Path, testdata_dir: Path):
-    """Run LIRICAL locally."""
-    batch_file = [
+    The LIRICAL jar directory, data, Exomiser databases and data staging of
+    tool_specific_configurations and of any other configurations the pool runs jobs for, the
+    corpus, the batch launcher and any read_only paths are mounted read-only; the read_write
+    paths, where the results are written, read-write.
+    """
+    docker_configuration = tool_specific_configurations.docker
+    if docker_configuration is None:
+        return None
+    read_only = [
+        input_dir,
+        testdata_dir,
+        BATCH_LAUNCHER.parent,
+        *read_only,
+        *docker_configuration.mounts,
+    ]
+    for configuration in [tool_specific_configurations, *configurations]:
+        read_only.append(input_dir.joinpath(configuration.lirical_jar_executable).parent)
+        read_only.extend(lirical_data_sources(input_dir, configuration).values())
+        if configuration.data_staging is not None:
+            read_only.append(configuration.data_staging.scratch_dir)
+    return ContainerPool(
+        image=docker_configuration.image,
+        size=docker_configuration.pool_size or tool_specific_configurations.execution.max_workers,
+        mounts=container_mounts(read_only, read_write),
+        client=client,
+        pin_cpus=tool_specific_configurations.execution.pin_workers,
+    )
+
+
+def batch_file_path(tool_input_commands_dir: Path, testdata_dir: Path) -> Path:
+    """Return the path of the LIRICAL batch file written for a testdata directory."""
+    from pheval.utils.file_utils import all_files
+
+    return [
         file
         for file in all_files(Path(tool_input_commands_dir))
         if file.name.startswith(Path(testdata_dir).name)
     ][0]
-    print("running LIRICAL")
-    subprocess.run(
-        ["bash", str(batch_file)],
-        shell=False,
+
+
+def run_lirical_jobs(
+    jobs: list[LiricalJob],
+    max_workers: int = 1,
+    on_complete: Callable[[JobResult], None] = None,
+    route_by_assembly: bool = False,
+    metrics_path: Path = None,
+    status_path: Path = None,
+    log_dir: Path = None,
+    retry_policy: RetryPolicy = None,
+    failed_jobs_path: Path = None,
+    job_queue: SharedJobQueue = None,
+    job_runner: Callable[..., JobResult] = run_job,
+    pin_workers: bool = False,
+    numa_aware: bool = True,
+) -> list[JobResult]:
+    """
+    Run LIRICAL jobs, reporting their progress and metrics and writing the failed jobs.
+
+    With job_queue, the jobs left in that shared queue are run instead of jobs; the metrics of
+    this worker are written next to metrics_path, suffixed with its worker ID, and the failed
+    jobs manifest lists the failed jobs of every worker of the queue, as recorded in it. With
+    pin_workers, each worker and its JVMs run on a CPU set of their own, within a single NUMA
+    node with numa_aware, and the JVM garbage collector threads are sized to match.
+    """
+    if log_dir is not None:
+        log_dir.mkdir(parents=True, exist_ok=True)
+    if job_queue is not None:
+        jobs = job_queue.pending_jobs()
+        print(f"joining the LIRICAL job queue in {job_queue.queue_dir} as {job_queue.worker_id}")
+    print(f"running LIRICAL: {len(jobs)} jobs with {max_workers} workers")
+    cpu_sets = worker_cpu_sets(max_workers, numa_aware) if pin_workers else None
+    if cpu_sets is not None:
+        print(
+            "pinning LIRICAL workers to CPUs: "
+            + "; ".join(f"{worker}: {sorted(cpus)}" for worker, cpus in enumerate(cpu_sets))
+        )
+    progress = ProgressReporter(
+        "run", sum(len(job.result_names) for job in jobs), status_path, workers=max_workers
+    )
+
+    queued = len(jobs)
+    QUEUE_DEPTH.set(queued)
+
+    def job_start(job: LiricalJob) -> None:
+        nonlocal queued
+        JOBS_STARTED.inc()
+        with REGISTRY.lock:
+            queued -= 1
+            QUEUE_DEPTH.set(queued)
+
+    def job_complete(job_result: JobResult) -> None:
+        cases = max(len(job_result.job.result_names), 1)
+        progress.update(
+            cases=cases, failed=job_result.returncode != 0, latency=job_result.runtime / cases
+        )
+        if job_result.returncode == 0:
+            JOBS_COMPLETED.inc()
+        else:
+            JOBS_FAILED.inc()
+        for _ in range(cases):
+            CASE_RUNTIME.observe(job_result.runtime / cases)
+        if job_result.max_rss is not None:
+            JOB_MAX_RSS.observe(job_result.max_rss)
+        if on_complete is not None:
+            on_complete(job_result)
+
+    start, major_page_faults = time.perf_counter(), child_major_page_faults()
+    with progress:
+        if job_queue is not None:
+            job_results = job_queue.run(
+                max_workers=max_workers,
+                on_complete=job_complete,
+                on_start=job_start,
+                log_dir=log_dir,
+                retry_policy=retry_policy,
+                job_runner=job_runner,
+                cpu_sets=cpu_sets,
+            )
+        else:
+            job_results = run_jobs(
+                jobs,
+                max_workers=max_workers,
+                on_complete=job_complete,
+                route_by_assembly=route_by_assembly,
+                on_start=job_start,
+                log_dir=log_dir,
+                retry_policy=retry_policy,
+                job_runner=job_runner,
+                cpu_sets=cpu_sets,
+            )
+    metrics = run_metrics(
+        job_results,
+        runtime=time.perf_counter() - start,
+        route_by_assembly=route_by_assembly,
+        major_page_faults=(
+            child_major_page_faults() - major_page_faults if major_page_faults is not None else None
+        ),
+    )
+    print(
+        f"ran {metrics.jobs} LIRICAL jobs in {metrics.runtime:.1f}s with "
+        f"{metrics.database_switches} Exomiser database switches across workers"
+    )
+    if metrics_path is not None:
+        if job_queue is not None:
+            # the metrics of this worker only, alongside those of the other workers
+            metrics_path = metrics_path.with_name(
+                f"{metrics_path.stem}-{job_queue.worker_id}{metrics_path.suffix}"
+            )
+        metrics.write(metrics_path)
+    if failed_jobs_path is not None:
+        write_failed_jobs(
+            job_queue.failed_job_results() if job_queue is not None else job_results,
+            failed_jobs_path,
+        )
+    failed = [job_result for job_result in job_results if job_result.returncode != 0]
+    if failed:
+        failures = Counter(job_result.failure for job_result in failed)
+        print(
+            f"{len(failed)} LIRICAL jobs failed "
+            f"({', '.join(f'{count} {failure}' for failure, count in sorted(failures.items()))}): "
+            f"{', '.join(r.job.job_id for r in failed)}"
+        )
+    return job_results
+
+
+@click.command("run")
+@click.option(
+    "--tool-input-commands-dir",
+    "-c",
+    required=True,
+    help="Path to the prepared LIRICAL batch files.",
+    type=Path,
+)
+@click.option(
+    "--testdata-dir",
+    "-t",
+    required=True,
+    help="Path to the corpus directory the commands were prepared for.",
+    type=Path,
+)
+@click.option(
+    "--output-dir",
+    "-o",
+    required=True,
+    help="Path to the output directory, for logs, metrics and the failed jobs manifest.",
+    type=Path,
+)
+@click.option(
+    "--max-workers",
+    required=False,
+    default=1,
+    show_default=True,
+    help="Number of LIRICAL jobs to run at a time.",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--max-retries",
+    required=False,
+    default=0,
+    show_default=True,
+    help="Number of times to run a job again after a transient failure.",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--retry-failed",
+    is_flag=True,
+    default=False,
+    help="Only run the jobs of the failed jobs manifest in the output directory.",
+)
+@click.option(
+    "--pin-workers/--no-pin-workers",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Pin each worker to its own CPU set, within a single NUMA node.",
+)
+@click.option(
+    "--queue-dir",
+    required=False,
+    default=None,
+    help="Shared directory to take jobs from, together with any other worker using it.",
+    type=Path,
+)
+def run_command(
+    tool_input_commands_dir: Path,
+    testdata_dir: Path,
+    output_dir: Path,
+    max_workers: int,
+    max_retries: int,
+    retry_failed: bool,
+    pin_workers: bool,
+    queue_dir: Path,
+):
+    """Run prepared LIRICAL commands."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    run_lirical_local(
+        tool_input_commands_dir=tool_input_commands_dir,
+        testdata_dir=testdata_dir,
+        max_workers=max_workers,
+        metrics_path=output_dir.joinpath(RUN_METRICS_FILE_NAME),
+        log_dir=output_dir.joinpath(LOG_DIR_NAME),
+        retry_policy=RetryPolicy(max_retries=max_retries),
+        failed_jobs_path=output_dir.joinpath(FAILED_JOBS_FILE_NAME),
+        retry_failed=retry_failed,
+        queue_dir=queue_dir,
+        pin_workers=pin_workers,
     )
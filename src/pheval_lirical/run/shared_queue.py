@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import socket
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Optional
+
+from pheval_lirical.run.affinity import pin_worker
+from pheval_lirical.run.executor import (
+    JobResult,
+    LiricalJob,
+    RetryPolicy,
+    run_job,
+    run_worker_job,
+)
+
+# written into jobs/ with the jobs, identifying the set of jobs the queue was filled with
+FINGERPRINT_FILE_NAME = "fingerprint.sha256"
+
+
+class JobQueueMismatchError(Exception):
+    """Raised when joining a queue that was filled with a different set of jobs."""
+
+
+def job_fingerprint(jobs: list[LiricalJob]) -> str:
+    """Return a checksum identifying a set of jobs and their commands."""
+    return hashlib.sha256(
+        json.dumps([asdict(job) for job in jobs], sort_keys=True).encode()
+    ).hexdigest()
+
+
+class SharedJobQueue:
+    """
+    A queue of LIRICAL jobs in a directory shared by several machines, needing no central service.
+
+    The queue directory holds one file per job under jobs/. A worker claims a job by creating its
+    claim file under claims/ with O_EXCL, which only one worker can do, keeps the claim alive by
+    touching it every heartbeat_interval seconds while the job runs, and marks the job done by
+    writing its outcome under done/. A claim that has not been touched for lease_timeout seconds
+    belongs to a worker that died or lost the filesystem, and is reclaimed by the next worker to
+    come across it. Workers can join or leave at any time; each takes the next free job as soon as
+    it is idle, so the jobs are shared out by how fast each machine runs them. Leases rely on the
+    file modification times the shared filesystem reports, so lease_timeout should be well above
+    the clock skew between machines.
+    """
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        worker_id: str = None,
+        lease_timeout: float = 300.0,
+        heartbeat_interval: float = 30.0,
+        poll_interval: float = 1.0,
+    ):
+        self.queue_dir = queue_dir
+        self.jobs_dir = queue_dir.joinpath("jobs")
+        self.claims_dir = queue_dir.joinpath("claims")
+        self.done_dir = queue_dir.joinpath("done")
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.keys = sorted(path.stem for path in self.jobs_dir.glob("*.json"))
+        self.held = set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def join(cls, queue_dir: Path, jobs: list[LiricalJob], **kwargs) -> "SharedJobQueue":
+        """
+        Join the queue in queue_dir, first filling it with jobs if no worker has yet.
+
+        The jobs are written to a temporary directory that is then renamed into place, so that
+        workers starting together agree on a single set of jobs. The queue is filled with a
+        fingerprint of its jobs, and joining a queue filled with other jobs, such as those of
+        commands prepared differently since, raises JobQueueMismatchError.
+        """
+        for directory in ["claims", "done"]:
+            queue_dir.joinpath(directory).mkdir(parents=True, exist_ok=True)
+        jobs_dir = queue_dir.joinpath("jobs")
+        fingerprint = job_fingerprint(jobs)
+        if not jobs_dir.exists():
+            temporary_dir = queue_dir.joinpath(f".jobs-{uuid.uuid4().hex}")
+            temporary_dir.mkdir()
+            for i, job in enumerate(jobs):
+                with open(temporary_dir.joinpath(f"{i:06d}.json"), "w") as job_file:
+                    json.dump(asdict(job), job_file)
+            temporary_dir.joinpath(FINGERPRINT_FILE_NAME).write_text(fingerprint)
+            try:
+                os.rename(temporary_dir, jobs_dir)
+                print(f"queued {len(jobs)} LIRICAL jobs in {queue_dir}")
+            except OSError:  # another worker filled the queue first
+                shutil.rmtree(temporary_dir)
+        fingerprint_path = jobs_dir.joinpath(FINGERPRINT_FILE_NAME)
+        if not fingerprint_path.exists() or fingerprint_path.read_text().strip() != fingerprint:
+            raise JobQueueMismatchError(
+                f"the LIRICAL job queue in {queue_dir} holds other jobs than those prepared; "
+                "use a new queue directory for these jobs"
+            )
+        return cls(queue_dir, **kwargs)
+
+    def _claim_path(self, key: str) -> Path:
+        return self.claims_dir.joinpath(f"{key}.claim")
+
+    def done_keys(self) -> set[str]:
+        """Return the keys of the jobs that are done."""
+        return {path.stem for path in self.done_dir.glob("*.json")}
+
+    def pending_jobs(self) -> list[LiricalJob]:
+        """Return the jobs that are not done yet."""
+        done = self.done_keys()
+        return [self.read_job(key) for key in self.keys if key not in done]
+
+    def read_job(self, key: str) -> LiricalJob:
+        with open(self.jobs_dir.joinpath(f"{key}.json")) as job_file:
+            return LiricalJob(**json.load(job_file))
+
+    def _try_claim(self, key: str) -> bool:
+        """Claim a job, reclaiming it if its claim is stale; return whether it was claimed."""
+        claim_path = self._claim_path(key)
+        try:
+            claim = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return self._reclaim_stale(key) and self._try_claim(key)
+        with os.fdopen(claim, "w") as claim_file:
+            json.dump({"worker": self.worker_id, "claimed_at": time.time()}, claim_file)
+        return True
+
+    def _reclaim_stale(self, key: str) -> bool:
+        """Remove the claim of a job if its lease has expired; return whether it was removed."""
+        claim_path = self._claim_path(key)
+        try:
+            if time.time() - claim_path.stat().st_mtime < self.lease_timeout:
+                return False
+            # renaming is atomic, so only one of the workers reclaiming the job gets it
+            stale_path = self.claims_dir.joinpath(f"{key}.stale-{uuid.uuid4().hex}")
+            os.rename(claim_path, stale_path)
+        except FileNotFoundError:
+            return False
+        if time.time() - stale_path.stat().st_mtime < self.lease_timeout:
+            # another worker reclaimed the job and claimed it afresh in between: put it back
+            try:
+                os.link(stale_path, claim_path)
+            except OSError:
+                pass
+            stale_path.unlink()
+            return False
+        print(f"reclaiming stale LIRICAL job {key} from {stale_path.read_text()}")
+        stale_path.unlink()
+        return True
+
+    def claim(self) -> Optional[tuple[str, LiricalJob]]:
+        """
+        Claim the next job, waiting while every job left is claimed by a live worker.
+        Returns:
+            Optional[tuple[str, LiricalJob]]: The key and job claimed, or None once all are done.
+        """
+        while True:
+            done = self.done_keys()
+            pending = [key for key in self.keys if key not in done]
+            if not pending:
+                return None
+            for key in pending:
+                with self.lock:
+                    if key in self.held or not self._try_claim(key):
+                        continue
+                    if self.done_dir.joinpath(f"{key}.json").exists():
+                        # finished by a worker whose lease had expired
+                        self._claim_path(key).unlink(missing_ok=True)
+                        continue
+                    self.held.add(key)
+                return key, self.read_job(key)
+            time.sleep(self.poll_interval)
+
+    def complete(self, key: str, job_result: JobResult) -> None:
+        """Mark a claimed job done, with its outcome, and release its claim."""
+        done_path = self.done_dir.joinpath(f"{key}.json")
+        temporary_path = self.done_dir.joinpath(f".{key}.{uuid.uuid4().hex}.tmp")
+        with open(temporary_path, "w") as done_file:
+            json.dump(
+                {
+                    "job_id": job_result.job.job_id,
+                    "worker": self.worker_id,
+                    "returncode": job_result.returncode,
+                    "failure": job_result.failure,
+                    "attempts": job_result.attempts,
+                    "runtime": job_result.runtime,
+                    "log_path": str(job_result.log_path) if job_result.log_path else None,
+                },
+                done_file,
+            )
+        os.replace(temporary_path, done_path)
+        with self.lock:
+            self.held.discard(key)
+            self._claim_path(key).unlink(missing_ok=True)
+
+    def failed_job_results(self) -> list[JobResult]:
+        """Return the outcome of every job done unsuccessfully, by any worker of the queue."""
+        job_results = []
+        for key in sorted(self.done_keys()):
+            with open(self.done_dir.joinpath(f"{key}.json")) as done_file:
+                done = json.load(done_file)
+            if done["returncode"] != 0:
+                job_results.append(
+                    JobResult(
+                        job=self.read_job(key),
+                        returncode=done["returncode"],
+                        runtime=done["runtime"],
+                        failure=done["failure"],
+                        attempts=done["attempts"],
+                        log_path=Path(done["log_path"]) if done.get("log_path") else None,
+                    )
+                )
+        return job_results
+
+    def heartbeat(self) -> None:
+        """Renew the leases of the jobs held."""
+        with self.lock:
+            for key in self.held:
+                try:
+                    os.utime(self._claim_path(key))
+                except FileNotFoundError:  # reclaimed by another worker; both may finish it
+                    pass
+
+    def run(
+        self,
+        max_workers: int = 1,
+        on_complete: Callable[[JobResult], None] = None,
+        on_start: Callable[[LiricalJob], None] = None,
+        log_dir: Path = None,
+        retry_policy: RetryPolicy = None,
+        job_runner: Callable[..., JobResult] = run_job,
+        cpu_sets: list[set[int]] = None,
+    ) -> list[JobResult]:
+        """
+        Work through the queue with max_workers jobs at a time until every job is done.
+        Args:
+            max_workers (int): The number of jobs to run concurrently.
+            on_complete (Callable[[JobResult], None]): Called, in the calling thread, as each job ends.
+            on_start (Callable[[LiricalJob], None]): Called, in the worker thread, as each job starts.
+            log_dir (Path): Directory to write the output of each job to.
+            retry_policy (RetryPolicy): How to run failed jobs again.
+            job_runner (Callable[..., JobResult]): Runs a single job, as run_job does locally.
+            cpu_sets (list[set[int]]): The CPUs to pin each worker to.
+        Returns:
+            list[JobResult]: The result of every job run by this worker, in order of completion.
+        """
+        completed, stopped = queue.Queue(), threading.Event()
+
+        def heartbeat() -> None:
+            while not stopped.wait(self.heartbeat_interval):
+                self.heartbeat()
+
+        def work(worker: int) -> None:
+            try:
+                java_options = pin_worker(cpu_sets, worker)
+                while (claimed := self.claim()) is not None:
+                    key, job = claimed
+                    if on_start is not None:
+                        on_start(job)
+                    job_result = run_worker_job(
+                        job, worker, log_dir, retry_policy, job_runner, java_options
+                    )
+                    self.complete(key, job_result)
+                    completed.put(job_result)
+            finally:
+                completed.put(None)
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        threads = [
+            threading.Thread(target=work, args=(worker,), daemon=True)
+            for worker in range(max_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        job_results, running = [], len(threads)
+        try:
+            while running:
+                job_result = completed.get()
+                if job_result is None:
+                    running -= 1
+                    continue
+                job_results.append(job_result)
+                if on_complete is not None:
+                    on_complete(job_result)
+        finally:
+            stopped.set()
+        return job_results
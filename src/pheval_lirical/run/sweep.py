@@ -0,0 +1,196 @@
+from contextlib import nullcontext
+from pathlib import Path
+
+import click
+import yaml
+
+from pheval_lirical.phenopacket_index import PHENOPACKET_INDEX_FILE_NAME, load_phenopacket_index
+from pheval_lirical.post_process.post_process import post_process_results_format
+from pheval_lirical.progress import STATUS_FILE_NAME
+from pheval_lirical.run.executor import JobResult, read_jobs, run_job
+from pheval_lirical.run.run import (
+    FAILED_JOBS_FILE_NAME,
+    LOG_DIR_NAME,
+    RUN_METRICS_FILE_NAME,
+    batch_file_path,
+    execution_retry_policy,
+    lirical_container_pool,
+    prepare_lirical_commands,
+    run_lirical_jobs,
+)
+from pheval_lirical.tool_specific_configuration_parser import LIRICALSweepConfigurations
+
+
+def configuration_directories(configuration_dir: Path) -> dict[str, Path]:
+    """Create the directories of a sweep configuration, returning them keyed by name."""
+    directories = {
+        name: configuration_dir.joinpath(name)
+        for name in [
+            "tool_input_commands",
+            "raw_results",
+            "pheval_gene_results",
+            "pheval_variant_results",
+            "pheval_disease_results",
+        ]
+    }
+    for directory in directories.values():
+        directory.mkdir(parents=True, exist_ok=True)
+    return directories
+
+
+def run_sweep(
+    input_dir: Path,
+    testdata_dir: Path,
+    output_dir: Path,
+    sweep: LIRICALSweepConfigurations,
+    disease_analysis: bool,
+    gene_analysis: bool,
+    variant_analysis: bool,
+) -> list[JobResult]:
+    """
+    Run LIRICAL over a corpus with every configuration of a sweep.
+
+    The phenopackets are indexed once for all configurations, the jobs of every configuration
+    are run by a single pool of workers, configured by the shared execution settings, and the
+    results of each configuration are written to a subdirectory of output_dir named after it.
+    Args:
+        input_dir (Path): The input directory holding the LIRICAL jars and data.
+        testdata_dir (Path): The corpus directory, holding phenopackets and vcf subdirectories.
+        output_dir (Path): The output directory.
+        sweep (LIRICALSweepConfigurations): The shared settings and the sweep matrix.
+        disease_analysis (bool): Whether to write disease results.
+        gene_analysis (bool): Whether to write gene results.
+        variant_analysis (bool): Whether to write variant results.
+    Returns:
+        list[JobResult]: The result of every job, of every configuration.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    configurations = sweep.configurations()
+    phenopacket_dir = testdata_dir.joinpath("phenopackets")
+    phenopacket_index_path = output_dir.joinpath(PHENOPACKET_INDEX_FILE_NAME)
+    status_path = output_dir.joinpath(STATUS_FILE_NAME)
+    phenopacket_index = load_phenopacket_index(phenopacket_dir, phenopacket_index_path, status_path)
+    jobs = []
+    for name, lirical_version, config in configurations:
+        directories = configuration_directories(output_dir.joinpath(name))
+        prepare_lirical_commands(
+            input_dir=input_dir,
+            tool_input_commands_dir=directories["tool_input_commands"],
+            raw_results_dir=directories["raw_results"],
+            testdata_dir=testdata_dir,
+            lirical_version=lirical_version,
+            tool_specific_configurations=config,
+            gene_analysis=gene_analysis,
+            variant_analysis=variant_analysis,
+            phenopacket_index_path=phenopacket_index_path,
+            phenopacket_index=phenopacket_index,
+        )
+        for job in read_jobs(batch_file_path(directories["tool_input_commands"], testdata_dir)):
+            job.job_id = f"{name}/{job.job_id}"
+            jobs.append(job)
+    print(f"sweeping {len(configurations)} LIRICAL configurations")
+    execution = sweep.tool_specific_configuration_options.execution
+    container_pool = lirical_container_pool(
+        input_dir=input_dir,
+        testdata_dir=testdata_dir,
+        tool_specific_configurations=sweep.tool_specific_configuration_options,
+        read_write=[output_dir],
+        configurations=[config for _, _, config in configurations],
+    )
+    with container_pool or nullcontext():
+        job_results = run_lirical_jobs(
+            jobs,
+            max_workers=execution.max_workers,
+            route_by_assembly=execution.route_by_assembly,
+            metrics_path=output_dir.joinpath(RUN_METRICS_FILE_NAME),
+            status_path=status_path,
+            log_dir=output_dir.joinpath(LOG_DIR_NAME),
+            retry_policy=execution_retry_policy(execution),
+            failed_jobs_path=output_dir.joinpath(FAILED_JOBS_FILE_NAME),
+            job_runner=container_pool.run_job if container_pool else run_job,
+            pin_workers=execution.pin_workers,
+            numa_aware=execution.numa_aware,
+        )
+    for name, _, config in configurations:
+        post_process_results_format(
+            raw_results_dir=output_dir.joinpath(name, "raw_results"),
+            output_dir=output_dir.joinpath(name),
+            phenopacket_dir=phenopacket_dir,
+            config=config,
+            disease_analysis=disease_analysis,
+            gene_analysis=gene_analysis,
+            variant_analysis=variant_analysis,
+            phenopacket_index_path=phenopacket_index_path,
+            status_path=status_path,
+        )
+    return job_results
+
+
+@click.command("sweep")
+@click.option(
+    "--input-dir",
+    "-i",
+    required=True,
+    help="Path to the input directory holding the LIRICAL jars and data.",
+    type=Path,
+)
+@click.option(
+    "--testdata-dir",
+    "-t",
+    required=True,
+    help="Path to the corpus directory, holding phenopackets and vcf subdirectories.",
+    type=Path,
+)
+@click.option("--output-dir", "-o", required=True, help="Path to output directory.", type=Path)
+@click.option(
+    "--sweep-config",
+    "-c",
+    required=True,
+    help="Path to the sweep yaml, with the shared settings and the sweep matrix.",
+    type=Path,
+)
+@click.option(
+    "--disease-analysis/--no-disease-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for disease prioritisation",
+)
+@click.option(
+    "--gene-analysis/--no-gene-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for gene prioritisation",
+)
+@click.option(
+    "--variant-analysis/--no-variant-analysis",
+    default=False,
+    required=False,
+    type=bool,
+    show_default=True,
+    help="Specify analysis for variant prioritisation",
+)
+def sweep_command(
+    input_dir: Path,
+    testdata_dir: Path,
+    output_dir: Path,
+    sweep_config: Path,
+    disease_analysis: bool,
+    gene_analysis: bool,
+    variant_analysis: bool,
+):
+    """Run LIRICAL over a corpus with several configurations."""
+    with open(sweep_config) as sweep_file:
+        sweep = LIRICALSweepConfigurations.parse_obj(yaml.safe_load(sweep_file))
+    run_sweep(
+        input_dir=input_dir,
+        testdata_dir=testdata_dir,
+        output_dir=output_dir,
+        sweep=sweep,
+        disease_analysis=disease_analysis,
+        gene_analysis=gene_analysis,
+        variant_analysis=variant_analysis,
+    )
@@ -1,12 +1,26 @@
 """LIRICAL Runner"""
 
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
 
 from pheval.runners.runner import PhEvalRunner
 
+from pheval_lirical.metrics import MetricsExporter
+from pheval_lirical.phenopacket_index import PHENOPACKET_INDEX_FILE_NAME
 from pheval_lirical.post_process.post_process import post_process_results_format
-from pheval_lirical.run.run import prepare_lirical_commands, run_lirical_local
+from pheval_lirical.post_process.streaming import StreamingPostProcessor
+from pheval_lirical.progress import STATUS_FILE_NAME
+from pheval_lirical.run.executor import run_job
+from pheval_lirical.run.run import (
+    FAILED_JOBS_FILE_NAME,
+    LOG_DIR_NAME,
+    RUN_METRICS_FILE_NAME,
+    execution_retry_policy,
+    lirical_container_pool,
+    prepare_lirical_commands,
+    run_lirical_local,
+)
 from pheval_lirical.tool_specific_configuration_parser import LIRICALToolSpecificConfigurations
 
 
@@ -21,6 +35,23 @@ class LiricalPhEvalRunner(PhEvalRunner):
     config_file: Path
     version: str
 
+    @property
+    def phenopacket_index_path(self) -> Path:
+        """Path to the phenopacket index sidecar shared by the run and post-processing stages."""
+        return self.tool_input_commands_dir.joinpath(PHENOPACKET_INDEX_FILE_NAME)
+
+    @property
+    def status_path(self) -> Path:
+        """Path to the status file the progress of the current stage is written to."""
+        return self.output_dir.joinpath(STATUS_FILE_NAME)
+
+    @staticmethod
+    def metrics_exporter(config: LIRICALToolSpecificConfigurations) -> MetricsExporter:
+        """Return the exporter of the configured metrics endpoint and textfile, if any."""
+        return MetricsExporter(
+            port=config.metrics.port, host=config.metrics.host, textfile=config.metrics.textfile
+        )
+
     def prepare(self):
         """prepare"""
         print("preparing")
@@ -40,10 +71,55 @@ class LiricalPhEvalRunner(PhEvalRunner):
             tool_specific_configurations=config,
             gene_analysis=self.input_dir_config.gene_analysis,
             variant_analysis=self.input_dir_config.variant_analysis,
+            phenopacket_index_path=self.phenopacket_index_path,
+            status_path=self.status_path,
         )
-        run_lirical_local(
-            testdata_dir=self.testdata_dir, tool_input_commands_dir=self.tool_input_commands_dir
+        container_pool = lirical_container_pool(
+            input_dir=self.input_dir,
+            testdata_dir=self.testdata_dir,
+            tool_specific_configurations=config,
+            read_write=[self.raw_results_dir],
+            read_only=[self.tool_input_commands_dir],
         )
+        with self.metrics_exporter(config), container_pool or nullcontext():
+            streaming_post_processor = None
+            if config.execution.stream_post_processing:
+                streaming_post_processor = StreamingPostProcessor(
+                    raw_results_dir=self.raw_results_dir,
+                    output_dir=self.output_dir,
+                    phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                    sort_order=config.post_process.sort_order,
+                    disease_analysis=self.input_dir_config.disease_analysis,
+                    gene_analysis=self.input_dir_config.gene_analysis,
+                    variant_analysis=self.input_dir_config.variant_analysis,
+                    convert_to_parquet=config.post_process.convert_raw_results_to_parquet,
+                    max_rank=config.post_process.max_rank,
+                    variant_reducer=config.post_process.variant_reducer,
+                    phenopacket_index_path=self.phenopacket_index_path,
+                )
+                streaming_post_processor.start()
+            try:
+                run_lirical_local(
+                    testdata_dir=self.testdata_dir,
+                    tool_input_commands_dir=self.tool_input_commands_dir,
+                    max_workers=config.execution.max_workers,
+                    on_complete=(
+                        streaming_post_processor.submit if streaming_post_processor else None
+                    ),
+                    route_by_assembly=config.execution.route_by_assembly,
+                    metrics_path=self.output_dir.joinpath(RUN_METRICS_FILE_NAME),
+                    status_path=self.status_path,
+                    log_dir=self.output_dir.joinpath(LOG_DIR_NAME),
+                    retry_policy=execution_retry_policy(config.execution),
+                    failed_jobs_path=self.output_dir.joinpath(FAILED_JOBS_FILE_NAME),
+                    queue_dir=config.execution.queue_dir,
+                    job_runner=container_pool.run_job if container_pool else run_job,
+                    pin_workers=config.execution.pin_workers,
+                    numa_aware=config.execution.numa_aware,
+                )
+            finally:
+                if streaming_post_processor is not None:
+                    streaming_post_processor.close()
 
     def post_process(self):
         """post_process"""
@@ -51,12 +127,15 @@ class LiricalPhEvalRunner(PhEvalRunner):
         config = LIRICALToolSpecificConfigurations.parse_obj(
             self.input_dir_config.tool_specific_configuration_options
         )
-        post_process_results_format(
-            raw_results_dir=self.raw_results_dir,
-            output_dir=self.output_dir,
-            phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
-            config=config,
-            disease_analysis=self.input_dir_config.disease_analysis,
-            gene_analysis=self.input_dir_config.gene_analysis,
-            variant_analysis=self.input_dir_config.variant_analysis,
-        )
+        with self.metrics_exporter(config):
+            post_process_results_format(
+                raw_results_dir=self.raw_results_dir,
+                output_dir=self.output_dir,
+                phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                config=config,
+                disease_analysis=self.input_dir_config.disease_analysis,
+                gene_analysis=self.input_dir_config.gene_analysis,
+                variant_analysis=self.input_dir_config.variant_analysis,
+                phenopacket_index_path=self.phenopacket_index_path,
+                status_path=self.status_path,
+            )
@@ -6,6 +6,11 @@ from pydantic import BaseModel, Field
 
 class PostProcessing(BaseModel):
     sort_order: str = Field(...)
+    convert_raw_results_to_parquet: bool = Field(False)
+    incremental: bool = Field(False)
+    max_rank: Optional[int] = Field(None, ge=1)
+    variant_reducer: Optional[str] = Field(None)
+    workers: int = Field(1, ge=1)
 
 
 class ExomiserDB(BaseModel):
@@ -14,8 +19,81 @@ class ExomiserDB(BaseModel):
     exomiser_hg38_database: Optional[Path] = Field(None)
 
 
+class DataStaging(BaseModel):
+    scratch_dir: Path = Field(...)
+    hard_link: bool = Field(False)
+    remove_stale_after_hours: Optional[float] = Field(None, gt=0)
+
+
+class Execution(BaseModel):
+    max_workers: int = Field(1, ge=1)
+    stream_post_processing: bool = Field(False)
+    route_by_assembly: bool = Field(True)
+    max_retries: int = Field(0, ge=0)
+    retry_backoff: float = Field(30.0, ge=0)
+    job_timeout: Optional[float] = Field(None, gt=0)
+    java_max_heap_mb: Optional[int] = Field(None, ge=1)
+    queue_dir: Optional[Path] = Field(None)
+    pin_workers: bool = Field(False)
+    numa_aware: bool = Field(True)
+
+
+class Docker(BaseModel):
+    image: str = Field(...)
+    pool_size: Optional[int] = Field(None, ge=1)
+    mounts: list[Path] = Field([])
+
+
+class Metrics(BaseModel):
+    port: Optional[int] = Field(None, ge=0, le=65535)
+    host: str = Field("127.0.0.1")
+    textfile: Optional[Path] = Field(None)
+
+
 class LIRICALToolSpecificConfigurations(BaseModel):
     mode: str = Field(...)
     lirical_jar_executable: Path = Field(...)
     exomiser_db_configurations: ExomiserDB = Field(...)
     post_process: PostProcessing = Field(...)
+    cases_per_jvm: int = Field(1, ge=1)
+    preflight_check: bool = Field(False)
+    argument_files: bool = Field(False)
+    data_staging: Optional[DataStaging] = Field(None)
+    execution: Execution = Field(Execution())
+    metrics: Metrics = Field(Metrics())
+    docker: Optional[Docker] = Field(None)
+
+
+class SweepConfiguration(BaseModel):
+    name: Optional[str] = Field(None)
+    version: str = Field(...)
+    lirical_jar_executable: Path = Field(...)
+    exomiser_db_configurations: ExomiserDB = Field(...)
+    mode: str = Field(...)
+
+
+class LIRICALSweepConfigurations(BaseModel):
+    tool_specific_configuration_options: LIRICALToolSpecificConfigurations = Field(...)
+    matrix: list[SweepConfiguration] = Field(..., min_length=1)
+
+    def configurations(self) -> list[tuple[str, str, LIRICALToolSpecificConfigurations]]:
+        """Return the name, LIRICAL version and tool configuration of every sweep configuration."""
+        configurations = []
+        for i, configuration in enumerate(self.matrix):
+            name = configuration.name or f"lirical-{configuration.version}-{configuration.mode}-{i}"
+            if name in [existing for existing, _, _ in configurations]:
+                raise ValueError(f"duplicate sweep configuration name {name}")
+            configurations.append(
+                (
+                    name,
+                    configuration.version,
+                    self.tool_specific_configuration_options.model_copy(
+                        update={
+                            "lirical_jar_executable": configuration.lirical_jar_executable,
+                            "exomiser_db_configurations": configuration.exomiser_db_configurations,
+                            "mode": configuration.mode,
+                        }
+                    ),
+                )
+            )
+        return configurations
@@ -0,0 +1,144 @@
+"""A stand-in for the LIRICAL CLI that needs neither Java nor the LIRICAL data files.
+
+It accepts the arguments written by `CommandWriter` (optionally preceded by `-jar <jar>`, or as
+`-cp <jar> <launcher> <arguments file>` for a batch of cases run in one JVM, and by JVM `-X`
+options), expands picocli `@` argument files, spends time, CPU and memory according to a profile
+and writes a LIRICAL-like tsv result. The profile is read as JSON from the `FAKE_LIRICAL_PROFILE`
+environment variable, either inline or as a path to a JSON file, with the keys:
+
+    sleep_seconds     wall time spent sleeping (default 0)
+    cpu_seconds       wall time spent busy on the CPU (default 0)
+    memory_mb         memory allocated and touched for the lifetime of the case (default 0)
+    rows              ranked diseases written per result (default 50)
+    variants_per_row  variants listed per ranked disease (default 5)
+    fail_rate         fraction of cases that exit with `exit_code` and no result (default 0)
+    exit_code         exit code of failing cases (default 1)
+    error_message     message failing cases write to stderr (default "fake LIRICAL failed")
+    min_heap_mb       cases run without an -Xmx of at least this fail with an OutOfMemoryError
+                      (default 0)
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from tests.synthetic import write_lirical_result  # noqa: E402
+
+DEFAULT_PROFILE = {
+    "sleep_seconds": 0.0,
+    "cpu_seconds": 0.0,
+    "memory_mb": 0,
+    "rows": 50,
+    "variants_per_row": 5,
+    "fail_rate": 0.0,
+    "exit_code": 1,
+    "error_message": "fake LIRICAL failed",
+    "min_heap_mb": 0,
+}
+
+
+def load_profile() -> dict:
+    """Load the resource profile from the FAKE_LIRICAL_PROFILE environment variable."""
+    profile = dict(DEFAULT_PROFILE)
+    raw_profile = os.environ.get("FAKE_LIRICAL_PROFILE")
+    if raw_profile:
+        if not raw_profile.lstrip().startswith("{"):
+            raw_profile = Path(raw_profile).read_text()
+        profile.update(json.loads(raw_profile))
+    return profile
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="lirical", fromfile_prefix_chars="@")
+    # picocli splits argument files on whitespace, honouring quotes
+    parser.convert_arg_line_to_args = shlex.split
+    parser.add_argument("-jar", dest="jar")
+    parser.add_argument("command", choices=["P", "R"])
+    parser.add_argument("--phenopacket")
+    parser.add_argument("--vcf")
+    parser.add_argument("--assembly")
+    parser.add_argument("--data", required=True)
+    parser.add_argument("-e19")
+    parser.add_argument("-e38")
+    parser.add_argument("--exomiser")
+    parser.add_argument("--prefix", required=True)
+    parser.add_argument("--output-directory", required=True)
+    parser.add_argument("--output-format", default="tsv")
+    parser.add_argument("--observed-phenotypes")
+    parser.add_argument("--negated-phenotypes")
+    parser.add_argument("--sample-id")
+    args = parser.parse_args(argv)
+    if args.command == "P" and args.phenopacket is None:
+        parser.error("P requires --phenopacket")
+    if args.command == "R" and args.observed_phenotypes is None:
+        parser.error("R requires --observed-phenotypes")
+    return args
+
+
+def spend_resources(profile: dict) -> bytearray:
+    """Sleep, burn CPU and hold memory as described by the profile."""
+    memory = bytearray(int(profile["memory_mb"]) * 1024 * 1024)
+    for i in range(0, len(memory), 4096):
+        memory[i] = 1
+    time.sleep(float(profile["sleep_seconds"]))
+    deadline = time.perf_counter() + float(profile["cpu_seconds"])
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(1000))
+    return memory
+
+
+def run_case(argv: list[str], profile: dict, heap_mb: int = 0) -> int:
+    args = parse_args(argv)
+    rng = random.Random(args.prefix)
+    held_memory = spend_resources(profile)
+    if heap_mb < int(profile["min_heap_mb"]):
+        print(
+            'Exception in thread "main" java.lang.OutOfMemoryError: Java heap space',
+            file=sys.stderr,
+        )
+        return 1
+    if rng.random() < float(profile["fail_rate"]):
+        print(f"{profile['error_message']} for {args.prefix}", file=sys.stderr)
+        return int(profile["exit_code"])
+    write_lirical_result(
+        Path(args.output_directory).joinpath(f"{args.prefix}.{args.output_format}"),
+        n_rows=int(profile["rows"]),
+        variants_per_row=int(profile["variants_per_row"]),
+        seed=rng.randint(0, 2**32),
+    )
+    del held_memory
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    profile = load_profile()
+    heap_mb = 0
+    while argv[0].startswith("-X"):
+        if argv[0].startswith("-Xmx") and argv[0].endswith("m"):
+            heap_mb = int(argv[0][len("-Xmx") : -1])
+        argv = argv[1:]
+    if argv[0] == "-cp":
+        with open(argv[3]) as arguments_file:
+            cases = [shlex.split(line) for line in arguments_file if line.strip()]
+        return min(sum(run_case(case, profile, heap_mb) != 0 for case in cases), 255)
+    return run_case(argv, profile, heap_mb)
+
+
+def install_fake_java(bin_dir: Path) -> Path:
+    """Write a `java` executable into bin_dir that forwards to this fake LIRICAL."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    java = bin_dir.joinpath("java")
+    java.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).resolve()}" "$@"\n')
+    java.chmod(0o755)
+    return java
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,255 @@
+"""Synthetic phenopackets, VCF stubs and LIRICAL results for tests and benchmarks."""
+
+import random
+from pathlib import Path
+
+from google.protobuf.json_format import MessageToJson
+from phenopackets import (
+    Diagnosis,
+    File,
+    GeneDescriptor,
+    GenomicInterpretation,
+    Individual,
+    Interpretation,
+    MetaData,
+    OntologyClass,
+    Phenopacket,
+    PhenotypicFeature,
+    Resource,
+    VariantInterpretation,
+    VariationDescriptor,
+    VcfRecord,
+)
+
+GENES = [
+    ("GCDH", "2639", "ENSG00000105607", "19"),
+    ("GSX2", "170825", "ENSG00000180613", "4"),
+    ("FGD1", "2245", "ENSG00000102302", "X"),
+    ("RTTN", "25914", "ENSG00000176225", "18"),
+    ("BRCA1", "672", "ENSG00000012048", "17"),
+    ("TP53", "7157", "ENSG00000141510", "17"),
+    ("CFTR", "1080", "ENSG00000001626", "7"),
+    ("FBN1", "2200", "ENSG00000166147", "15"),
+    ("PAH", "5053", "ENSG00000171759", "12"),
+    ("DMD", "1756", "ENSG00000198947", "X"),
+]
+
+LIRICAL_HEADER = [
+    "rank",
+    "diseaseName",
+    "diseaseCurie",
+    "pretestprob",
+    "posttestprob",
+    "compositeLR",
+    "entrezGeneId",
+    "variants",
+]
+
+BASES = "ACGT"
+
+GRCH37_CHR1_LENGTH = 249250621
+GRCH38_CHR1_LENGTH = 248956422
+
+
+def _hpo_id(rng: random.Random) -> str:
+    return f"HP:{rng.randint(1, 3000000):07d}"
+
+
+def _random_allele(rng: random.Random, max_length: int) -> str:
+    return "".join(rng.choice(BASES) for _ in range(rng.randint(1, max_length)))
+
+
+def create_phenopacket(
+    case_id: str,
+    n_phenotypes: int = 10,
+    n_negated: int = 2,
+    assembly: str = "GRCh37",
+    seed: int = 0,
+) -> Phenopacket:
+    """Return a synthetic phenopacket with a VCF file and a single causative variant."""
+    rng = random.Random(f"{seed}-{case_id}")
+    symbol, entrez_id, ensembl_id, chrom = rng.choice(GENES)
+    phenotypic_features = [
+        PhenotypicFeature(type=OntologyClass(id=_hpo_id(rng), label="observed"))
+        for _ in range(n_phenotypes)
+    ] + [
+        PhenotypicFeature(type=OntologyClass(id=_hpo_id(rng), label="negated"), excluded=True)
+        for _ in range(n_negated)
+    ]
+    return Phenopacket(
+        id=case_id,
+        subject=Individual(id=f"{case_id}-subject", sex=1),
+        phenotypic_features=phenotypic_features,
+        interpretations=[
+            Interpretation(
+                id=f"{case_id}-interpretation",
+                progress_status="SOLVED",
+                diagnosis=Diagnosis(
+                    disease=OntologyClass(id="OMIM:231670", label="Glutaric acidemia I"),
+                    genomic_interpretations=[
+                        GenomicInterpretation(
+                            subject_or_biosample_id=f"{case_id}-subject",
+                            interpretation_status=4,
+                            variant_interpretation=VariantInterpretation(
+                                variation_descriptor=VariationDescriptor(
+                                    gene_context=GeneDescriptor(
+                                        value_id=ensembl_id,
+                                        symbol=symbol,
+                                        alternate_ids=[f"ncbigene:{entrez_id}"],
+                                    ),
+                                    vcf_record=VcfRecord(
+                                        genome_assembly=assembly,
+                                        chrom=chrom,
+                                        pos=rng.randint(1, 1000000),
+                                        ref=rng.choice(BASES),
+                                        alt=rng.choice(BASES),
+                                    ),
+                                    allelic_state=OntologyClass(
+                                        id="GENO:0000135", label="heterozygous"
+                                    ),
+                                ),
+                            ),
+                        )
+                    ],
+                ),
+            )
+        ],
+        files=[
+            File(
+                uri=f"{case_id}.vcf",
+                file_attributes={"fileFormat": "vcf", "genomeAssembly": assembly},
+            )
+        ],
+        meta_data=MetaData(
+            created_by="pheval-lirical-synthetic",
+            resources=[
+                Resource(
+                    id="hp",
+                    name="human phenotype ontology",
+                    url="http://purl.obolibrary.org/obo/hp.owl",
+                    version="hp/releases/2019-11-08",
+                    namespace_prefix="HP",
+                    iri_prefix="http://purl.obolibrary.org/obo/HP_",
+                )
+            ],
+            phenopacket_schema_version="2.0",
+        ),
+    )
+
+
+def write_phenopackets(
+    phenopacket_dir: Path,
+    n_cases: int,
+    n_phenotypes: int = 10,
+    n_negated: int = 2,
+    assemblies: tuple = ("GRCh37",),
+    seed: int = 0,
+) -> list[Path]:
+    """Write n_cases synthetic phenopackets to a directory and return their paths."""
+    phenopacket_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_cases):
+        case_id = f"case-{i:06d}"
+        phenopacket = create_phenopacket(
+            case_id,
+            n_phenotypes=n_phenotypes,
+            n_negated=n_negated,
+            assembly=assemblies[i % len(assemblies)],
+            seed=seed,
+        )
+        path = phenopacket_dir.joinpath(f"{case_id}.json")
+        path.write_text(MessageToJson(phenopacket))
+        paths.append(path)
+    return paths
+
+
+def write_vcf_stub(vcf_path: Path, assembly: str = "GRCh37", n_records: int = 10) -> Path:
+    """Write a minimal, valid VCF with contig headers matching the assembly."""
+    chr1_length = GRCH38_CHR1_LENGTH if assembly in ("GRCh38", "hg38") else GRCH37_CHR1_LENGTH
+    rng = random.Random(vcf_path.name)
+    lines = [
+        "##fileformat=VCFv4.2",
+        f"##contig=<ID=1,length={chr1_length}>",
+        f"##reference={assembly}",
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample",
+    ]
+    for _ in range(n_records):
+        lines.append(
+            f"1\t{rng.randint(1, chr1_length)}\t.\t{rng.choice(BASES)}\t{rng.choice(BASES)}"
+            "\t100\tPASS\t.\tGT\t0/1"
+        )
+    vcf_path.parent.mkdir(parents=True, exist_ok=True)
+    vcf_path.write_text("\n".join(lines) + "\n")
+    return vcf_path
+
+
+def write_vcf_stubs(vcf_dir: Path, phenopacket_paths: list[Path], assembly: str = "GRCh37"):
+    """Write one VCF stub per phenopacket, named as the phenopackets reference them."""
+    for phenopacket_path in phenopacket_paths:
+        write_vcf_stub(vcf_dir.joinpath(f"{phenopacket_path.stem}.vcf"), assembly)
+
+
+def lirical_result_rows(
+    n_rows: int, variants_per_row: int = 5, seed: int = 0, indel_rate: float = 0.1
+) -> list[list[str]]:
+    """Return rows of a synthetic LIRICAL tsv result, ranked by descending composite LR."""
+    rng = random.Random(seed)
+    scores = sorted((rng.uniform(-10, 10) for _ in range(n_rows)), reverse=True)
+    rows = []
+    for rank, score in enumerate(scores, start=1):
+        symbol, entrez_id, _, chrom = rng.choice(GENES)
+        variants = []
+        for _ in range(variants_per_row):
+            max_length = 6 if rng.random() < indel_rate else 1
+            ref = _random_allele(rng, max_length)
+            alt = _random_allele(rng, max_length)
+            variants.append(
+                f"{chrom}:{rng.randint(1, 1000000)}{ref}>{alt} NM_000159.3:c.1A>G:p.(=) "
+                f"pathogenicity:{rng.random():.1f} [0/1]"
+            )
+        rows.append(
+            [
+                str(rank),
+                f"{symbol} associated disease",
+                f"OMIM:{rng.randint(100000, 999999)}",
+                "1/8371",
+                f"{rng.random() * 100:.2f}%",
+                "-∞" if score < -9.5 else f"{score:.3f}",
+                f"NCBIGene:{entrez_id}",
+                "; ".join(variants),
+            ]
+        )
+    return rows
+
+
+def write_lirical_result(
+    output_path: Path, n_rows: int, variants_per_row: int = 5, seed: int = 0
+) -> Path:
+    """Write a synthetic LIRICAL tsv result, including the `!` comment header block."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as result:
+        result.write("! LIRICAL TSV Output (synthetic)\n")
+        result.write(f"! Sample: {output_path.stem}\n")
+        result.write("! Observed HPO terms\n")
+        result.write("\t".join(LIRICAL_HEADER) + "\n")
+        for row in lirical_result_rows(n_rows, variants_per_row, seed):
+            result.write("\t".join(row) + "\n")
+    return output_path
+
+
+def write_lirical_results(
+    raw_results_dir: Path,
+    phenopacket_paths: list[Path],
+    n_rows: int,
+    variants_per_row: int = 5,
+) -> list[Path]:
+    """Write one synthetic LIRICAL result per phenopacket."""
+    return [
+        write_lirical_result(
+            raw_results_dir.joinpath(f"{phenopacket_path.stem}.tsv"),
+            n_rows,
+            variants_per_row,
+            seed=i,
+        )
+        for i, phenopacket_path in enumerate(phenopacket_paths)
+    ]
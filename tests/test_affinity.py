@@ -0,0 +1,81 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pheval_lirical.run.affinity import (
+    gc_thread_options,
+    numa_node_cpus,
+    parse_cpu_list,
+    worker_cpu_sets,
+)
+from pheval_lirical.run.executor import LiricalJob, run_jobs
+
+
+def write_numa_nodes(node_dir: Path, cpu_lists: list[str]) -> None:
+    for node, cpu_list in enumerate(cpu_lists):
+        node_dir.joinpath(f"node{node}").mkdir(parents=True)
+        node_dir.joinpath(f"node{node}", "cpulist").write_text(cpu_list + "\n")
+
+
+class TestAffinity(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.node_dir = self.test_dir.joinpath("node")
+        self.node_dir.mkdir()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list("0-3,8,10-11\n"), [0, 1, 2, 3, 8, 10, 11])
+
+    def test_numa_node_cpus(self):
+        write_numa_nodes(self.node_dir, ["0-3,8-11", "4-7,12-15"])
+        self.node_dir.joinpath("has_cpu").write_text("0-1\n")
+        self.assertEqual(
+            numa_node_cpus(self.node_dir),
+            [[0, 1, 2, 3, 8, 9, 10, 11], [4, 5, 6, 7, 12, 13, 14, 15]],
+        )
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "CPU affinity is Linux only")
+    def test_workers_spread_across_numa_nodes(self):
+        write_numa_nodes(self.node_dir, ["0-3", "4-7"])
+        cpu_sets = worker_cpu_sets(4, node_dir=self.node_dir, available=set(range(8)))
+        self.assertEqual(cpu_sets, [{0, 1}, {4, 5}, {2, 3}, {6, 7}])
+        cpu_sets = worker_cpu_sets(
+            4, numa_aware=False, node_dir=self.node_dir, available=set(range(8))
+        )
+        self.assertEqual(cpu_sets, [{0, 1}, {2, 3}, {4, 5}, {6, 7}])
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "CPU affinity is Linux only")
+    def test_more_workers_than_cpus(self):
+        write_numa_nodes(self.node_dir, ["0-1", "2-3"])
+        cpu_sets = worker_cpu_sets(6, node_dir=self.node_dir, available={0, 1, 2})
+        self.assertEqual(cpu_sets, [{0}, {2}, {1}, {2}, {0}, {2}])
+
+    def test_gc_thread_options(self):
+        self.assertEqual(gc_thread_options(8), ["-XX:ParallelGCThreads=8", "-XX:ConcGCThreads=2"])
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "CPU affinity is Linux only")
+    def test_jobs_inherit_worker_affinity(self):
+        cpus = {min(os.sched_getaffinity(0))}
+        bin_dir, log_dir = self.test_dir.joinpath("bin"), self.test_dir.joinpath("logs")
+        bin_dir.mkdir()
+        log_dir.mkdir()
+        java = bin_dir.joinpath("java")
+        java.write_text(
+            f"#!{sys.executable}\n"
+            "import os, sys\n"
+            "print(sorted(os.sched_getaffinity(0)), sys.argv[1:])\n"
+        )
+        java.chmod(0o755)
+        with mock.patch.dict(os.environ, {"PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}):
+            run_jobs([LiricalJob("a", "java -version")], log_dir=log_dir, cpu_sets=[cpus])
+        self.assertEqual(
+            log_dir.joinpath("a.log").read_text().strip(),
+            f"{sorted(cpus)} {['-XX:ParallelGCThreads=1', '-XX:ConcGCThreads=1', '-version']}",
+        )
@@ -0,0 +1,70 @@
+import inspect
+import subprocess
+import sys
+import unittest
+
+from click.testing import CliRunner
+
+from pheval_lirical.cli import main
+from pheval_lirical.post_process.post_process import post_process_command
+from pheval_lirical.prepare.prepare_commands import prepare_commands, prepare_commands_command
+from pheval_lirical.run.run import run_command
+from pheval_lirical.tool_specific_configuration_parser import (
+    Execution,
+    LIRICALToolSpecificConfigurations,
+    PostProcessing,
+)
+
+HEAVY_MODULES = ["polars", "pandas", "oaklib", "phenopackets", "pheval.post_processing"]
+
+
+def imported_modules(*cli_args: str) -> set[str]:
+    """Return the modules imported when running the CLI, as reported by `-X importtime`."""
+    completed_process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "pheval_lirical.cli", *cli_args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        line.split("|")[-1].strip()
+        for line in completed_process.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+class TestCli(unittest.TestCase):
+    def test_help_lists_commands(self):
+        result = CliRunner().invoke(main, ["--help"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("prepare-commands", result.output)
+        self.assertIn("post-process", result.output)
+
+    def test_subcommands_resolve(self):
+        for command in ["prepare-commands", "post-process"]:
+            result = CliRunner().invoke(main, [command, "--help"])
+            self.assertEqual(result.exit_code, 0, result.output)
+
+    def test_run_defaults_match_configuration(self):
+        defaults = {parameter.name: parameter.default for parameter in run_command.params}
+        for option in ["max_workers", "max_retries", "pin_workers"]:
+            self.assertEqual(defaults[option], getattr(Execution(), option), option)
+
+    def test_preflight_check_off_by_default(self):
+        defaults = {
+            parameter.name: parameter.default for parameter in prepare_commands_command.params
+        }
+        self.assertFalse(defaults["preflight_check"])
+        self.assertFalse(inspect.signature(prepare_commands).parameters["preflight_check"].default)
+        self.assertFalse(LIRICALToolSpecificConfigurations.model_fields["preflight_check"].default)
+
+    def test_variant_results_kept_by_default(self):
+        defaults = {parameter.name: parameter.default for parameter in post_process_command.params}
+        self.assertEqual(defaults["variant_reducer"], "none")
+        self.assertIsNone(PostProcessing(sort_order="descending").variant_reducer)
+
+    def test_help_imports_no_heavy_modules(self):
+        for cli_args in [["--help"], ["prepare-commands", "--help"], ["run", "--help"]]:
+            modules = imported_modules(*cli_args)
+            for heavy_module in HEAVY_MODULES:
+                self.assertNotIn(heavy_module, modules, cli_args)
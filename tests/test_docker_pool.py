@@ -0,0 +1,182 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from docker.errors import NotFound
+from docker.models.containers import ExecResult
+
+from pheval_lirical.run.docker_pool import ContainerPool, container_mounts
+from pheval_lirical.run.executor import LiricalJob, RetryPolicy, run_jobs
+from pheval_lirical.run.run import lirical_container_pool
+from pheval_lirical.tool_specific_configuration_parser import (
+    Docker,
+    Execution,
+    ExomiserDB,
+    LIRICALToolSpecificConfigurations,
+    PostProcessing,
+)
+
+
+class FakeContainer:
+    """A container whose execs run on the host."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.execs = []
+        self.removed = False
+
+    def exec_run(self, cmd: list[str], user: str = "") -> ExecResult:
+        self.execs.append(cmd)
+        try:
+            process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except FileNotFoundError:
+            return ExecResult(127, f"{cmd[0]}: executable file not found".encode())
+        return ExecResult(process.returncode, process.stdout)
+
+    def remove(self, force: bool = False) -> None:
+        if self.removed:
+            raise NotFound("container already removed")
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self):
+        self.started = []
+
+    def run(self, image: str, **kwargs) -> FakeContainer:
+        container = FakeContainer(image=image, **kwargs)
+        self.started.append(container)
+        return container
+
+
+class FakeDockerClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+
+
+@unittest.skipIf(sys.platform == "win32", "jobs are run with bash")
+class TestContainerPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.client = FakeDockerClient()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_jobs_run_in_warm_containers(self):
+        jobs = [LiricalJob(str(i), "true") for i in range(4)] + [LiricalJob("4", "exit 3")]
+        with ContainerPool("lirical:2.0.0", 2, mounts={}, client=self.client) as pool:
+            job_results = run_jobs(jobs, max_workers=2, job_runner=pool.run_job)
+        containers = self.client.containers.started
+        self.assertEqual(len(containers), 2)
+        self.assertEqual(sum(len(container.execs) for container in containers), 5)
+        self.assertTrue(all(container.removed for container in containers))
+        self.assertEqual(containers[0].kwargs["entrypoint"], ["sleep", "infinity"])
+        self.assertEqual(
+            sorted(job_result.returncode for job_result in job_results), [0, 0, 0, 0, 3]
+        )
+
+    def test_failure_classified_from_exec_output(self):
+        job = LiricalJob("oom", "echo java.lang.OutOfMemoryError >&2; exit 1")
+        with ContainerPool("lirical:2.0.0", 1, mounts={}, client=self.client) as pool:
+            job_result = pool.run_job(job, log_dir=self.test_dir)
+            timed_out = pool.run_job(LiricalJob("slow", "sleep 10"), timeout=0.2)
+        self.assertEqual(job_result.failure, "out_of_memory")
+        self.assertIn("OutOfMemoryError", self.test_dir.joinpath("oom.log").read_text())
+        self.assertEqual(timed_out.failure, "timeout")
+
+    def test_java_options_applied(self):
+        with ContainerPool("lirical:2.0.0", 1, mounts={}, client=self.client) as pool:
+            run_jobs(
+                [LiricalJob("a", "java -version")],
+                retry_policy=RetryPolicy(java_max_heap_mb=512),
+                job_runner=pool.run_job,
+            )
+        self.assertEqual(self.client.containers.started[0].execs[0][:2], ["java", "-Xmx512m"])
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "CPU affinity is Linux only")
+    def test_pinned_jobs_run_with_taskset(self):
+        cpus = {min(os.sched_getaffinity(0))}
+        with ContainerPool(
+            "lirical:2.0.0", 1, mounts={}, client=self.client, pin_cpus=True
+        ) as pool:
+            run_jobs([LiricalJob("a", "java -version")], job_runner=pool.run_job, cpu_sets=[cpus])
+        self.assertEqual(
+            self.client.containers.started[0].execs[0][:4],
+            ["taskset", "-c", str(min(cpus)), "java"],
+        )
+
+    def test_container_mounts(self):
+        data_dir = self.test_dir.joinpath("input", "data")
+        results_dir = self.test_dir.joinpath("output", "raw_results")
+        mounts = container_mounts(
+            [self.test_dir.joinpath("input"), data_dir, results_dir], [results_dir]
+        )
+        self.assertEqual(
+            mounts,
+            {
+                str(self.test_dir.joinpath("input").resolve()): {
+                    "bind": str(self.test_dir.joinpath("input").resolve()),
+                    "mode": "ro",
+                },
+                str(results_dir.resolve()): {"bind": str(results_dir.resolve()), "mode": "rw"},
+            },
+        )
+
+    def test_configured_pool(self):
+        config = LIRICALToolSpecificConfigurations(
+            mode="phenopacket",
+            lirical_jar_executable=Path("lirical.jar"),
+            exomiser_db_configurations=ExomiserDB(exomiser_hg19_database=Path("/db/hg19.mv.db")),
+            post_process=PostProcessing(sort_order="descending"),
+            execution=Execution(max_workers=3),
+        )
+        input_dir, results_dir = self.test_dir.joinpath("input"), self.test_dir.joinpath("raw")
+        arguments = dict(
+            input_dir=input_dir,
+            testdata_dir=self.test_dir.joinpath("corpus"),
+            read_write=[results_dir],
+            client=self.client,
+        )
+        self.assertIsNone(lirical_container_pool(tool_specific_configurations=config, **arguments))
+        config.docker = Docker(image="lirical:2.0.0")
+        pool = lirical_container_pool(tool_specific_configurations=config, **arguments)
+        self.assertEqual(pool.size, 3)
+        self.assertEqual(pool.mounts[str(results_dir.resolve())]["mode"], "rw")
+        self.assertEqual(pool.mounts[str(Path("/db/hg19.mv.db").resolve())]["mode"], "ro")
+        self.assertNotIn(str(input_dir.joinpath("data").resolve()), pool.mounts)
+        self.assertFalse(pool.pin_cpus)
+        config.execution.pin_workers = True
+        pool = lirical_container_pool(tool_specific_configurations=config, **arguments)
+        self.assertEqual(pool.pin_cpus, hasattr(os, "sched_getaffinity"))
+
+    def test_sweep_pool_mounts_every_configuration(self):
+        config = LIRICALToolSpecificConfigurations(
+            mode="phenopacket",
+            lirical_jar_executable=Path("lirical.jar"),
+            exomiser_db_configurations=ExomiserDB(exomiser_hg19_database=Path("/db/hg19.mv.db")),
+            post_process=PostProcessing(sort_order="descending"),
+            docker=Docker(image="lirical:2.0.0"),
+        )
+        other_config = config.model_copy(
+            update={
+                "lirical_jar_executable": Path("/opt/lirical-1.3.4/lirical.jar"),
+                "exomiser_db_configurations": ExomiserDB(
+                    exomiser_hg38_database=Path("/db38/hg38.mv.db")
+                ),
+            }
+        )
+        pool = lirical_container_pool(
+            input_dir=self.test_dir.joinpath("input"),
+            testdata_dir=self.test_dir.joinpath("corpus"),
+            tool_specific_configurations=config,
+            read_write=[self.test_dir.joinpath("output")],
+            client=self.client,
+            configurations=[config, other_config],
+        )
+        for path in ["/db/hg19.mv.db", "/db38/hg38.mv.db", "/opt/lirical-1.3.4"]:
+            self.assertEqual(pool.mounts[str(Path(path).resolve())]["mode"], "ro")
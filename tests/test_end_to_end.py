@@ -0,0 +1,330 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.request import urlopen
+
+from pheval.post_processing import post_processing
+
+from pheval_lirical import metrics, phenopacket_index
+from pheval_lirical.metrics import MetricsExporter
+from pheval_lirical.post_process import post_process_results_format as results_format
+from pheval_lirical.post_process import streaming
+from pheval_lirical.post_process.post_process import post_process_results_format
+from pheval_lirical.post_process.streaming import StreamingPostProcessor
+from pheval_lirical.run import run
+from pheval_lirical.run.executor import JobResult, LiricalJob, RetryPolicy
+from pheval_lirical.run.run import prepare_lirical_commands, run_lirical_local
+from pheval_lirical.run.sweep import run_sweep
+from pheval_lirical.tool_specific_configuration_parser import (
+    Execution,
+    ExomiserDB,
+    LIRICALSweepConfigurations,
+    LIRICALToolSpecificConfigurations,
+    PostProcessing,
+    SweepConfiguration,
+)
+from tests.fixtures.fake_lirical import install_fake_java
+from tests.synthetic import write_phenopackets, write_vcf_stubs
+
+
+@unittest.skipIf(sys.platform.startswith("win"), "the fake LIRICAL is launched through /bin/sh")
+class TestFakeLiricalEndToEnd(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.input_dir = self.test_dir.joinpath("input_dir")
+        self.input_dir.joinpath("data").mkdir(parents=True)
+        self.testdata_dir = self.test_dir.joinpath("corpus")
+        phenopacket_paths = write_phenopackets(self.testdata_dir.joinpath("phenopackets"), 5)
+        write_vcf_stubs(self.testdata_dir.joinpath("vcf"), phenopacket_paths)
+        self.output_dir = self.test_dir.joinpath("output")
+        for directory in [
+            "tool_input_commands",
+            "raw_results",
+            "pheval_gene_results",
+            "pheval_disease_results",
+        ]:
+            self.output_dir.joinpath(directory).mkdir(parents=True)
+        install_fake_java(self.test_dir.joinpath("bin"))
+        self.environment = mock.patch.dict(
+            os.environ,
+            {
+                "PATH": f"{self.test_dir.joinpath('bin')}{os.pathsep}{os.environ['PATH']}",
+                "FAKE_LIRICAL_PROFILE": json.dumps({"rows": 20, "variants_per_row": 2}),
+            },
+        )
+        self.environment.start()
+        post_processing.executed_results.clear()
+
+    def tearDown(self) -> None:
+        self.environment.stop()
+        shutil.rmtree(self.test_dir)
+
+    def run_pipeline(
+        self,
+        mode: str,
+        cases_per_jvm: int = 1,
+        execution: Execution = Execution(),
+        argument_files: bool = False,
+    ) -> None:
+        config = LIRICALToolSpecificConfigurations(
+            mode=mode,
+            lirical_jar_executable=Path("lirical.jar"),
+            exomiser_db_configurations=ExomiserDB(exomiser_hg19_database=Path("hg19.mv.db")),
+            post_process=PostProcessing(sort_order="descending"),
+            cases_per_jvm=cases_per_jvm,
+            execution=execution,
+            argument_files=argument_files,
+        )
+        prepare_lirical_commands(
+            input_dir=self.input_dir,
+            tool_input_commands_dir=self.output_dir.joinpath("tool_input_commands"),
+            raw_results_dir=self.output_dir.joinpath("raw_results"),
+            testdata_dir=self.testdata_dir,
+            lirical_version="2.0.0",
+            tool_specific_configurations=config,
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+        streaming_post_processor = None
+        if execution.stream_post_processing:
+            streaming_post_processor = StreamingPostProcessor(
+                raw_results_dir=self.output_dir.joinpath("raw_results"),
+                output_dir=self.output_dir,
+                phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                sort_order="descending",
+                disease_analysis=True,
+                gene_analysis=True,
+                variant_analysis=False,
+            )
+            streaming_post_processor.start()
+        run_lirical_local(
+            tool_input_commands_dir=self.output_dir.joinpath("tool_input_commands"),
+            testdata_dir=self.testdata_dir,
+            max_workers=execution.max_workers,
+            on_complete=streaming_post_processor.submit if streaming_post_processor else None,
+        )
+        if streaming_post_processor is not None:
+            streaming_post_processor.close()
+        post_process_results_format(
+            raw_results_dir=self.output_dir.joinpath("raw_results"),
+            output_dir=self.output_dir,
+            phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+            config=config,
+            disease_analysis=True,
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+
+    def test_phenopacket_mode(self):
+        self.run_pipeline("phenopacket")
+        self.assertEqual(len(list(self.output_dir.joinpath("raw_results").iterdir())), 5)
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_gene_results").iterdir())), 5)
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_disease_results").iterdir())), 5)
+
+    def test_phenopacket_mode_batched(self):
+        self.run_pipeline("phenopacket", cases_per_jvm=2)
+        with open(
+            self.output_dir.joinpath("tool_input_commands", "corpus-lirical-commands.txt")
+        ) as commands:
+            self.assertEqual(len(commands.readlines()), 3)
+        self.assertEqual(len(list(self.output_dir.joinpath("raw_results").iterdir())), 5)
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_gene_results").iterdir())), 5)
+
+    def test_manual_mode(self):
+        self.run_pipeline("manual")
+        self.assertEqual(len(list(self.output_dir.joinpath("raw_results").iterdir())), 5)
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_gene_results").iterdir())), 5)
+
+    def test_manual_mode_argument_files(self):
+        for cases_per_jvm in [1, 2]:
+            self.run_pipeline("manual", cases_per_jvm=cases_per_jvm, argument_files=True)
+            tool_input_commands_dir = self.output_dir.joinpath("tool_input_commands")
+            argument_files = list(
+                tool_input_commands_dir.joinpath("lirical_argument_files").iterdir()
+            )
+            self.assertEqual(len(argument_files), 5)
+            self.assertNotIn(
+                "--observed-phenotypes",
+                tool_input_commands_dir.joinpath("corpus-lirical-commands.txt").read_text(),
+            )
+            self.assertEqual(len(list(self.output_dir.joinpath("raw_results").iterdir())), 5)
+            self.assertEqual(
+                len(list(self.output_dir.joinpath("pheval_gene_results").iterdir())), 5
+            )
+
+    def test_metrics_scrape(self):
+        completed, rows = metrics.JOBS_COMPLETED.value, metrics.POST_PROCESS_ROWS.value
+        with MetricsExporter(port=0) as exporter:
+            self.run_pipeline("phenopacket")
+            with urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+                scrape = response.read().decode()
+        self.assertEqual(metrics.JOBS_COMPLETED.value - completed, 5)
+        self.assertEqual(metrics.POST_PROCESS_ROWS.value - rows, 5 * 20)
+        self.assertIn("lirical_queue_depth 0\n", scrape)
+        self.assertIn('lirical_job_max_rss_bytes_bucket{le="+Inf"}', scrape)
+        self.assertIn("lirical_post_process_rows_per_second", scrape)
+
+    def test_streaming_post_processing(self):
+        self.run_pipeline(
+            "phenopacket", execution=Execution(max_workers=2, stream_post_processing=True)
+        )
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_gene_results").iterdir())), 5)
+        self.assertEqual(len(list(self.output_dir.joinpath("pheval_disease_results").iterdir())), 5)
+        with mock.patch.object(
+            results_format, "standardise_result", wraps=results_format.standardise_result
+        ) as standardise_result:
+            post_process_results_format(
+                raw_results_dir=self.output_dir.joinpath("raw_results"),
+                output_dir=self.output_dir,
+                phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+                config=LIRICALToolSpecificConfigurations(
+                    mode="phenopacket",
+                    lirical_jar_executable=Path("lirical.jar"),
+                    exomiser_db_configurations=ExomiserDB(),
+                    post_process=PostProcessing(sort_order="descending"),
+                    execution=Execution(stream_post_processing=True),
+                ),
+                disease_analysis=True,
+                gene_analysis=True,
+                variant_analysis=False,
+            )
+        standardise_result.assert_not_called()
+
+    def streaming_post_processor(self, gene_analysis: bool) -> StreamingPostProcessor:
+        return StreamingPostProcessor(
+            raw_results_dir=self.output_dir.joinpath("raw_results"),
+            output_dir=self.output_dir,
+            phenopacket_dir=self.testdata_dir.joinpath("phenopackets"),
+            sort_order="descending",
+            disease_analysis=True,
+            gene_analysis=gene_analysis,
+            variant_analysis=False,
+        )
+
+    def test_streaming_post_processing_without_genes_skips_identifier_map(self):
+        with mock.patch.object(streaming, "create_gene_identifier_map") as create_map:
+            streaming_post_processor = self.streaming_post_processor(gene_analysis=False)
+            streaming_post_processor.start()
+            streaming_post_processor.close()
+        create_map.assert_not_called()
+
+    def test_streaming_post_processing_error_raised(self):
+        streaming_post_processor = self.streaming_post_processor(gene_analysis=False)
+        with mock.patch.object(
+            streaming, "load_phenopacket_index", side_effect=OSError("unreadable index")
+        ):
+            streaming_post_processor.start()
+            streaming_post_processor.thread.join()
+        job_result = JobResult(LiricalJob("1", "java", ["case-000000"]), returncode=0, runtime=1.0)
+        with self.assertRaisesRegex(OSError, "unreadable index"):
+            streaming_post_processor.submit(job_result)
+        with self.assertRaisesRegex(OSError, "unreadable index"):
+            streaming_post_processor.close()
+
+    def test_sweep(self):
+        sweep = LIRICALSweepConfigurations(
+            tool_specific_configuration_options=LIRICALToolSpecificConfigurations(
+                mode="phenopacket",
+                lirical_jar_executable=Path("lirical.jar"),
+                exomiser_db_configurations=ExomiserDB(),
+                post_process=PostProcessing(sort_order="descending"),
+                execution=Execution(max_workers=2),
+            ),
+            matrix=[
+                SweepConfiguration(
+                    name=name,
+                    version=lirical_version,
+                    lirical_jar_executable=Path(f"lirical-{lirical_version}.jar"),
+                    exomiser_db_configurations=ExomiserDB(
+                        exomiser_database=Path("hg19.mv.db"),
+                        exomiser_hg19_database=Path("hg19.mv.db"),
+                    ),
+                    mode=mode,
+                )
+                for name, lirical_version, mode in [
+                    ("phenopacket-2.0.0", "2.0.0", "phenopacket"),
+                    ("manual-1.3.4", "1.3.4", "manual"),
+                ]
+            ],
+        )
+        sweep_dir = self.test_dir.joinpath("sweep")
+        with (
+            mock.patch.object(
+                phenopacket_index,
+                "phenopacket_reader",
+                wraps=phenopacket_index.phenopacket_reader,
+            ) as phenopacket_reader,
+            mock.patch.object(run, "run_jobs", wraps=run.run_jobs) as run_jobs,
+        ):
+            job_results = run_sweep(
+                input_dir=self.input_dir,
+                testdata_dir=self.testdata_dir,
+                output_dir=sweep_dir,
+                sweep=sweep,
+                disease_analysis=True,
+                gene_analysis=True,
+                variant_analysis=False,
+            )
+        self.assertEqual(phenopacket_reader.call_count, 5)
+        self.assertEqual(run_jobs.call_count, 1)
+        self.assertEqual(len(job_results), 10)
+        self.assertTrue(all(job_result.returncode == 0 for job_result in job_results))
+        for name in ["phenopacket-2.0.0", "manual-1.3.4"]:
+            self.assertEqual(len(list(sweep_dir.joinpath(name, "raw_results").iterdir())), 5)
+            self.assertEqual(
+                len(list(sweep_dir.joinpath(name, "pheval_gene_results").iterdir())), 5
+            )
+        with open(
+            sweep_dir.joinpath("manual-1.3.4", "tool_input_commands", "corpus-lirical-commands.txt")
+        ) as commands:
+            self.assertIn("lirical-1.3.4.jar", commands.read())
+
+    def test_failed_jobs_retried(self):
+        prepare_lirical_commands(
+            input_dir=self.input_dir,
+            tool_input_commands_dir=self.output_dir.joinpath("tool_input_commands"),
+            raw_results_dir=self.output_dir.joinpath("raw_results"),
+            testdata_dir=self.testdata_dir,
+            lirical_version="2.0.0",
+            tool_specific_configurations=LIRICALToolSpecificConfigurations(
+                mode="phenopacket",
+                lirical_jar_executable=Path("lirical.jar"),
+                exomiser_db_configurations=ExomiserDB(exomiser_hg19_database=Path("hg19.mv.db")),
+                post_process=PostProcessing(sort_order="descending"),
+            ),
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+        failed_jobs_path = self.output_dir.joinpath("failed_jobs.json")
+
+        def run(profile: dict, retry_failed: bool = False) -> list:
+            os.environ["FAKE_LIRICAL_PROFILE"] = json.dumps({"rows": 20, **profile})
+            return run_lirical_local(
+                tool_input_commands_dir=self.output_dir.joinpath("tool_input_commands"),
+                testdata_dir=self.testdata_dir,
+                log_dir=self.output_dir.joinpath("logs"),
+                retry_policy=RetryPolicy(max_retries=1, backoff=0),
+                failed_jobs_path=failed_jobs_path,
+                retry_failed=retry_failed,
+            )
+
+        # out of memory without a larger heap: retried with one
+        job_results = run({"min_heap_mb": 5000})
+        self.assertEqual([r.attempts for r in job_results], [2] * 5)
+        self.assertTrue(all(r.returncode == 0 for r in job_results))
+        # a missing file is not retried, but recorded for a later run
+        job_results = run({"fail_rate": 0.5, "error_message": "java.nio.file.NoSuchFileException"})
+        failed = [r for r in job_results if r.returncode != 0]
+        self.assertTrue(0 < len(failed) < 5)
+        self.assertEqual({(r.failure, r.attempts) for r in failed}, {("missing_file", 1)})
+        self.assertEqual(len(json.loads(failed_jobs_path.read_text())), len(failed))
+        job_results = run({}, retry_failed=True)
+        self.assertEqual(
+            sorted(r.job.job_id for r in job_results), sorted(r.job.job_id for r in failed)
+        )
+        self.assertEqual(json.loads(failed_jobs_path.read_text()), [])
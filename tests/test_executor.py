@@ -0,0 +1,239 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pheval_lirical.prepare.prepare_commands import BATCH_LAUNCHER
+from pheval_lirical.run.executor import (
+    JobResult,
+    LiricalJob,
+    RetryPolicy,
+    assign_workers,
+    classify_failure,
+    database_switches,
+    job_arguments,
+    parse_job,
+    read_failed_jobs,
+    read_jobs,
+    run_job,
+    run_job_with_retries,
+    run_jobs,
+    run_metrics,
+    with_java_options,
+    write_failed_jobs,
+)
+
+
+class TestParseJob(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_parse_job(self):
+        job = parse_job(
+            "corpus-000000",
+            "java -jar lirical.jar phenopacket --phenopacket case-1.json "
+            "--vcf case-1.vcf --assembly hg19 --prefix case-1 --output-directory raw",
+        )
+        self.assertEqual(job.result_names, ["case-1"])
+        self.assertEqual(job.assembly, "hg19")
+
+    def test_parse_batch_job(self):
+        arguments_file = self.test_dir.joinpath("corpus-batch-00000.txt")
+        arguments_file.write_text(
+            "phenopacket --assembly hg38 --prefix case-1\nphenopacket --assembly hg38 --prefix case-2\n"
+        )
+        job = parse_job("corpus-000000", f"java -cp lirical.jar {BATCH_LAUNCHER} {arguments_file}")
+        self.assertEqual(job.result_names, ["case-1", "case-2"])
+        self.assertEqual(job.assembly, "hg38")
+
+    def test_job_arguments(self):
+        self.assertEqual(
+            job_arguments('java -jar lirical.jar R --sample-id "case 1" @case-1.args'),
+            ["java", "-jar", "lirical.jar", "R", "--sample-id", "case 1", "@case-1.args"],
+        )
+        self.assertEqual(job_arguments("exit 3"), ["bash", "-c", "exit 3"])
+
+    def test_read_jobs(self):
+        batch_file = self.test_dir.joinpath("corpus-lirical-commands.txt")
+        batch_file.write_text(
+            "java -jar lirical.jar --prefix a\n\njava -jar lirical.jar --prefix b\n"
+        )
+        jobs = read_jobs(batch_file)
+        self.assertEqual(
+            [job.job_id for job in jobs],
+            ["corpus-lirical-commands-000000", "corpus-lirical-commands-000001"],
+        )
+
+
+class TestAssemblyRouting(unittest.TestCase):
+    def test_assign_workers(self):
+        jobs = [LiricalJob(str(i), "true", assembly="GRCh37") for i in range(6)] + [
+            LiricalJob(str(i), "true", assembly="hg38") for i in range(6, 8)
+        ]
+        self.assertEqual(assign_workers(jobs, 4), ["hg19", "hg19", "hg19", "hg38"])
+        self.assertEqual(assign_workers(jobs, 1), ["hg19"])
+        self.assertEqual(assign_workers([], 2), [])
+
+    def test_database_switches(self):
+        job_results = [
+            JobResult(LiricalJob("a", "true", assembly="hg19"), 0, 1.0, worker=0),
+            JobResult(LiricalJob("b", "true", assembly="hg38"), 0, 1.0, worker=1),
+            JobResult(LiricalJob("c", "true", assembly="GRCh38"), 0, 1.0, worker=0),
+            JobResult(LiricalJob("d", "true", assembly="GRCh37"), 1, 1.0, worker=0),
+        ]
+        self.assertEqual(database_switches(job_results), 2)
+        metrics = run_metrics(job_results, runtime=4.0, route_by_assembly=False)
+        self.assertEqual(metrics.failed, 1)
+        self.assertEqual(metrics.worker_assemblies, {0: ["hg19", "hg38"], 1: ["hg38"]})
+
+
+@unittest.skipIf(sys.platform.startswith("win"), "jobs are launched through bash")
+class TestRunJobs(unittest.TestCase):
+    def test_run_jobs(self):
+        completed = []
+        job_results = run_jobs(
+            [LiricalJob("ok", "true"), LiricalJob("failed", "exit 3")],
+            max_workers=2,
+            on_complete=completed.append,
+        )
+        self.assertEqual(completed, job_results)
+        self.assertEqual(
+            {job_result.job.job_id: job_result.returncode for job_result in job_results},
+            {"ok": 0, "failed": 3},
+        )
+
+    def test_run_jobs_routed_by_assembly(self):
+        jobs = [
+            LiricalJob(str(i), "sleep 0.01", assembly=["GRCh37", "GRCh38"][i % 2])
+            for i in range(12)
+        ]
+        job_results = run_jobs(jobs, max_workers=2, route_by_assembly=True)
+        self.assertEqual(len(job_results), 12)
+        first_assemblies = {}
+        for job_result in job_results:
+            first_assemblies.setdefault(job_result.worker, job_result.job.assembly)
+        self.assertEqual(sorted(first_assemblies.values()), ["GRCh37", "GRCh38"])
+        # a worker only leaves its database to take over the other queue once its own is empty
+        self.assertLessEqual(database_switches(job_results), 2)
+
+    def test_run_jobs_fewer_workers_than_assemblies(self):
+        jobs = [
+            LiricalJob(str(i), "true", assembly=["GRCh37", "GRCh38", None][i % 3]) for i in range(6)
+        ]
+        job_results = run_jobs(jobs, max_workers=1, route_by_assembly=True)
+        self.assertEqual(
+            sorted(job_result.job.job_id for job_result in job_results), list("012345")
+        )
+        self.assertEqual(database_switches(job_results), 2)
+
+    def test_run_jobs_empty(self):
+        self.assertEqual(run_jobs([], max_workers=2, route_by_assembly=True), [])
+        self.assertEqual(run_jobs([]), [])
+
+    def test_run_jobs_on_start(self):
+        started = []
+        job_results = run_jobs(
+            [LiricalJob("a", "true"), LiricalJob("b", "true")], on_start=started.append
+        )
+        self.assertEqual(started, [job_result.job for job_result in job_results])
+
+    @unittest.skipIf(sys.platform == "win32", "peak memory needs os.wait4")
+    def test_run_job_max_rss(self):
+        job_results = run_jobs([LiricalJob("a", "true")])
+        self.assertGreater(job_results[0].max_rss, 0)
+
+
+class TestFailures(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_classify_failure(self):
+        log_path = self.test_dir.joinpath("job.log")
+        for log, failure in [
+            (
+                'Exception in thread "main" java.lang.OutOfMemoryError: Java heap space',
+                "out_of_memory",
+            ),
+            ("java.nio.file.NoSuchFileException: case-1.vcf", "missing_file"),
+            ("htsjdk.tribble.TribbleException: Not in GZIP format", "corrupt_vcf"),
+            ("something else went wrong", "unknown"),
+        ]:
+            log_path.write_text(f"INFO starting\n{log}\n")
+            self.assertEqual(classify_failure(1, log_path), failure)
+        self.assertEqual(classify_failure(137, None), "out_of_memory")
+        self.assertEqual(classify_failure(-9, log_path, timed_out=True), "timeout")
+
+    def test_with_java_options(self):
+        self.assertEqual(
+            with_java_options("java -Xmx2g -jar lirical.jar P", ["-Xmx4096m"]),
+            "java -Xmx4096m -jar lirical.jar P",
+        )
+        self.assertEqual(
+            with_java_options("java -jar lirical.jar P", None), "java -jar lirical.jar P"
+        )
+
+    def test_timeout(self):
+        job_result = run_job(LiricalJob("slow", "sleep 10"), timeout=0.2)
+        self.assertNotEqual(job_result.returncode, 0)
+        self.assertEqual(job_result.failure, "timeout")
+        self.assertLess(job_result.runtime, 5)
+
+    def test_transient_failure_retried(self):
+        marker = self.test_dir.joinpath("marker")
+        job = LiricalJob(
+            "flaky",
+            f"test -f {marker} || {{ touch {marker}; echo java.lang.OutOfMemoryError; exit 1; }}",
+        )
+        job_result = run_job_with_retries(
+            job, log_dir=self.test_dir, retry_policy=RetryPolicy(max_retries=2, backoff=0)
+        )
+        self.assertEqual([job_result.returncode, job_result.attempts], [0, 2])
+        self.assertIn("OutOfMemoryError", self.test_dir.joinpath("flaky.log").read_text())
+
+    def test_missing_executable_recorded(self):
+        with mock.patch.dict(os.environ, {"PATH": str(self.test_dir)}):
+            job_results = run_jobs(
+                [LiricalJob("a", "java -jar lirical.jar")], log_dir=self.test_dir
+            )
+        self.assertEqual([job_results[0].returncode, job_results[0].failure], [127, "missing_file"])
+        self.assertIn("java", self.test_dir.joinpath("a.log").read_text())
+
+    def test_runner_error_recorded(self):
+        def job_runner(job: LiricalJob, *args, **kwargs) -> JobResult:
+            raise RuntimeError("container went away")
+
+        job_results = run_jobs(
+            [LiricalJob("a", "true"), LiricalJob("b", "true")], job_runner=job_runner
+        )
+        self.assertEqual([job_result.failure for job_result in job_results], ["runner_error"] * 2)
+        failed_jobs_path = self.test_dir.joinpath("failed.json")
+        write_failed_jobs(job_results, failed_jobs_path)
+        self.assertEqual(len(read_failed_jobs(failed_jobs_path)), 2)
+
+    def test_permanent_failure_not_retried(self):
+        job = LiricalJob("missing", "echo java.nio.file.NoSuchFileException >&2; exit 1")
+        job_result = run_job_with_retries(
+            job, log_dir=self.test_dir, retry_policy=RetryPolicy(max_retries=2, backoff=0)
+        )
+        self.assertEqual([job_result.failure, job_result.attempts], ["missing_file", 1])
+
+    def test_failed_jobs_manifest(self):
+        failed_job = LiricalJob("failed", "exit 1", ["case-1"], "hg19")
+        failed_jobs_path = self.test_dir.joinpath("failed.json")
+        write_failed_jobs(
+            [
+                JobResult(LiricalJob("ok", "true"), 0, 1.0),
+                JobResult(failed_job, 1, 1.0, failure="unknown", attempts=3),
+            ],
+            failed_jobs_path,
+        )
+        self.assertEqual(read_failed_jobs(failed_jobs_path), [failed_job])
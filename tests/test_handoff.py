@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import polars as pl
+from pheval.post_processing import post_processing
+
+from pheval_lirical.post_process.handoff import handoff_directory, read_frames, write_frames
+from pheval_lirical.post_process.post_process_results_format import create_standardised_results
+from tests.synthetic import write_lirical_results, write_phenopackets
+
+
+class TestHandoff(unittest.TestCase):
+    def test_round_trip(self):
+        frame = pl.DataFrame(
+            {"gene_symbol": ["GCDH", "FGD1"], "score": [0.9, 0.1]},
+            schema={"gene_symbol": pl.Categorical(), "score": pl.Float64},
+        )
+        with handoff_directory() as handoff_dir:
+            paths = write_frames({"gene": frame}, handoff_dir)
+            self.assertEqual(paths["gene"].parent, handoff_dir)
+            frames = read_frames(paths)
+            self.assertTrue(frames["gene"].equals(frame))
+            self.assertFalse(paths["gene"].exists())
+        self.assertFalse(handoff_dir.exists())
+
+
+class TestParallelPostProcessing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.raw_results_dir = self.test_dir.joinpath("raw_results")
+        phenopacket_paths = write_phenopackets(self.phenopacket_dir, 5)
+        write_lirical_results(self.raw_results_dir, phenopacket_paths, n_rows=30)
+
+    def tearDown(self) -> None:
+        post_processing.executed_results.clear()
+        shutil.rmtree(self.test_dir)
+
+    def post_process(self, workers: int) -> Path:
+        output_dir = self.test_dir.joinpath(f"output-{workers}")
+        post_processing.executed_results.clear()
+        create_standardised_results(
+            raw_results_dir=self.raw_results_dir,
+            output_dir=output_dir,
+            phenopacket_dir=self.phenopacket_dir,
+            sort_order="descending",
+            disease_analysis=True,
+            gene_analysis=True,
+            variant_analysis=True,
+            workers=workers,
+        )
+        return output_dir
+
+    def test_workers_write_the_same_results(self):
+        sequential, parallel = self.post_process(1), self.post_process(2)
+        for result_type in ["gene", "variant", "disease"]:
+            result_dir = f"pheval_{result_type}_results"
+            names = sorted(path.name for path in sequential.joinpath(result_dir).iterdir())
+            self.assertEqual(len(names), 5)
+            self.assertEqual(
+                names, sorted(path.name for path in parallel.joinpath(result_dir).iterdir())
+            )
+            for name in names:
+                self.assertTrue(
+                    pl.read_parquet(sequential.joinpath(result_dir, name)).equals(
+                        pl.read_parquet(parallel.joinpath(result_dir, name))
+                    )
+                )
@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import polars as pl
+from pheval.post_processing import post_processing
+
+from pheval_lirical.post_process import post_process_results_format
+from pheval_lirical.post_process.post_process_results_format import create_standardised_results
+from tests.synthetic import write_lirical_results, write_phenopackets
+
+
+class TestIncrementalPostProcessing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.raw_results_dir = self.test_dir.joinpath("raw_results")
+        self.output_dir = self.test_dir.joinpath("output")
+        self.output_dir.joinpath("pheval_gene_results").mkdir(parents=True)
+        self.phenopacket_paths = write_phenopackets(self.phenopacket_dir, 4)
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[:3], n_rows=10)
+        post_processing.executed_results.clear()
+
+    def tearDown(self) -> None:
+        post_processing.executed_results.clear()
+        shutil.rmtree(self.test_dir)
+
+    def post_process(
+        self, sort_order: str = "descending", max_rank: int = None, convert_to_parquet: bool = False
+    ) -> list[str]:
+        """Run incremental post-processing and return the names of the results processed."""
+        with mock.patch.object(
+            post_process_results_format,
+            "write_standardised_results",
+            wraps=post_process_results_format.write_standardised_results,
+        ) as write_standardised_results:
+            create_standardised_results(
+                raw_results_dir=self.raw_results_dir,
+                output_dir=self.output_dir,
+                phenopacket_dir=self.phenopacket_dir,
+                sort_order=sort_order,
+                disease_analysis=False,
+                gene_analysis=True,
+                variant_analysis=False,
+                incremental=True,
+                max_rank=max_rank,
+                convert_to_parquet=convert_to_parquet,
+            )
+        return [call.args[1].stem for call in write_standardised_results.call_args_list]
+
+    def gene_result(self, name: str) -> pl.DataFrame:
+        return pl.read_parquet(
+            self.output_dir.joinpath("pheval_gene_results", f"{name}-gene_result.parquet")
+        )
+
+    def test_unchanged_results_skipped(self):
+        self.assertEqual(self.post_process(), ["case-000000", "case-000001", "case-000002"])
+        self.assertEqual(self.gene_result("case-000003")["rank"].to_list(), [0])
+        ranked = self.gene_result("case-000000")
+        self.assertEqual(self.post_process(), [])
+        self.assertTrue(self.gene_result("case-000000").equals(ranked))
+
+    def test_new_result_processed_alone(self):
+        self.post_process()
+        ranked = self.gene_result("case-000000")
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[3:], n_rows=10)
+        self.assertEqual(self.post_process(), ["case-000003"])
+        self.assertTrue(self.gene_result("case-000000").equals(ranked))
+        self.assertGreater(self.gene_result("case-000003").height, 1)
+
+    def test_changed_result_reprocessed(self):
+        self.post_process()
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[:1], n_rows=4)
+        self.assertEqual(self.post_process(), ["case-000000"])
+        self.assertLessEqual(self.gene_result("case-000000").height, 5)
+
+    def test_config_change_reprocesses_all(self):
+        self.post_process()
+        self.assertEqual(len(self.post_process(sort_order="ascending")), 3)
+
+    def test_max_rank_change_reprocesses_all(self):
+        self.post_process()
+        full_height = self.gene_result("case-000000").height
+        self.assertEqual(len(self.post_process(max_rank=2)), 3)
+        self.assertLess(self.gene_result("case-000000").height, full_height)
+
+    def test_parquet_conversion_of_unchanged_result_skipped(self):
+        self.assertEqual(len(self.post_process(convert_to_parquet=True)), 3)
+        self.assertTrue(self.raw_results_dir.joinpath("case-000000.parquet").exists())
+        self.assertEqual(self.post_process(convert_to_parquet=True), [])
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[:1], n_rows=4)
+        self.assertEqual(self.post_process(convert_to_parquet=True), ["case-000000"])
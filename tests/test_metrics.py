@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.request import urlopen
+
+from pheval_lirical.metrics import Counter, Gauge, Histogram, MetricsExporter, MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+        self.jobs = Counter(self.registry, "jobs_total", "Jobs.")
+        self.queue_depth = Gauge(self.registry, "queue_depth", "Queue depth.")
+        self.runtime = Histogram(self.registry, "runtime_seconds", "Runtime.", (1, 10))
+
+    def test_render(self):
+        self.jobs.inc()
+        self.jobs.inc(2)
+        self.queue_depth.set(4)
+        for runtime in [0.5, 1, 5, 20]:
+            self.runtime.observe(runtime)
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP jobs_total Jobs.\n"
+            "# TYPE jobs_total counter\n"
+            "jobs_total 3\n"
+            "# HELP queue_depth Queue depth.\n"
+            "# TYPE queue_depth gauge\n"
+            "queue_depth 4\n"
+            "# HELP runtime_seconds Runtime.\n"
+            "# TYPE runtime_seconds histogram\n"
+            'runtime_seconds_bucket{le="1"} 2\n'
+            'runtime_seconds_bucket{le="10"} 3\n'
+            'runtime_seconds_bucket{le="+Inf"} 4\n'
+            "runtime_seconds_sum 26.5\n"
+            "runtime_seconds_count 4\n",
+        )
+
+    def test_duplicate_metric(self):
+        with self.assertRaises(ValueError):
+            Counter(self.registry, "jobs_total", "Jobs again.")
+
+
+class TestMetricsExporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.registry = MetricsRegistry()
+        self.jobs = Counter(self.registry, "jobs_total", "Jobs.")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_scrape(self):
+        with MetricsExporter(self.registry, port=0) as exporter:
+            self.jobs.inc()
+            with urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+                self.assertIn("jobs_total 1\n", response.read().decode())
+
+    def test_textfile(self):
+        textfile = self.test_dir.joinpath("lirical.prom")
+        with MetricsExporter(self.registry, textfile=textfile, interval=0.01):
+            self.jobs.inc(5)
+        self.assertIn("jobs_total 5\n", textfile.read_text())
+        self.assertEqual(list(self.test_dir.iterdir()), [textfile])
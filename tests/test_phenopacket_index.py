@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pheval.post_processing import phenopacket_truth_set, post_processing
+from pheval.post_processing.phenopacket_truth_set import PhenopacketTruthSet
+from pheval.utils.phenopacket_utils import IncompatibleGenomeAssemblyError
+
+from pheval_lirical import phenopacket_index
+from pheval_lirical.phenopacket_index import (
+    PhenopacketRecord,
+    _shared_hpo_terms,
+    canonical_hpo_terms,
+    load_phenopacket_index,
+)
+from pheval_lirical.post_process.incremental import IndexedPhenopacketTruthSet
+from pheval_lirical.post_process.post_process_results_format import create_standardised_results
+from tests.synthetic import write_lirical_results, write_phenopackets
+
+
+class TestPhenopacketIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.phenopacket_paths = write_phenopackets(self.phenopacket_dir, 3)
+        self.index_path = self.test_dir.joinpath("phenopacket_index.parquet")
+
+    def tearDown(self) -> None:
+        post_processing.executed_results.clear()
+        shutil.rmtree(self.test_dir)
+
+    def load_index(self) -> tuple:
+        """Load the phenopacket index, returning it with the number of phenopackets parsed."""
+        with mock.patch.object(
+            phenopacket_index, "phenopacket_reader", wraps=phenopacket_index.phenopacket_reader
+        ) as phenopacket_reader:
+            index = load_phenopacket_index(self.phenopacket_dir, self.index_path)
+        return index, phenopacket_reader.call_count
+
+    def test_sidecar_round_trip(self):
+        index, parsed = self.load_index()
+        self.assertEqual(parsed, 3)
+        self.assertTrue(self.index_path.exists())
+        reloaded, parsed = self.load_index()
+        self.assertEqual(parsed, 0)
+        self.assertEqual(list(reloaded), list(index))
+        self.assertEqual(reloaded["case-000000"], PhenopacketRecord.read(self.phenopacket_paths[0]))
+
+    def test_canonical_hpo_terms(self):
+        record = PhenopacketRecord(
+            case_id="case",
+            phenopacket_path=Path("case.json"),
+            sample_id="sample",
+            observed_phenotypes=["HP:0003150", "HP:0000256", "HP:0003150"],
+        )
+        self.assertEqual(record.observed_phenotypes, ("HP:0000256", "HP:0003150"))
+        self.assertIs(record.observed_phenotypes, canonical_hpo_terms(["HP:0000256", "HP:0003150"]))
+        self.assertEqual(record.negated_phenotypes, ())
+
+    def test_canonical_hpo_terms_cache_bounded(self):
+        for i in range(_shared_hpo_terms.cache_info().maxsize + 10):
+            canonical_hpo_terms([f"HP:{i:07d}"])
+        cache_info = _shared_hpo_terms.cache_info()
+        self.assertEqual(cache_info.currsize, cache_info.maxsize)
+
+    def test_changed_phenopacket_parsed_again(self):
+        self.load_index()
+        stat = self.phenopacket_paths[1].stat()
+        os.utime(self.phenopacket_paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        write_phenopackets(self.phenopacket_dir.parent.joinpath("extra"), 4)
+        shutil.copy(
+            self.phenopacket_dir.parent.joinpath("extra", "case-000003.json"), self.phenopacket_dir
+        )
+        index, parsed = self.load_index()
+        self.assertEqual(parsed, 2)
+        self.assertEqual(len(index), 4)
+
+    def test_vcf_path(self):
+        record = PhenopacketRecord.read(self.phenopacket_paths[0])
+        self.assertEqual(
+            record.vcf_path(Path("/vcf")), Path("/vcf").joinpath(f"{record.case_id}.vcf")
+        )
+        record.vcf_assembly = "GRCh36"
+        with self.assertRaises(IncompatibleGenomeAssemblyError):
+            record.vcf_path(Path("/vcf"))
+
+    def test_missing_case(self):
+        index, _ = self.load_index()
+        with self.assertRaises(FileNotFoundError):
+            index["case-999999"]
+
+    def test_indexed_truth_set_matches_pheval(self):
+        index, _ = self.load_index()
+        truth_set = PhenopacketTruthSet(self.phenopacket_dir)
+        indexed_truth_set = IndexedPhenopacketTruthSet(index)
+        for name in ["case-000000", "case-000002"]:
+            self.assertTrue(
+                indexed_truth_set.classified_gene(name).equals(truth_set.classified_gene(name))
+            )
+            self.assertTrue(
+                indexed_truth_set.classified_variant(name).equals(
+                    truth_set.classified_variant(name)
+                )
+            )
+            self.assertTrue(
+                indexed_truth_set.classified_disease(name).equals(
+                    truth_set.classified_disease(name)
+                )
+            )
+
+    def test_post_process_parses_no_phenopackets(self):
+        self.load_index()
+        output_dir = self.test_dir.joinpath("output")
+        write_lirical_results(
+            self.test_dir.joinpath("raw_results"), self.phenopacket_paths, n_rows=10
+        )
+        with (
+            mock.patch.object(phenopacket_truth_set, "phenopacket_reader") as truth_set_reader,
+            mock.patch.object(phenopacket_index, "phenopacket_reader") as index_reader,
+        ):
+            create_standardised_results(
+                raw_results_dir=self.test_dir.joinpath("raw_results"),
+                output_dir=output_dir,
+                phenopacket_dir=self.phenopacket_dir,
+                sort_order="descending",
+                disease_analysis=True,
+                gene_analysis=True,
+                variant_analysis=True,
+                phenopacket_index_path=self.index_path,
+            )
+        truth_set_reader.assert_not_called()
+        index_reader.assert_not_called()
+        self.assertEqual(len(list(output_dir.joinpath("pheval_variant_results").iterdir())), 3)
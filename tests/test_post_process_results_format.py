@@ -1,16 +1,31 @@
+import gzip
+import shutil
+import tempfile
 import unittest
+from pathlib import Path
 
 import polars as pl
+from pheval.post_processing.post_processing import SortOrder
+from pheval.post_processing.validate_result_format import ResultSchema
 from pheval.utils.phenopacket_utils import (
     GeneIdentifierUpdater,
     create_gene_identifier_map,
 )
 
 from src.pheval_lirical.post_process.post_process_results_format import (
+    COMPACT_VARIANT_SCHEMA,
+    convert_raw_result_to_parquet,
     extract_disease_results,
     extract_gene_results,
     extract_variant_results,
+    filter_top_ranked,
+    raw_result_files,
+    raw_result_name,
+    read_lirical_result,
+    scan_lirical_result,
+    to_pheval_variant_schema,
 )
+from tests.synthetic import write_lirical_result
 
 lirical_results = pl.DataFrame(
     [
@@ -96,7 +111,97 @@ class TestPostProcessResultsFormat(unittest.TestCase):
         )
 
     def test_extract_variant_results(self):
-        print(extract_variant_results(lirical_results))
+        variant_results = extract_variant_results(lirical_results)
+        self.assertEqual(variant_results.schema, COMPACT_VARIANT_SCHEMA)
+        self.assertEqual(
+            variant_results.row(0),
+            ("19", 12998205, 12998205, "G", "C", 4.203),
+        )
+        self.assertEqual(
+            variant_results.filter(pl.col("start") == 55026539).row(0),
+            ("4", 55026539, 55026541, "ACT", "A", -1.439),
+        )
+
+    def test_extract_variant_results_aggregated(self):
+        duplicated = pl.concat(
+            [
+                lirical_results,
+                lirical_results.head(1).with_columns(
+                    pl.lit(3, dtype=pl.Int64).alias("rank"), pl.lit("5.0").alias("compositeLR")
+                ),
+            ]
+        )
+        n_variants = extract_variant_results(lirical_results).height
+        self.assertGreater(extract_variant_results(duplicated).height, n_variants)
+        best_score = extract_variant_results(duplicated, "best_score")
+        best_rank = extract_variant_results(duplicated, "best_rank")
+        self.assertEqual(best_score.height, n_variants)
+        self.assertEqual(best_score.schema, COMPACT_VARIANT_SCHEMA)
+        self.assertEqual(best_score.filter(pl.col("start") == 12998205)["score"].to_list(), [5.0])
+        self.assertEqual(best_rank.filter(pl.col("start") == 12998205)["score"].to_list(), [4.203])
+        ascending = extract_variant_results(duplicated, "best_score", SortOrder.ASCENDING)
+        self.assertEqual(ascending.filter(pl.col("start") == 12998205)["score"].to_list(), [4.203])
+
+    def test_extract_variant_results_unknown_reducer(self):
+        with self.assertRaises(ValueError):
+            extract_variant_results(lirical_results, "mean_score")
+
+    def test_to_pheval_variant_schema(self):
+        variant_results = to_pheval_variant_schema(extract_variant_results(lirical_results))
+        self.assertTrue(ResultSchema.VARIANT_RESULT_SCHEMA.validate(variant_results))
+
+
+class TestRawResultFormats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.tsv_path = write_lirical_result(self.test_dir.joinpath("case-1.tsv"), n_rows=20)
+        self.expected = read_lirical_result(self.tsv_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_raw_result_name(self):
+        for name in ["case-1.tsv", "case-1.tsv.gz", "case-1.tsv.zst", "case-1.parquet"]:
+            self.assertEqual(raw_result_name(Path(name)), "case-1")
+
+    def test_read_lirical_result(self):
+        self.assertEqual(self.expected.height, 20)
+        self.assertEqual(self.expected["rank"].dtype, pl.Utf8)
+
+    def test_read_lirical_result_gzip(self):
+        gzip_path = self.test_dir.joinpath("case-1.tsv.gz")
+        gzip_path.write_bytes(gzip.compress(self.tsv_path.read_bytes()))
+        self.assertTrue(read_lirical_result(gzip_path).equals(self.expected))
+
+    def test_convert_raw_result_to_parquet(self):
+        parquet_path = convert_raw_result_to_parquet(self.tsv_path)
+        self.assertEqual(parquet_path, self.test_dir.joinpath("case-1.parquet"))
+        self.assertTrue(read_lirical_result(parquet_path).equals(self.expected))
+
+    def test_filter_top_ranked(self):
+        top_ranked = filter_top_ranked(scan_lirical_result(self.tsv_path), max_rank=5).collect()
+        self.assertTrue(top_ranked.equals(self.expected.head(5)))
+
+    def test_filter_top_ranked_no_max_rank(self):
+        self.assertTrue(
+            filter_top_ranked(scan_lirical_result(self.tsv_path)).collect().equals(self.expected)
+        )
+
+    def test_raw_result_files(self):
+        write_lirical_result(self.test_dir.joinpath("case-2.tsv"), n_rows=5)
+        self.test_dir.joinpath("case-3.tsv.gz").write_bytes(
+            gzip.compress(self.tsv_path.read_bytes())
+        )
+        self.test_dir.joinpath("notes.txt").write_text("not a result")
+        parquet_path = convert_raw_result_to_parquet(self.tsv_path)
+        self.assertEqual(
+            raw_result_files(self.test_dir),
+            [
+                parquet_path,
+                self.test_dir.joinpath("case-2.tsv"),
+                self.test_dir.joinpath("case-3.tsv.gz"),
+            ],
+        )
 
 
 #
@@ -0,0 +1,77 @@
+import gzip
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pheval_lirical.phenopacket_index import load_phenopacket_index
+from pheval_lirical.prepare.preflight import PreflightCheck, PreflightCheckError, vcf_chr1_length
+from tests.synthetic import (
+    GRCH37_CHR1_LENGTH,
+    GRCH38_CHR1_LENGTH,
+    write_phenopackets,
+    write_vcf_stub,
+    write_vcf_stubs,
+)
+
+
+class TestPreflightCheck(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.vcf_dir = self.test_dir.joinpath("vcf")
+        phenopacket_paths = write_phenopackets(self.phenopacket_dir, 4)
+        write_vcf_stubs(self.vcf_dir, phenopacket_paths)
+        self.lirical_jar = self.test_dir.joinpath("lirical.jar")
+        self.lirical_jar.touch()
+        self.hg19_database = self.test_dir.joinpath("hg19.mv.db")
+        self.hg19_database.touch()
+        self.test_dir.joinpath("data").mkdir()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def preflight_check(self, exomiser_hg19_data: Path = None) -> PreflightCheck:
+        return PreflightCheck(
+            lirical_jar=self.lirical_jar,
+            input_dir=self.test_dir.joinpath("data"),
+            exomiser_data_dir=None,
+            vcf_dir=self.vcf_dir,
+            mode="phenopacket",
+            lirical_version="2.0.0",
+            exomiser_hg19_data=exomiser_hg19_data,
+            exomiser_hg38_data=None,
+            gene_analysis=True,
+            variant_analysis=False,
+        )
+
+    def test_vcf_chr1_length(self):
+        vcf_path = write_vcf_stub(self.test_dir.joinpath("grch38.vcf"), "GRCh38")
+        self.assertEqual(vcf_chr1_length(vcf_path), GRCH38_CHR1_LENGTH)
+        gzipped_path = self.test_dir.joinpath("grch37.vcf.gz")
+        with gzip.open(gzipped_path, "wt") as vcf:
+            vcf.write(write_vcf_stub(self.test_dir.joinpath("grch37.vcf")).read_text())
+        self.assertEqual(vcf_chr1_length(gzipped_path), GRCH37_CHR1_LENGTH)
+
+    def test_passes(self):
+        self.preflight_check(self.hg19_database).run(load_phenopacket_index(self.phenopacket_dir))
+
+    def test_reports_every_problem(self):
+        phenopacket_index = load_phenopacket_index(self.phenopacket_dir)
+        self.vcf_dir.joinpath("case-000000.vcf").unlink()
+        write_vcf_stub(self.vcf_dir.joinpath("case-000001.vcf"), "GRCh38")
+        observed_phenotypes = phenopacket_index["case-000002"].observed_phenotypes
+        phenopacket_index["case-000002"].observed_phenotypes = ("HP:12345",) + observed_phenotypes[
+            1:
+        ]
+        phenopacket_index["case-000003"].vcf_assembly = "GRCh36"
+        with self.assertRaises(PreflightCheckError) as context:
+            self.preflight_check().run(phenopacket_index)
+        problems = context.exception.problems
+        self.assertEqual(len(problems), 5)
+        self.assertEqual(problems[0], "no -e19 Exomiser database configured for hg19 VCFs")
+        self.assertIn("case-000000: VCF not found", problems[1])
+        self.assertIn("case-000001: VCF contigs", problems[2])
+        self.assertIn("are hg38, but the phenopacket gives GRCh37", problems[2])
+        self.assertEqual(problems[3], "case-000002: invalid HPO id 'HP:12345'")
+        self.assertIn("case-000003: Incompatible Genome Assembly -> GRCh36", problems[4])
@@ -21,7 +21,11 @@ from phenopackets import (
     VcfRecord,
 )
 
-from pheval_lirical.prepare.prepare_commands import CommandCreator, CommandWriter
+from pheval_lirical.prepare.prepare_commands import (
+    BATCH_LAUNCHER,
+    CommandCreator,
+    CommandWriter,
+)
 from pheval_lirical.prepare.prepare_manual_commands import LiricalManualCommandLineArguments
 from pheval_lirical.prepare.prepare_phenopacket_commands import (
     LiricalPhenopacketCommandLineArguments,
@@ -189,7 +193,7 @@ class TestCommandCreator(unittest.TestCase):
 
     def test_get_list_negated_phenotypic_features(self):
         self.assertEqual(
-            self.command_creator.get_list_negated_phenotypic_features(), ["HP:0008494"]
+            self.command_creator.get_list_negated_phenotypic_features(), ("HP:0008494",)
         )
 
     def test_get_list_negated_phenotypic_features_none_excluded(self):
@@ -200,7 +204,7 @@ class TestCommandCreator(unittest.TestCase):
     def test_get_list_observed_phenotypic_features(self):
         self.assertEqual(
             self.command_creator.get_list_observed_phenotypic_features(),
-            ["HP:0000256", "HP:0002059", "HP:0100309", "HP:0003150", "HP:0001332"],
+            ("HP:0000256", "HP:0001332", "HP:0002059", "HP:0003150", "HP:0100309"),
         )
 
     def test_get_vcf_path(self):
@@ -216,14 +220,14 @@ class TestCommandCreator(unittest.TestCase):
             ),
             LiricalManualCommandLineArguments(
                 lirical_jar_file=Path("/path/to/lirical.jar"),
-                observed_phenotypes=[
+                observed_phenotypes=(
                     "HP:0000256",
+                    "HP:0001332",
                     "HP:0002059",
-                    "HP:0100309",
                     "HP:0003150",
-                    "HP:0001332",
-                ],
-                negated_phenotypes=["HP:0008494"],
+                    "HP:0100309",
+                ),
+                negated_phenotypes=("HP:0008494",),
                 assembly="GRCh37",
                 vcf_file_path="/path/to/vcf_dir/test_1.vcf",
                 sample_id="test-subject-1",
@@ -241,13 +245,13 @@ class TestCommandCreator(unittest.TestCase):
             ),
             LiricalManualCommandLineArguments(
                 lirical_jar_file=Path("/path/to/lirical.jar"),
-                observed_phenotypes=[
+                observed_phenotypes=(
                     "HP:0000256",
+                    "HP:0001332",
                     "HP:0002059",
-                    "HP:0100309",
                     "HP:0003150",
-                    "HP:0001332",
-                ],
+                    "HP:0100309",
+                ),
                 negated_phenotypes=None,
                 assembly="GRCh37",
                 vcf_file_path="/path/to/vcf_dir/test_1.vcf",
@@ -307,13 +311,13 @@ class TestCommandCreator(unittest.TestCase):
             ),
             LiricalManualCommandLineArguments(
                 lirical_jar_file=Path("/path/to/lirical.jar"),
-                observed_phenotypes=[
+                observed_phenotypes=(
                     "HP:0000256",
+                    "HP:0001332",
                     "HP:0002059",
-                    "HP:0100309",
                     "HP:0003150",
-                    "HP:0001332",
-                ],
+                    "HP:0100309",
+                ),
                 negated_phenotypes=None,
                 assembly="GRCh37",
                 vcf_file_path="/path/to/vcf_dir/test_1.vcf",
@@ -335,14 +339,14 @@ class TestCommandWriter(unittest.TestCase):
         )
         self.command_arguments = LiricalManualCommandLineArguments(
             lirical_jar_file=Path("/path/to/lirical.jar"),
-            observed_phenotypes=[
+            observed_phenotypes=(
                 "HP:0000256",
+                "HP:0001332",
                 "HP:0002059",
-                "HP:0100309",
                 "HP:0003150",
-                "HP:0001332",
-            ],
-            negated_phenotypes=["HP:0008494"],
+                "HP:0100309",
+            ),
+            negated_phenotypes=("HP:0008494",),
             assembly="GRCh37",
             vcf_file_path="/path/to/vcf_dir/test_1.vcf",
             sample_id="test-subject-1",
@@ -402,7 +406,7 @@ class TestCommandWriter(unittest.TestCase):
         f.close()
         self.assertEqual(
             content,
-            [" --observed-phenotypes HP:0000256,HP:0002059,HP:0100309,HP:0003150,HP:0001332"],
+            [" --observed-phenotypes HP:0000256,HP:0001332,HP:0002059,HP:0003150,HP:0100309"],
         )
 
     def test_write_negated_phenotypic_features(self):
@@ -503,11 +507,36 @@ class TestCommandWriter(unittest.TestCase):
                 "--assembly GRCh37 --data /path/to/lirical/data --exomiser "
                 "/path/to/exomiser/data --prefix phenopacket --output-directory "
                 "/path/to/results_dir --output-format tsv --observed-phenotypes "
-                "HP:0000256,HP:0002059,HP:0100309,HP:0003150,HP:0001332 --negated-phenotypes "
+                "HP:0000256,HP:0001332,HP:0002059,HP:0003150,HP:0100309 --negated-phenotypes "
                 'HP:0008494 --sample-id "test-subject-1"\n'
             ],
         )
 
+    def test_write_manual_command_argument_file(self):
+        argument_files_dir = Path(self.test_dir).joinpath("lirical_argument_files")
+        argument_files_dir.mkdir()
+        command_writer = CommandWriter(
+            mode="manual",
+            lirical_version="2.0.0-RC1",
+            output_file=self.command_file_path,
+            argument_files_dir=argument_files_dir,
+        )
+        command_writer.write_manual_command(self.command_arguments)
+        command_writer.close()
+        argument_file = argument_files_dir.joinpath("phenopacket.args")
+        self.assertEqual(
+            self.command_file_path.read_text(),
+            "java -jar /path/to/lirical.jar R --vcf /path/to/vcf_dir/test_1.vcf "
+            "--assembly GRCh37 --data /path/to/lirical/data --exomiser "
+            "/path/to/exomiser/data --prefix phenopacket --output-directory "
+            f"/path/to/results_dir --output-format tsv @{argument_file}\n",
+        )
+        self.assertEqual(
+            argument_file.read_text(),
+            " --observed-phenotypes HP:0000256,HP:0001332,HP:0002059,HP:0003150,HP:0100309"
+            ' --negated-phenotypes HP:0008494 --sample-id "test-subject-1"\n',
+        )
+
     def test_write_phenopacket_command(self):
         self.command_writer.write_phenopacket_command(self.phenopacket_command_arguments)
         self.command_writer.file.close()
@@ -538,7 +567,7 @@ class TestCommandWriter(unittest.TestCase):
                 "--assembly GRCh37 --data /path/to/lirical/data --exomiser "
                 "/path/to/exomiser/data --prefix phenopacket --output-directory "
                 "/path/to/results_dir --output-format tsv --observed-phenotypes "
-                "HP:0000256,HP:0002059,HP:0100309,HP:0003150,HP:0001332 --negated-phenotypes "
+                "HP:0000256,HP:0001332,HP:0002059,HP:0003150,HP:0100309 --negated-phenotypes "
                 'HP:0008494 --sample-id "test-subject-1"\n'
             ],
         )
@@ -562,6 +591,53 @@ class TestCommandWriter(unittest.TestCase):
             ],
         )
 
+    def test_write_case_arguments(self):
+        command_writer = copy(self.command_writer)
+        command_writer.mode = "phenopacket"
+        command_writer.write_case_arguments(self.phenopacket_command_arguments)
+        command_writer.file.close()
+        with open(self.command_file_path) as f:
+            content = f.readlines()
+        f.close()
+        self.assertEqual(
+            content,
+            [
+                " P --vcf /path/to/vcf_dir/test_1.vcf "
+                "--assembly GRCh37 --data /path/to/lirical/data --exomiser "
+                "/path/to/exomiser/data --prefix phenopacket --output-directory "
+                "/path/to/results_dir --output-format tsv --phenopacket "
+                "/path/to/phenopacket.json\n"
+            ],
+        )
+
+    def test_write_batch_command(self):
+        arguments_file = Path(self.test_dir).joinpath("batch-00000.txt")
+        self.command_writer.write_batch_command(
+            [self.command_arguments, self.command_arguments], arguments_file
+        )
+        self.command_writer.file.close()
+        with open(self.command_file_path) as f:
+            content = f.readlines()
+        f.close()
+        self.assertEqual(
+            content, [f"java -cp /path/to/lirical.jar {BATCH_LAUNCHER} {arguments_file}\n"]
+        )
+        with open(arguments_file) as f:
+            arguments = f.readlines()
+        f.close()
+        self.assertEqual(
+            arguments,
+            [
+                " R --vcf /path/to/vcf_dir/test_1.vcf "
+                "--assembly GRCh37 --data /path/to/lirical/data --exomiser "
+                "/path/to/exomiser/data --prefix phenopacket --output-directory "
+                "/path/to/results_dir --output-format tsv --observed-phenotypes "
+                "HP:0000256,HP:0001332,HP:0002059,HP:0003150,HP:0100309 --negated-phenotypes "
+                'HP:0008494 --sample-id "test-subject-1"\n'
+            ]
+            * 2,
+        )
+
     def test_close(self):
         self.command_writer.close()
         self.assertTrue(self.command_writer.file.closed)
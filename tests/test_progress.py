@@ -0,0 +1,60 @@
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from pheval_lirical.progress import ProgressReporter
+
+
+class TestProgressReporter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.status_path = self.test_dir.joinpath("status.json")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_counts(self):
+        with ProgressReporter("run", 10, workers=2) as progress:
+            progress.update(cases=3, latency=1.0)
+            progress.update(cases=1, failed=True, latency=1.0)
+            status = progress.status()
+        self.assertEqual([status["completed"], status["failed"], status["remaining"]], [4, 1, 6])
+        self.assertEqual(status["case_latency_seconds"], 1.0)
+        self.assertEqual(status["eta_seconds"], 3.0)
+
+    def test_moving_average_latency(self):
+        with ProgressReporter("run", 10, smoothing=0.5) as progress:
+            self.assertIsNone(progress.status()["eta_seconds"])
+            progress.update(latency=4.0)
+            progress.update(latency=2.0)
+            self.assertEqual(progress.latency, 3.0)
+            progress.update(cases=2, latency=1.0)
+            self.assertEqual(progress.latency, 1.5)
+            self.assertEqual(progress.status()["eta_seconds"], 9.0)
+
+    def test_status_file(self):
+        progress = ProgressReporter("post-process", 2, self.status_path, interval=3600)
+        self.assertEqual(json.loads(self.status_path.read_text())["completed"], 0)
+        progress.update()
+        progress.update()
+        self.assertEqual(json.loads(self.status_path.read_text())["completed"], 0)
+        progress.close()
+        status = json.loads(self.status_path.read_text())
+        self.assertEqual(status["stage"], "post-process")
+        self.assertEqual([status["completed"], status["remaining"]], [2, 0])
+        self.assertEqual(list(self.test_dir.iterdir()), [self.status_path])
+
+    def test_status_file_rewritten_between_cases(self):
+        with ProgressReporter("run", 2, self.status_path, interval=0.05):
+            elapsed = json.loads(self.status_path.read_text())["elapsed_seconds"]
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                if json.loads(self.status_path.read_text())["elapsed_seconds"] > elapsed:
+                    break
+            status = json.loads(self.status_path.read_text())
+        self.assertGreater(status["elapsed_seconds"], elapsed)
+        self.assertEqual(status["completed"], 0)
@@ -0,0 +1,164 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from pheval_lirical import metrics
+from pheval_lirical.run.executor import JobResult, LiricalJob, read_failed_jobs, read_jobs
+from pheval_lirical.run.run import run_lirical_jobs
+from pheval_lirical.run.shared_queue import JobQueueMismatchError, SharedJobQueue
+
+
+class TestSharedJobQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.queue_dir = self.test_dir.joinpath("queue")
+        self.jobs = [LiricalJob(f"job-{i}", "true", [f"case-{i}"]) for i in range(3)]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_join_fills_queue_once(self):
+        first = SharedJobQueue.join(self.queue_dir, self.jobs)
+        second = SharedJobQueue.join(self.queue_dir, self.jobs)
+        self.assertEqual(second.pending_jobs(), self.jobs)
+        self.assertEqual(first.keys, second.keys)
+
+    def test_join_refuses_other_jobs(self):
+        SharedJobQueue.join(self.queue_dir, self.jobs)
+        with self.assertRaises(JobQueueMismatchError):
+            SharedJobQueue.join(self.queue_dir, self.jobs[:1])
+        changed = [LiricalJob(job.job_id, "false", job.result_names) for job in self.jobs]
+        with self.assertRaises(JobQueueMismatchError):
+            SharedJobQueue.join(self.queue_dir, changed)
+
+    def test_claims_are_exclusive(self):
+        first = SharedJobQueue.join(self.queue_dir, self.jobs, worker_id="first", poll_interval=0)
+        second = SharedJobQueue.join(self.queue_dir, self.jobs, worker_id="second")
+        claimed = [first.claim(), second.claim(), first.claim()]
+        self.assertEqual([job for _, job in claimed], self.jobs)
+        for key, job in claimed:
+            first.complete(key, JobResult(job, 0, 0.1))
+        self.assertIsNone(second.claim())
+        self.assertEqual(list(self.queue_dir.joinpath("claims").iterdir()), [])
+
+    def test_stale_claim_reclaimed(self):
+        dead = SharedJobQueue.join(self.queue_dir, self.jobs[:1], worker_id="dead")
+        key, _ = dead.claim()
+        live = SharedJobQueue(self.queue_dir, worker_id="live", lease_timeout=60, poll_interval=0)
+        claim_path = self.queue_dir.joinpath("claims", f"{key}.claim")
+        # a lease renewed by a heartbeat is kept
+        dead.heartbeat()
+        self.assertFalse(live._try_claim(key))
+        stale = time.time() - 120
+        os.utime(claim_path, (stale, stale))
+        self.assertEqual(live.claim(), (key, self.jobs[0]))
+        self.assertIn("live", claim_path.read_text())
+
+    def test_run(self):
+        queue = SharedJobQueue.join(self.queue_dir, self.jobs)
+        completed = []
+        job_results = queue.run(max_workers=2, on_complete=completed.append)
+        self.assertEqual(completed, job_results)
+        self.assertEqual(sorted(r.job.job_id for r in job_results), ["job-0", "job-1", "job-2"])
+        self.assertEqual(queue.pending_jobs(), [])
+
+    @unittest.skipIf(sys.platform.startswith("win"), "the jobs are run through bash")
+    def test_failures_of_every_worker_recorded(self):
+        jobs = [LiricalJob("ok", "true"), LiricalJob("a", "exit 3"), LiricalJob("b", "exit 4")]
+        first = SharedJobQueue.join(self.queue_dir, jobs, worker_id="first")
+        second = SharedJobQueue.join(self.queue_dir, jobs, worker_id="second")
+        key, job = first.claim()
+        first.complete(key, JobResult(job, 0, 0.1))
+        key, job = first.claim()
+        first.complete(key, JobResult(job, 3, 0.1, failure="unknown"))
+        failed_jobs_path = self.test_dir.joinpath("failed.json")
+        metrics_path = self.test_dir.joinpath("metrics.json")
+        completed, failed = metrics.JOBS_COMPLETED.value, metrics.JOBS_FAILED.value
+        run_lirical_jobs(
+            [],
+            job_queue=second,
+            failed_jobs_path=failed_jobs_path,
+            metrics_path=metrics_path,
+        )
+        self.assertEqual([job.job_id for job in read_failed_jobs(failed_jobs_path)], ["a", "b"])
+        # only the failed job "b" is left for the second worker to run
+        self.assertEqual(metrics.JOBS_COMPLETED.value - completed, 0)
+        self.assertEqual(metrics.JOBS_FAILED.value - failed, 1)
+        self.assertFalse(metrics_path.exists())
+        self.assertTrue(self.test_dir.joinpath("metrics-second.json").exists())
+
+
+@unittest.skipIf(sys.platform.startswith("win"), "the jobs are run through bash")
+class TestSharedJobQueueWorkers(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.commands_dir = self.test_dir.joinpath("tool_input_commands")
+        self.commands_dir.mkdir()
+        self.runs_dir = self.test_dir.joinpath("runs")
+        self.runs_dir.mkdir()
+        self.queue_dir = self.test_dir.joinpath("queue")
+        self.commands_dir.joinpath("corpus-lirical-commands.txt").write_text(
+            "".join(
+                f"sleep 0.05 && echo ran >> {self.runs_dir.joinpath(f'case-{i}')}\n"
+                for i in range(30)
+            )
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def start_worker(self, name: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "pheval_lirical.cli",
+                "run",
+                "--tool-input-commands-dir",
+                str(self.commands_dir),
+                "--testdata-dir",
+                str(self.test_dir.joinpath("corpus")),
+                "--output-dir",
+                str(self.test_dir.joinpath(name)),
+                "--max-workers",
+                "2",
+                "--queue-dir",
+                str(self.queue_dir),
+            ],
+            env={
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(
+                    [str(Path(__file__).parents[1].joinpath("src"))] + sys.path
+                ),
+            },
+            stdout=subprocess.DEVNULL,
+        )
+
+    def test_workers_share_the_queue(self):
+        # a job claimed by a worker that died an hour ago
+        dead = SharedJobQueue.join(
+            self.queue_dir, read_jobs(self.commands_dir.joinpath("corpus-lirical-commands.txt"))
+        )
+        key, _ = dead.claim()
+        stale = time.time() - 3600
+        os.utime(self.queue_dir.joinpath("claims", f"{key}.claim"), (stale, stale))
+        workers = [self.start_worker(f"worker-{i}") for i in range(3)]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=120), 0)
+        self.assertEqual(
+            sorted(path.name for path in self.runs_dir.iterdir()),
+            sorted(f"case-{i}" for i in range(30)),
+        )
+        for run in self.runs_dir.iterdir():
+            self.assertEqual(run.read_text(), "ran\n")
+        self.assertEqual(len(list(self.queue_dir.joinpath("done").glob("*.json"))), 30)
+        workers_used = {
+            path.read_text().split('"worker": "')[1].split('"')[0]
+            for path in self.queue_dir.joinpath("done").glob("*.json")
+        }
+        self.assertGreater(len(workers_used), 1)
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pheval_lirical.prepare.stage_data import STAGING_MANIFEST, _node_lock, stage_data
+
+
+class TestStageData(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.data_dir = self.test_dir.joinpath("input_dir", "data")
+        self.data_dir.joinpath("nested").mkdir(parents=True)
+        self.data_dir.joinpath("hp.json").write_text('{"graphs": []}')
+        self.data_dir.joinpath("nested", "phenotype.hpoa").write_text("#description\n")
+        self.database = self.test_dir.joinpath("input_dir", "2302_hg19_variants.mv.db")
+        self.database.write_bytes(os.urandom(4096))
+        self.sources = {"lirical_data": self.data_dir, "exomiser_hg19_data": self.database}
+        self.scratch_dir = self.test_dir.joinpath("scratch")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_stage_data(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        self.assertTrue(staged["lirical_data"].joinpath("nested", "phenotype.hpoa").exists())
+        self.assertEqual(staged["exomiser_hg19_data"].read_bytes(), self.database.read_bytes())
+        self.assertEqual(staged["exomiser_hg19_data"].name, "2302_hg19_variants.mv.db")
+        with open(staged["lirical_data"].parents[1].joinpath(STAGING_MANIFEST)) as manifest:
+            self.assertEqual(len(json.load(manifest)["checksums"]), 3)
+
+    def test_stage_data_reused_when_fingerprint_matches(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        with mock.patch("pheval_lirical.prepare.stage_data._stage_source") as stage_source:
+            self.assertEqual(stage_data(self.sources, self.scratch_dir), staged)
+            stage_source.assert_not_called()
+
+    def test_stage_data_restaged_when_source_changes(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        self.database.write_bytes(os.urandom(8192))
+        restaged = stage_data(self.sources, self.scratch_dir)
+        self.assertNotEqual(staged["exomiser_hg19_data"], restaged["exomiser_hg19_data"])
+        self.assertEqual(restaged["exomiser_hg19_data"].stat().st_size, 8192)
+
+    def make_unused(self, staging_dir: Path) -> None:
+        unused = time.time() - 7200
+        os.utime(staging_dir.joinpath(STAGING_MANIFEST), (unused, unused))
+
+    def test_stale_staging_kept_by_default(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        self.make_unused(staged["exomiser_hg19_data"].parents[1])
+        self.database.write_bytes(os.urandom(8192))
+        stage_data(self.sources, self.scratch_dir)
+        self.assertTrue(staged["exomiser_hg19_data"].exists())
+
+    def test_stale_staging_removed(self):
+        other_database = self.test_dir.joinpath("input_dir", "2302_hg38_variants.mv.db")
+        other_database.write_bytes(os.urandom(1024))
+        other = stage_data({"exomiser_hg38_data": other_database}, self.scratch_dir)
+        self.make_unused(other["exomiser_hg38_data"].parents[1])
+        staged = stage_data(self.sources, self.scratch_dir)
+        self.make_unused(staged["exomiser_hg19_data"].parents[1])
+        self.database.write_bytes(os.urandom(8192))
+        restaged = stage_data(self.sources, self.scratch_dir, remove_stale_after=3600)
+        self.assertFalse(staged["exomiser_hg19_data"].parents[1].exists())
+        self.assertTrue(restaged["exomiser_hg19_data"].exists())
+        # the staging of other sources that are still current is kept
+        self.assertTrue(other["exomiser_hg38_data"].exists())
+        # lock files are kept, so that every process locks the same file
+        staging_dir = staged["exomiser_hg19_data"].parents[1]
+        self.assertTrue(staging_dir.with_name(f"{staging_dir.name}.lock").exists())
+
+    def test_recently_used_stale_staging_kept(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        self.database.write_bytes(os.urandom(8192))
+        stage_data(self.sources, self.scratch_dir, remove_stale_after=3600)
+        self.assertTrue(staged["exomiser_hg19_data"].exists())
+
+    @unittest.skipIf(os.name == "nt", "staging locks need fcntl")
+    def test_locked_stale_staging_kept(self):
+        staged = stage_data(self.sources, self.scratch_dir)
+        staging_dir = staged["exomiser_hg19_data"].parents[1]
+        self.make_unused(staging_dir)
+        self.database.write_bytes(os.urandom(8192))
+        with _node_lock(staging_dir.with_name(f"{staging_dir.name}.lock")):
+            stage_data(self.sources, self.scratch_dir, remove_stale_after=3600)
+        self.assertTrue(staged["exomiser_hg19_data"].exists())
+
+    def test_stage_data_hard_link(self):
+        staged = stage_data(self.sources, self.scratch_dir, hard_link=True)
+        self.assertTrue(os.path.samefile(staged["exomiser_hg19_data"], self.database))
+
+    def test_stage_data_checksum_mismatch(self):
+        with mock.patch(
+            "pheval_lirical.prepare.stage_data.checksum", side_effect=["source", "staged"]
+        ):
+            with self.assertRaises(IOError):
+                stage_data({"exomiser_hg19_data": self.database}, self.scratch_dir)
@@ -0,0 +1,89 @@
+import json
+import shutil
+import statistics
+import tempfile
+import unittest
+from pathlib import Path
+
+import polars as pl
+from pheval.post_processing import post_processing
+
+from pheval_lirical.post_process.post_process_results_format import create_standardised_results
+from pheval_lirical.post_process.summary import SUMMARY_FILE_NAME, RunningStatistics
+from tests.synthetic import write_lirical_result, write_lirical_results, write_phenopackets
+
+
+class TestRunningStatistics(unittest.TestCase):
+    def test_merged_batches_match_whole_stream(self):
+        values = [0.5, -3.0, 7.25, 2.0, 2.0, -1.5, 9.0]
+        running_statistics = RunningStatistics()
+        for batch in [values[:3], [], values[3:4], values[4:]]:
+            running_statistics.update(pl.Series(batch, dtype=pl.Float64))
+        report = running_statistics.report()
+        self.assertEqual(report["count"], len(values))
+        self.assertAlmostEqual(report["mean"], statistics.mean(values))
+        self.assertAlmostEqual(report["std"], statistics.stdev(values))
+        self.assertEqual([report["min"], report["max"]], [-3.0, 9.0])
+
+
+class TestPostProcessSummary(unittest.TestCase):
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.phenopacket_dir = self.test_dir.joinpath("phenopackets")
+        self.raw_results_dir = self.test_dir.joinpath("raw_results")
+        self.output_dir = self.test_dir.joinpath("output")
+        self.output_dir.mkdir()
+        self.phenopacket_paths = write_phenopackets(self.phenopacket_dir, 5)
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[:3], n_rows=10)
+        write_lirical_result(self.raw_results_dir.joinpath("case-000003.tsv"), n_rows=0)
+        post_processing.executed_results.clear()
+
+    def tearDown(self) -> None:
+        post_processing.executed_results.clear()
+        shutil.rmtree(self.test_dir)
+
+    def post_process(self, incremental: bool = False) -> dict:
+        post_processing.executed_results.clear()
+        create_standardised_results(
+            raw_results_dir=self.raw_results_dir,
+            output_dir=self.output_dir,
+            phenopacket_dir=self.phenopacket_dir,
+            sort_order="descending",
+            disease_analysis=True,
+            gene_analysis=False,
+            variant_analysis=False,
+            incremental=incremental,
+        )
+        return json.loads(self.output_dir.joinpath(SUMMARY_FILE_NAME).read_text())
+
+    def test_summary_matches_outputs(self):
+        summary = self.post_process()
+        self.assertEqual(summary["corpus_cases"], 5)
+        self.assertEqual(summary["missing_case_names"], ["case-000004"])
+        self.assertEqual(summary["raw_results"], 4)
+        self.assertEqual(summary["raw_rows"], 30)
+        disease_summary = summary["result_types"]["disease"]
+        self.assertEqual(disease_summary["cases"], 4)
+        self.assertEqual(disease_summary["cases_with_results"], 3)
+        self.assertEqual(disease_summary["empty_case_names"], ["case-000003"])
+        outputs = [
+            pl.read_parquet(path).filter(pl.col("rank") > 0)
+            for path in sorted(self.output_dir.joinpath("pheval_disease_results").iterdir())
+        ]
+        scores = pl.concat([output["score"] for output in outputs]).to_list()
+        self.assertEqual(disease_summary["results"], len(scores))
+        self.assertEqual(sum(disease_summary["score_histogram"].values()), len(scores))
+        self.assertAlmostEqual(disease_summary["scores"]["mean"], statistics.mean(scores))
+        self.assertAlmostEqual(disease_summary["scores"]["std"], statistics.stdev(scores))
+        self.assertAlmostEqual(disease_summary["top_scores"]["max"], max(scores))
+        self.assertEqual(disease_summary["top_scores"]["count"], 3)
+
+    def test_incremental_summary_covers_skipped_results(self):
+        summary = self.post_process(incremental=True)
+        self.assertEqual(self.post_process(incremental=True), summary)
+        write_lirical_results(self.raw_results_dir, self.phenopacket_paths[3:], n_rows=10)
+        summary = self.post_process(incremental=True)
+        self.assertEqual([summary["corpus_cases"], summary["cases_without_raw_results"]], [5, 0])
+        summary = summary["result_types"]["disease"]
+        self.assertEqual([summary["cases"], summary["empty_cases"]], [5, 0])
+        self.assertEqual(summary["results"], 50)